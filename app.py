@@ -1,4 +1,7 @@
 import streamlit as st
+from datetime import datetime
+
+from src.perfil import renderizar_painel_perfil
 
 # ============================================================================
 # CONFIGURAÇÃO DA PÁGINA
@@ -145,9 +148,9 @@ with st.sidebar:
     
     st.markdown("---")
     
-    # Inicializar sistema de metas (importando do módulo)
-    from src.metas import inicializar_sistema_metas
-    inicializar_sistema_metas()
+    # Padrão de mostrar_metas (o restante do sistema de metas é carregado sob demanda)
+    if 'mostrar_metas' not in st.session_state:
+        st.session_state.mostrar_metas = True
     
     # Controle de exibição de metas
     st.markdown("### ⚙️ Configurações")
@@ -159,10 +162,28 @@ with st.sidebar:
     st.session_state.mostrar_metas = mostrar_metas
     
     # Gerenciar metas salvas
-    from src.metas import obter_meta, formatar_valor
     with st.expander("📋 Gerenciar Metas Salvas"):
-        if st.session_state.metas:
-            for chave, meta in st.session_state.metas.items():
+        # src.metas (e com ele o pandas) só é importado se a sessão já tem as
+        # metas ou se a lista é pedida: a página inicial abre sem ele
+        if 'metas' in st.session_state or st.button("Carregar metas salvas", key="carregar_metas_salvas"):
+            from src.metas import inicializar_sistema_metas
+            from src.utils import formatar_valor
+            inicializar_sistema_metas()
+        
+        if 'metas' not in st.session_state:
+            st.caption("As metas são carregadas sob demanda.")
+        elif st.session_state.metas:
+            # Só as metas de um consultor por vez (índice por_consultor), não o repositório inteiro
+            consultores_metas = sorted(st.session_state.metas.consultores(), key=str)
+            st.caption(f"{len(st.session_state.metas)} metas salvas • {len(consultores_metas)} consultores")
+            atual = st.session_state.get('consultor_select_main')
+            consultor_metas = st.selectbox(
+                "Consultor",
+                consultores_metas,
+                index=consultores_metas.index(atual) if atual in consultores_metas else 0,
+                key="consultor_metas_salvas"
+            )
+            for chave, meta in st.session_state.metas.por_consultor(consultor_metas).items():
                 col1, col2 = st.columns([3, 1])
                 with col1:
                     st.markdown(f"**{meta['indicador'][:25]}**")
@@ -174,10 +195,13 @@ with st.sidebar:
         else:
             st.info("Nenhuma meta salva ainda.")
     
+    # Tempos de cada etapa das execuções das páginas (depuração)
+    with st.expander("🐞 Tempos de execução"):
+        renderizar_painel_perfil()
+    
     st.markdown("---")
     
     # Informações do sistema
-    from datetime import datetime
     st.markdown("### ℹ️ Sobre")
     st.markdown(f"""
     **Versão:** 2.1  
@@ -231,8 +255,8 @@ with col3:
     st.markdown("""
     - Visão geral da equipe
     - Ranking de performance
-    - Médias e tendências
-    - *Em breve...*
+    - Médias e distribuição
+    - Metas coletivas
     """)
 
 st.markdown("---")
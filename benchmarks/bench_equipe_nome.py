@@ -0,0 +1,46 @@
+"""
+Benchmark: separar_equipe_nome (vetorizado) vs apply com extrair_equipe_nome.
+
+Mede linhas/segundo de cada caminho (a equivalência dos dois fica em
+tests/test_utils.py).
+
+Uso:
+    python benchmarks/bench_equipe_nome.py [linhas]
+"""
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from src.utils import extrair_equipe_nome, separar_equipe_nome
+
+
+def gerar_usuarios(linhas):
+    """Mistura os formatos reais: 'EQ.NOME', 'EQ.NOME.SOBRENOME', sem ponto e nulos."""
+    rng = np.random.default_rng(42)
+    base = np.array(['EQ1.ANA', 'EQ2.ANA.PAULA', 'SEM_EQUIPE', 'EQ3.JOÃO', '.SO_NOME', 'EQ4.'], dtype=object)
+    usuarios = pd.Series(base[rng.integers(0, len(base), linhas)], dtype=object)
+    usuarios[rng.random(linhas) < 0.01] = np.nan
+    return usuarios
+
+
+def medir(funcao, usuarios):
+    inicio = time.perf_counter()
+    funcao(usuarios)
+    return len(usuarios) / (time.perf_counter() - inicio)
+
+
+if __name__ == '__main__':
+    linhas = int(sys.argv[1]) if len(sys.argv) > 1 else 40_000
+    usuarios = gerar_usuarios(linhas)
+    antes = medir(lambda s: s.apply(lambda x: pd.Series(extrair_equipe_nome(x))), usuarios)
+    depois = medir(separar_equipe_nome, usuarios)
+    
+    print(f"Linhas: {linhas:,}".replace(",", "."))
+    print(f"apply + extrair_equipe_nome: {antes:,.0f} linhas/s".replace(",", "."))
+    print(f"separar_equipe_nome:         {depois:,.0f} linhas/s".replace(",", "."))
+    print(f"Ganho: {depois / antes:.0f}x")
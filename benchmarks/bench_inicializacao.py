@@ -0,0 +1,137 @@
+"""
+Benchmark: tempo até a primeira renderização de cada página (início a frio).
+
+Cada página roda num processo Python novo (como após reiniciar o container),
+com o streamlit já importado, e sem arquivo enviado: mede o tempo do
+primeiro st.run da página e lista os módulos que mais pesaram na
+importação (python -X importtime).
+
+Depois a página é renderizada de novo com dois períodos de exemplo do
+histórico local e o benchmark falha se algum módulo de MODULOS_ADIADOS
+tiver sido importado: eles só podem carregar quando usados (ex.: o
+openpyxl no clique de "Gerar Excel").
+
+Uso:
+    python benchmarks/bench_inicializacao.py [repetições] [módulos no ranking]
+"""
+import io
+import os
+import re
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+import numpy as np
+
+RAIZ = Path(__file__).parent.parent
+PAGINAS = ['app.py'] + sorted(str(p.relative_to(RAIZ)) for p in (RAIZ / 'pages').glob('*.py'))
+
+# Módulos que não podem ser importados só por abrir a página (None = todas)
+MODULOS_ADIADOS = {
+    'openpyxl': None,
+    'pandas': ['app.py'],
+}
+
+HISTORICO = "🗄️ Histórico salvo"
+
+# Roda a página com o AppTest do streamlit e imprime o tempo do primeiro run;
+# em seguida troca a origem para o histórico e lista os módulos adiados já
+# importados
+SCRIPT = """
+import sys, time
+sys.path.insert(0, {raiz!r})
+from streamlit.testing.v1 import AppTest
+at = AppTest.from_file({pagina!r}, default_timeout=120)
+sys.stderr.write("INICIO\\n"); sys.stderr.flush()
+inicio = time.perf_counter()
+at.run()
+print("TEMPO", time.perf_counter() - inicio)
+print("ERROS", len(at.exception))
+for radio in at.radio:
+    if {historico!r} in radio.options:
+        radio.set_value({historico!r})
+        at.run()
+        break
+print("ERROS_DADOS", len(at.exception))
+print("ADIADOS", " ".join(m for m in {adiados!r} if m in sys.modules))
+"""
+
+
+def salvar_periodos_exemplo(diretorio, consultores=300, indicadores=20):
+    """Grava dois meses sintéticos no histórico (mesmo caminho de um upload)."""
+    sys.path.insert(0, str(RAIZ))
+    from src.armazem import ArmazemHistorico, salvar_upload
+    from src.utils import carregar_csv
+    
+    armazem = ArmazemHistorico(diretorio)
+    gerador = np.random.default_rng(1)
+    colunas = ['USUÁRIO', 'CHIP HABILITADO', 'PONTOS HAB TOTAL', 'PONTOS FIN TOTAL', 'CONVERSÃO %'] + \
+              [f'INDICADOR {i}' for i in range(indicadores)]
+    for nome in ('jan_2026.csv', 'fev_2026.csv'):
+        linhas = [';'.join(colunas)]
+        for i in range(consultores):
+            valores = gerador.integers(0, 900, len(colunas) - 1)
+            linhas.append(';'.join([f'EQ{i % 7}.CONSULTOR{i}'] + [str(v) for v in valores]))
+        arquivo = io.BytesIO(('\n'.join(linhas) + '\n').encode('utf-8'))
+        arquivo.name = nome
+        salvar_upload(armazem, arquivo, carregar_csv(arquivo)[0])
+
+
+def modulos_adiados(pagina):
+    return [m for m, paginas in MODULOS_ADIADOS.items() if paginas is None or pagina in paginas]
+
+
+def rodar_pagina(pagina, diretorio_dados):
+    ambiente = dict(
+        os.environ,
+        PAINEL_METAS_DB=str(Path(diretorio_dados) / 'metas.sqlite3'),
+        PAINEL_HISTORICO_DIR=str(Path(diretorio_dados) / 'historico'),
+    )
+    script = SCRIPT.format(
+        raiz=str(RAIZ), pagina=str(RAIZ / pagina), historico=HISTORICO, adiados=modulos_adiados(pagina)
+    )
+    processo = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', script],
+        capture_output=True, text=True, cwd=RAIZ, env=ambiente
+    )
+    tempo = float(re.search(r'^TEMPO (\S+)', processo.stdout, re.M).group(1))
+    erros = int(re.search(r'^ERROS (\d+)', processo.stdout, re.M).group(1))
+    erros += int(re.search(r'^ERROS_DADOS (\d+)', processo.stdout, re.M).group(1))
+    adiados = re.search(r'^ADIADOS ?(.*)$', processo.stdout, re.M).group(1).split()
+    return tempo, erros, adiados, processo.stderr
+
+
+def modulos_pesados(importtime, limite):
+    """Importações feitas pela página com maior tempo acumulado (em s)."""
+    tempos = {}
+    for linha in importtime.split("INICIO\n", 1)[-1].splitlines():
+        partes = linha.split('|')
+        if len(partes) != 3 or not partes[1].strip().isdigit():
+            continue
+        nome = partes[2].rstrip()
+        if len(nome) - len(nome.lstrip()) == 1:  # só as importações de primeiro nível
+            tempos[nome.strip()] = int(partes[1]) / 1e6
+    return sorted(tempos.items(), key=lambda x: -x[1])[:limite]
+
+
+if __name__ == '__main__':
+    repeticoes = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+    limite = int(sys.argv[2]) if len(sys.argv) > 2 else 6
+    
+    with tempfile.TemporaryDirectory() as diretorio_dados:
+        salvar_periodos_exemplo(Path(diretorio_dados) / 'historico')
+        
+        for pagina in PAGINAS:
+            resultados = [rodar_pagina(pagina, diretorio_dados) for _ in range(repeticoes)]
+            tempos = sorted(r[0] for r in resultados)
+            erros = max(r[1] for r in resultados)
+            
+            print(f"\n{pagina}")
+            print(f"  primeira renderização: {tempos[len(tempos) // 2]:.2f} s (mediana de {repeticoes})"
+                  + (f"  ⚠️ {erros} exceção(ões)" if erros else ""))
+            for nome, segundos in modulos_pesados(resultados[-1][3], limite):
+                print(f"    {segundos:6.3f} s  {nome}")
+            
+            adiados = sorted({m for r in resultados for m in r[2]})
+            assert not adiados, f"{pagina} importou {', '.join(adiados)} sem que fosse usado"
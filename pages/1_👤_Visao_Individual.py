@@ -1,126 +1,259 @@
 import streamlit as st
 import pandas as pd
-import matplotlib.pyplot as plt
 import numpy as np
-import plotly.graph_objects as go
 from datetime import datetime
-from io import BytesIO
 
 # Importar funções dos módulos
 from src.utils import (
-    corrigir_colunas, extrair_equipe_nome, formatar_valor, 
-    carregar_csv, formatar_periodo_nome
+    corrigir_colunas, formatar_valor, 
+    carregar_csv, formatar_periodo_nome, formatar_dataframe,
+    esquema_csv, carregar_csv_colunas, preparar_usuarios, obter_indice_consultores,
+    COLUNAS_IDENTIFICACAO
 )
 from src.metas import (
     inicializar_sistema_metas, obter_meta, salvar_meta,
     calcular_progresso_meta, obter_cor_progresso, formatar_progresso_texto,
-    criar_card_indicador
+    renderizar_grade_cards, recarregar, eh_indicador_chip, aplicar_nivel_chip, remover_nivel_chip,
+    METAS_CHIP
 )
+from src.armazem import obter_armazem_padrao, salvar_upload
+from src.exportacao import gerar_excel
+from src.graficos import figura_indicadores
+from src.perfil import iniciar_execucao, medir
 
 # ============================================================================
 # FUNÇÕES AUXILIARES PARA MELHOR VISUALIZAÇÃO
 # ============================================================================
-def criar_nome_curto_grafico(indicador):
+# Acima deste número de colunas o arquivo é lido só com os indicadores exibidos
+LIMITE_COLUNAS_LARGO = 80
+
+def completar_colunas(df_filtrado, colunas, ler_colunas, colunas_percentuais):
     """
-    Cria versão abreviada dos nomes dos indicadores para o gráfico
+    Arquivo largo: lê sob demanda as colunas pedidas que ainda não estão em
+    df_filtrado. Retorna (df_filtrado, colunas_percentuais) atualizados.
     """
-    # Mapeamento de abreviações
-    mapeamento = {
-        'PONTOS': 'PTS',
-        'HABILITADO': 'HAB',
-        'FINALIZADO': 'FIN', 
-        'TOTAL': 'TOT',
-        'VENDAS': 'VDS',
-        'CHIP': 'CHP',
-        'TELEVISAO': 'TV',
-        'TELEVISÃO': 'TV',
-        'TELEVISION': 'TV',
-        'PRODUTO': 'PDT',
-        'QUALIDADE': 'QLD',
-        'ATENDIMENTO': 'ATD',
-        'CALLBACK': 'CB',
-        'RECEITA': 'REC',
-        'MEDIA': 'MED',
-        'MÉDIA': 'MED',
-        'MAXIMO': 'MAX',
-        'MÁXIMO': 'MAX',
-        'MINIMO': 'MIN',
-        'MÍNIMO': 'MIN',
-        'FINAL': 'FIN',
-        'HABILITACAO': 'HAB',
-        'HABILITAÇÃO': 'HAB',
-        'NOVO': 'NV',
-        'PME': 'PM',
-        'CPF': 'CP',
-        'CNPJ': 'CN',
-        'GERAL': 'GER',
-        'FIXA': 'FX',
-        'MOVEL': 'MV',
-        'MÓVEL': 'MV',
-        'CVS': 'CV',
-        'C/': ''
-    }
-    
-    indicador_upper = indicador.upper()
-    resultado = indicador_upper
-    
-    # Aplica abreviações (do maior para o menor)
-    for palavra, abrev in sorted(mapeamento.items(), key=lambda x: -len(x[0])):
-        if palavra in resultado:
-            resultado = resultado.replace(palavra, abrev)
-    
-    # Remove espaços duplos e ajusta
-    resultado = ' '.join(resultado.split())
-    resultado = resultado.replace('  ', ' ').strip()
+    faltantes = [c for c in colunas if c not in df_filtrado.columns]
+    if ler_colunas is None or not faltantes:
+        return df_filtrado, colunas_percentuais
     
-    # Se ainda for muito longo, corta inteligentemente
-    if len(resultado) > 20:
-        partes = resultado.split()
-        if len(partes) > 2:
-            resultado = ' '.join(partes[:2]) + '...'
-        else:
-            resultado = resultado[:18] + "..."
-    
-    return resultado
+    extras = ler_colunas(faltantes)
+    faltantes = [c for c in faltantes if c in extras.columns]
+    df_filtrado = df_filtrado.join(extras.loc[df_filtrado.index, faltantes])
+    novos_percentuais = [c for c in extras.attrs.get('colunas_percentuais', []) if c in faltantes]
+    return df_filtrado, list(colunas_percentuais) + novos_percentuais
+
+def assinatura_metas(consultor):
+    """Metas atuais do consultor como tupla comparável (para invalidar a exportação)."""
+    return tuple(sorted(
+        (chave, meta['valor']) for chave, meta in st.session_state.metas.por_consultor(consultor).items()
+    ))
 
-def obter_cor_progresso_grafico(progresso):
+def planilha_metas(df_filtrado, consultor, ler_colunas=None):
     """
-    Cores otimizadas para o gráfico - melhor contraste
+    Aba 'Metas' da exportação, lida do repositório no momento da chamada.
+    Em arquivos largos, ler_colunas busca os indicadores com meta ainda não carregados.
     """
-    if progresso >= 100:
-        return '#059669'  # Verde escuro vibrante
-    elif progresso >= 80:
-        return '#10B981'  # Verde médio
-    elif progresso >= 50:
-        return '#D97706'  # Laranja escuro
-    elif progresso >= 30:
-        return '#F59E0B'  # Laranja médio
-    else:
-        return '#DC2626'  # Vermelho escuro vibrante
+    metas = st.session_state.metas.por_consultor(consultor).values()
+    df_filtrado, _ = completar_colunas(df_filtrado, [m['indicador'] for m in metas], ler_colunas, [])
+    metas_consultor = []
+    for meta in metas:
+        valor_atual = df_filtrado[meta['indicador']].iloc[0] if meta['indicador'] in df_filtrado.columns else None
+        progresso = calcular_progresso_meta(0 if valor_atual is None else valor_atual, meta['valor'])
+        metas_consultor.append({
+            'Indicador': meta['indicador'],
+            'Meta': meta['valor'],
+            'Valor Atual': 'N/A' if valor_atual is None else valor_atual,
+            'Progresso': f"{progresso:.1f}%"
+        })
+    return pd.DataFrame(metas_consultor) if metas_consultor else None
 
-def formatar_valor_grafico(valor):
+@st.fragment
+def secao_consultor(df_filtrado, consultor_selecionado, colunas_percentuais,
+                    ler_colunas=None, indicadores_disponiveis=None):
     """
-    Formata valores para exibição no gráfico
+    Cabeçalho, seleção de indicadores, cards e gráfico do consultor.
+    Roda como fragmento: editar uma meta reexecuta só esta região, sem
+    recarregar o CSV nem refazer a tabela completa.
+    
+    Em arquivos largos, ler_colunas(colunas) busca as colunas que faltarem
+    e indicadores_disponiveis lista todas as opções do arquivo.
     """
-    try:
-        if pd.isna(valor):
-            return "0"
+    # Grava em lote as metas alteradas na execução anterior do fragmento
+    inicializar_sistema_metas()
+    iniciar_execucao("Visão Individual • consultor", fragmento=True)
+    
+    # Excel gerado antes de uma meta mudar aqui: o botão de download fica fora
+    # do fragmento, então descarta o arquivo e recarrega a página inteira
+    gerado = st.session_state.get('excel_individual')
+    if gerado and gerado['opcoes'][0] == consultor_selecionado and \
+            gerado['opcoes'][-1] != assinatura_metas(consultor_selecionado):
+        del st.session_state.excel_individual
+        st.rerun()
+    
+    # Equipe do consultor, lida uma vez para cabeçalho, cards e gráfico
+    equipe = df_filtrado['EQUIPE'].iloc[0] if 'EQUIPE' in df_filtrado.columns else None
+    
+    # ============================================================
+    # SEÇÃO 2: CABEÇALHO INFORMATIVO
+    # ============================================================
+    st.markdown("---")
+    
+    col_header1, col_header2, col_header3, col_header4 = st.columns(4)
+    
+    with col_header1:
+        st.markdown("**👤 Consultor**")
+        st.markdown(f"### {consultor_selecionado}")
+    
+    with col_header2:
+        if equipe:
+            st.markdown("**🏢 Equipe**")
+            st.markdown(f"### {equipe}")
+    
+    with col_header3:
+        metas_consultor = len(st.session_state.metas.por_consultor(consultor_selecionado))
         
-        # Converte para número
-        valor_str = str(valor).replace('%', '').replace(',', '.').strip()
-        num_valor = float(valor_str)
+        st.markdown("**🎯 Metas Definidas**")
+        st.markdown(f"### {metas_consultor}")
+    
+    with col_header4:
+        st.markdown("**📅 Data da Análise**")
+        st.markdown(f"### {datetime.now().strftime('%d/%m')}")
+    
+    # ============================================================
+    # SEÇÃO 3: SELEÇÃO PERSONALIZADA DE INDICADORES - VERSÃO COMPACTA
+    # ============================================================
+    st.markdown("---")
+    
+    with st.container():
+        st.markdown("### 🎯 Indicadores em Destaque")
+        
+        # Colunas numéricas já vêm convertidas de carregar_csv
+        colunas_excluir = COLUNAS_IDENTIFICACAO
         
-        # Formata baseado no tamanho
-        if num_valor >= 1000000:
-            return f"{num_valor/1000000:.1f}M"
-        elif num_valor >= 1000:
-            return f"{num_valor/1000:.0f}K"
-        elif num_valor.is_integer():
-            return f"{int(num_valor):,}".replace(",", ".")
+        # Lista indicadores disponíveis
+        if indicadores_disponiveis is not None:
+            # Arquivo largo: opções vêm do cabeçalho, sem carregar as colunas
+            todos_indicadores = list(indicadores_disponiveis)
         else:
-            return f"{num_valor:.1f}"
-    except:
-        return str(valor)
+            todos_indicadores = []
+            for col in df_filtrado.columns:
+                if col not in colunas_excluir:
+                    if pd.api.types.is_numeric_dtype(df_filtrado[col]):
+                        todos_indicadores.append(col)
+                    elif any(term in col.upper() for term in ['CHIP', 'PONTOS', 'VENDAS', 'CVS', 'CALLBACK']):
+                        todos_indicadores.append(col)
+            
+            if not todos_indicadores:
+                todos_indicadores = [col for col in df_filtrado.columns if col not in colunas_excluir]
+        
+        # Select sem label e compacto
+        col_sel1, col_sel2 = st.columns([4, 1])
+        
+        with col_sel1:
+            indicadores_selecionados = st.multiselect(
+                "##",  # Label invisível
+                options=todos_indicadores,
+                default=st.session_state.get('indicadores_favoritos', todos_indicadores[:4]),
+                key="multiselect_indicadores",
+                label_visibility="collapsed",  # ESSENCIAL!
+                placeholder="Selecione os indicadores..."
+            )
+        
+        with col_sel2:
+            st.write("")  # Alinhamento
+            if st.button("💾 Salvar", use_container_width=True, type="secondary"):
+                if indicadores_selecionados:
+                    st.session_state.indicadores_favoritos = indicadores_selecionados
+                    recarregar("fragment")
+        
+        if indicadores_selecionados:
+            st.session_state.indicadores_favoritos = indicadores_selecionados
+    
+    # Arquivo largo: só os indicadores recém-adicionados são lidos do arquivo
+    df_filtrado, colunas_percentuais = completar_colunas(
+        df_filtrado, st.session_state.get('indicadores_favoritos', []), ler_colunas, colunas_percentuais
+    )
+    
+    # ============================================================
+    # SEÇÃO 4: CARDS DOS INDICADORES - GRADE COMPACTA
+    # ============================================================
+    st.markdown("---")
+    
+    # CSS para compactar o layout
+    st.markdown("""
+    <style>
+        /* Remove espaçamento entre colunas */
+        div[data-testid="column"] {
+            padding: 0 4px !important;
+        }
+        /* Remove margens extras */
+        div.stContainer {
+            padding: 0 !important;
+            margin-bottom: 0 !important;
+        }
+        /* Compacta grid */
+        .st-emotion-cache-16ids5p {
+            gap: 0.5rem !important;
+        }
+        /* Reduz espaçamento dos cards */
+        .element-container {
+            margin-bottom: 0 !important;
+        }
+    </style>
+    """, unsafe_allow_html=True)
+    
+    if st.session_state.indicadores_favoritos:
+        st.caption(f"📊 {len(st.session_state.indicadores_favoritos)} indicadores selecionados")
+        
+        indicadores_para_mostrar = st.session_state.indicadores_favoritos
+        
+        # Todos os cards em um único bloco; editor de meta só do card escolhido
+        renderizar_grade_cards(
+            [
+                (indicador, df_filtrado[indicador].iloc[0],
+                 'porcentagem' if indicador in colunas_percentuais else 'auto')
+                for indicador in indicadores_para_mostrar
+            ],
+            consultor_selecionado,
+            equipe,
+            escopo_rerun="fragment"
+        )
+    else:
+        st.info("👆 Selecione os indicadores acima")
+    
+    # ============================================================
+    # SEÇÃO 6: GRÁFICO INTERATIVO
+    # ============================================================
+    if st.session_state.indicadores_favoritos:
+        st.markdown("---")
+        st.markdown("### 📈 Visualização dos Indicadores")
+        
+        favoritos = st.session_state.indicadores_favoritos
+        metas_grafico = []
+        for indicador in favoritos:
+            meta = obter_meta(indicador, consultor_selecionado, equipe)
+            metas_grafico.append(meta['valor'] if meta else None)
+        
+        # Figura em cache por (consultor, indicadores, valores, metas)
+        fig = figura_indicadores(
+            consultor_selecionado, favoritos, df_filtrado[favoritos].iloc[0].tolist(), metas_grafico
+        )
+        
+        with medir("plotly_chart"):
+            st.plotly_chart(fig, use_container_width=True, config={
+                'displayModeBar': True,
+                'displaylogo': False,
+                'modeBarButtonsToRemove': ['lasso2d', 'select2d']
+            })
+        
+        # Legenda compacta
+        with st.expander("🎯 Legenda do Gráfico", expanded=False):
+            legenda_cols = st.columns(5)
+            with legenda_cols[0]: st.markdown("🔵 Sem meta")
+            with legenda_cols[1]: st.markdown("🟢 Meta ≥100%")
+            with legenda_cols[2]: st.markdown("🟩 Meta ≥80%")
+            with legenda_cols[3]: st.markdown("🟠 Meta ≥50%")
+            with legenda_cols[4]: st.markdown("🔴 Meta <50%")
 
 # ============================================================================
 # PÁGINA: VISÃO INDIVIDUAL
@@ -129,42 +262,88 @@ st.title("👤 Análise Individual por Consultor")
 
 # Inicializar sistema de metas
 inicializar_sistema_metas()
+iniciar_execucao("Visão Individual")
+
+# Upload do arquivo (ou período já salvo no histórico local)
+armazem = obter_armazem_padrao()
+periodos_salvos = armazem.periodos() if armazem else []
+rotulos_salvos = {p['chave']: p['rotulo'] for p in periodos_salvos}
+chave_salva = None
 
-# Upload do arquivo
 with st.container():
     st.markdown("### 📁 Carregar Arquivo do Mês")
-    uploaded_file = st.file_uploader(
-        "Selecione o arquivo CSV com os dados:",
-        type="csv",
-        help="Arquivo deve conter coluna 'USUÁRIO' ou similar",
-        key="upload_individual"
-    )
+    origem = "📁 Enviar CSV"
+    if periodos_salvos:
+        origem = st.radio(
+            "Origem",
+            ["📁 Enviar CSV", "🗄️ Histórico salvo"],
+            horizontal=True,
+            key="origem_individual",
+            label_visibility="collapsed"
+        )
+    
+    if origem == "🗄️ Histórico salvo":
+        uploaded_file = None
+        chave_salva = st.selectbox(
+            "Período salvo:",
+            list(rotulos_salvos),
+            index=len(rotulos_salvos) - 1,
+            format_func=rotulos_salvos.get,
+            key="periodo_salvo_individual"
+        )
+    else:
+        uploaded_file = st.file_uploader(
+            "Selecione o arquivo CSV com os dados:",
+            type="csv",
+            help="Arquivo deve conter coluna 'USUÁRIO' ou similar",
+            key="upload_individual"
+        )
     
     if uploaded_file:
         st.success("✅ Arquivo carregado com sucesso!")
+        if armazem is not None and st.button("💾 Salvar no histórico", key="salvar_historico_individual"):
+            chave = salvar_upload(armazem, uploaded_file, carregar_csv(uploaded_file)[0])
+            st.toast(f"Período salvo como {chave}", icon="💾")
 
-if uploaded_file is not None:
+if uploaded_file is not None or chave_salva:
+    # Arquivo largo: lê só identificação + indicadores exibidos (demais sob demanda)
+    if uploaded_file is not None:
+        esquema = esquema_csv(uploaded_file)
+        ler_colunas = lambda colunas: carregar_csv_colunas(uploaded_file, colunas)[0]
+    else:
+        esquema = armazem.esquema(chave_salva)
+        ler_colunas = lambda colunas: armazem.carregar(chave_salva, colunas)
+    
+    modo_largo = False
+    if len(esquema['colunas']) > LIMITE_COLUNAS_LARGO:
+        modo_largo = st.toggle(
+            f"⚡ Arquivo largo ({len(esquema['colunas'])} colunas): carregar só os indicadores exibidos",
+            value=True,
+            key="modo_largo"
+        )
+    indicadores_arquivo = [c for c in esquema['numericas'] if c not in COLUNAS_IDENTIFICACAO]
+    
     # Carregar dados
     with st.spinner("📊 Processando dados..."):
-        df, sep_used = carregar_csv(uploaded_file)
+        if modo_largo:
+            df = ler_colunas(st.session_state.get('indicadores_favoritos') or indicadores_arquivo[:4])
+        elif uploaded_file is not None:
+            df, sep_used = carregar_csv(uploaded_file)
+        else:
+            df = armazem.carregar(chave_salva)
     
-    # Encontrar coluna do consultor
-    for col in df.columns:
-        col_upper = str(col).upper()
-        if any(term in col_upper for term in ['USUÁRIO', 'USUARIO', 'CONSULTOR', 'VENDEDOR']):
-            df = df.rename(columns={col: 'USUARIO'})
-            break
+    # Padronizar USUARIO/EQUIPE/NOME_PURO e indexar consultores (em cache por arquivo)
+    preparado = preparar_usuarios(df)
     
-    if 'USUARIO' in df.columns:
-        # Processar dados
-        df['USUARIO'] = df['USUARIO'].astype(str).str.strip()
-        df = df[~df['USUARIO'].isin(['', 'nan', 'NaN', 'None', 'none'])]
-        df[['EQUIPE', 'NOME_PURO']] = df['USUARIO'].apply(
-            lambda x: pd.Series(extrair_equipe_nome(x))
-        )
+    if preparado is not None:
+        df = preparado
+        indice = obter_indice_consultores(df)
         
-        consultores = sorted(df['USUARIO'].unique().tolist())
-        st.session_state.todos_indicadores = df.columns.tolist()
+        colunas_percentuais = df.attrs.get('colunas_percentuais', [])
+        consultores = indice.consultores
+        # Arquivo largo: df só tem as colunas exibidas; CHIP e metas usam todas as do arquivo
+        colunas_arquivo = list(esquema['colunas']) if modo_largo else df.columns.tolist()
+        st.session_state.todos_indicadores = colunas_arquivo
         
         if consultores:
             # ============================================================
@@ -176,8 +355,8 @@ if uploaded_file is not None:
             col_equipe, col_consultor = st.columns(2)
             
             with col_equipe:
-                if 'EQUIPE' in df.columns and df['EQUIPE'].nunique() > 1:
-                    equipes = ['Todas as Equipes'] + sorted(df['EQUIPE'].unique().tolist())
+                if len(indice.equipes) > 1:
+                    equipes = ['Todas as Equipes'] + indice.equipes
                     equipe_selecionada = st.selectbox(
                         "Filtrar por equipe:",
                         equipes,
@@ -185,7 +364,7 @@ if uploaded_file is not None:
                     )
                     
                     if equipe_selecionada != 'Todas as Equipes':
-                        consultores_filtrados = df[df['EQUIPE'] == equipe_selecionada]['USUARIO'].unique().tolist()
+                        consultores_filtrados = indice.consultores_da_equipe(equipe_selecionada)
                     else:
                         consultores_filtrados = consultores
                 else:
@@ -199,252 +378,53 @@ if uploaded_file is not None:
                     key="consultor_select_main"
                 )
             
-            # Dados do consultor selecionado
-            df_filtrado = df[df['USUARIO'] == consultor_selecionado]
-            
-            if not df_filtrado.empty:
-                # ============================================================
-                # SEÇÃO 2: CABEÇALHO INFORMATIVO
-                # ============================================================
-                st.markdown("---")
-                
-                col_header1, col_header2, col_header3, col_header4 = st.columns(4)
-                
-                with col_header1:
-                    st.markdown("**👤 Consultor**")
-                    st.markdown(f"### {consultor_selecionado}")
-                
-                with col_header2:
-                    if 'EQUIPE' in df_filtrado.columns and df_filtrado['EQUIPE'].iloc[0]:
-                        st.markdown("**🏢 Equipe**")
-                        st.markdown(f"### {df_filtrado['EQUIPE'].iloc[0]}")
-                
-                with col_header3:
-                    metas_consultor = 0
-                    for chave in st.session_state.metas:
-                        if consultor_selecionado in chave:
-                            metas_consultor += 1
+            # Nível CHIP em lote para todos os consultores do filtro (uma única execução)
+            indicadores_chip = [c for c in colunas_arquivo if eh_indicador_chip(c)]
+            if indicadores_chip and st.session_state.mostrar_metas:
+                with st.expander(f"⚡ Nível CHIP em lote • {len(consultores_filtrados)} consultores"):
+                    col_nivel, col_aplicar, col_remover = st.columns([2, 1, 1])
                     
-                    st.markdown("**🎯 Metas Definidas**")
-                    st.markdown(f"### {metas_consultor}")
-                
-                with col_header4:
-                    st.markdown("**📅 Data da Análise**")
-                    st.markdown(f"### {datetime.now().strftime('%d/%m')}")
-                
-                # ============================================================
-                # SEÇÃO 3: SELEÇÃO PERSONALIZADA DE INDICADORES - VERSÃO COMPACTA
-                # ============================================================
-                st.markdown("---")
-                
-                with st.container():
-                    st.markdown("### 🎯 Indicadores em Destaque")
-                    
-                    colunas_excluir = ['USUARIO', 'EQUIPE', 'NOME_PURO', 'USUÁRIO', 'CONSULTOR', 'VENDEDOR']
-                    
-                    # Converte colunas problemáticas
-                    for col in df_filtrado.columns:
-                        if col not in colunas_excluir and df_filtrado[col].dtype == 'object':
-                            try:
-                                df_filtrado[col] = df_filtrado[col].astype(str).str.replace(',', '.').str.replace('%', '')
-                                df_filtrado[col] = pd.to_numeric(df_filtrado[col], errors='coerce')
-                            except:
-                                pass
-                    
-                    # Lista indicadores disponíveis
-                    todos_indicadores = []
-                    for col in df_filtrado.columns:
-                        if col not in colunas_excluir:
-                            if pd.api.types.is_numeric_dtype(df_filtrado[col]):
-                                todos_indicadores.append(col)
-                            elif any(term in col.upper() for term in ['CHIP', 'PONTOS', 'VENDAS', 'CVS', 'CALLBACK']):
-                                todos_indicadores.append(col)
-                    
-                    if not todos_indicadores:
-                        todos_indicadores = [col for col in df_filtrado.columns if col not in colunas_excluir]
-                    
-                    # Select sem label e compacto
-                    col_sel1, col_sel2 = st.columns([4, 1])
-                    
-                    with col_sel1:
-                        indicadores_selecionados = st.multiselect(
-                            "##",  # Label invisível
-                            options=todos_indicadores,
-                            default=st.session_state.get('indicadores_favoritos', todos_indicadores[:4]),
-                            key="multiselect_indicadores",
-                            label_visibility="collapsed",  # ESSENCIAL!
-                            placeholder="Selecione os indicadores..."
+                    with col_nivel:
+                        nivel_lote = st.selectbox(
+                            "Nível",
+                            list(METAS_CHIP),
+                            key="nivel_chip_lote",
+                            label_visibility="collapsed"
                         )
                     
-                    with col_sel2:
-                        st.write("")  # Alinhamento
-                        if st.button("💾 Salvar", use_container_width=True, type="secondary"):
-                            if indicadores_selecionados:
-                                st.session_state.indicadores_favoritos = indicadores_selecionados
-                                st.rerun()
+                    consultores_lote = [(c, indice.equipe(c)) for c in consultores_filtrados]
                     
-                    if indicadores_selecionados:
-                        st.session_state.indicadores_favoritos = indicadores_selecionados
-                
-                # ============================================================
-                # SEÇÃO 4: CARDS DOS INDICADORES - GRADE COMPACTA
-                # ============================================================
-                st.markdown("---")
-                
-                # CSS para compactar o layout
-                st.markdown("""
-                <style>
-                    /* Remove espaçamento entre colunas */
-                    div[data-testid="column"] {
-                        padding: 0 4px !important;
-                    }
-                    /* Remove margens extras */
-                    div.stContainer {
-                        padding: 0 !important;
-                        margin-bottom: 0 !important;
-                    }
-                    /* Compacta grid */
-                    .st-emotion-cache-16ids5p {
-                        gap: 0.5rem !important;
-                    }
-                    /* Reduz espaçamento dos cards */
-                    .element-container {
-                        margin-bottom: 0 !important;
-                    }
-                </style>
-                """, unsafe_allow_html=True)
-                
-                if st.session_state.indicadores_favoritos:
-                    st.caption(f"📊 {len(st.session_state.indicadores_favoritos)} indicadores selecionados")
+                    with col_aplicar:
+                        if st.button("✅ Aplicar", key="aplicar_chip_lote", use_container_width=True):
+                            aplicar_nivel_chip(nivel_lote, indicadores_chip[0], consultores_lote)
+                            st.rerun()
                     
-                    indicadores_para_mostrar = st.session_state.indicadores_favoritos
+                    with col_remover:
+                        if st.button("🗑️ Remover", key="remover_chip_lote", use_container_width=True):
+                            remover_nivel_chip(indicadores_chip[0], consultores_lote)
+                            st.rerun()
                     
-                    for i in range(0, len(indicadores_para_mostrar), 3):
-                        cols = st.columns(3, gap="small")
-                        indicadores_linha = indicadores_para_mostrar[i:i+3]
-                        
-                        for idx, (col, indicador) in enumerate(zip(cols, indicadores_linha)):
-                            with col:
-                                valor = df_filtrado[indicador].iloc[0]
-                                equipe = df_filtrado['EQUIPE'].iloc[0] if 'EQUIPE' in df_filtrado.columns else None
-                                
-                                criar_card_indicador(
-                                    valor, 
-                                    indicador, 
-                                    consultor_selecionado, 
-                                    equipe
-                                )
-                else:
-                    st.info("👆 Selecione os indicadores acima")
-                
-                # ============================================================
-                # SEÇÃO 6: GRÁFICO INTERATIVO
-                # ============================================================
-                if st.session_state.indicadores_favoritos:
-                    st.markdown("---")
-                    st.markdown("### 📈 Visualização dos Indicadores")
-                    
-                    # Prepara dados para o gráfico
-                    dados_grafico = []
-                    valores_grafico = []
-                    valores_formatados = []
-                    cores_grafico = []
-                    textos_hover = []
-                    metas_valores = []
-                    
-                    for indicador in st.session_state.indicadores_favoritos:
-                        valor = df_filtrado[indicador].iloc[0]
-                        try:
-                            if pd.isna(valor):
-                                num_valor = 0
-                            else:
-                                valor_str = str(valor).replace('%', '').replace(',', '.').strip()
-                                num_valor = float(valor_str)
-                        except:
-                            num_valor = 0
-                        
-                        nome_curto = criar_nome_curto_grafico(indicador)
-                        dados_grafico.append(nome_curto)
-                        valores_grafico.append(num_valor)
-                        valores_formatados.append(formatar_valor_grafico(num_valor))
-                        
-                        equipe_atual = df_filtrado['EQUIPE'].iloc[0] if 'EQUIPE' in df_filtrado.columns else None
-                        meta = obter_meta(indicador, consultor_selecionado, equipe_atual)
-                        
-                        if meta:
-                            progresso = calcular_progresso_meta(valor, meta['valor'])
-                            cores_grafico.append(obter_cor_progresso_grafico(progresso))
-                            textos_hover.append(
-                                f"<b>{indicador}</b><br>" +
-                                f"<span style='color:#3B82F6; font-weight:bold'>Valor: {formatar_valor(valor)}</span><br>" +
-                                f"<span style='color:#059669; font-weight:bold'>Meta: {formatar_valor(meta['valor'])}</span><br>" +
-                                f"<span style='color:#6B7280'>Progresso: {progresso:.1f}%</span><br>" +
-                                f"<span style='color:{obter_cor_progresso_grafico(progresso)}; font-weight:bold'>" +
-                                f"{'✅ Meta atingida' if progresso >= 100 else '🟡 Em progresso' if progresso >= 50 else '🔴 Abaixo da meta'}</span>"
-                            )
-                            metas_valores.append(meta['valor'])
-                        else:
-                            cores_grafico.append('#3B82F6')
-                            textos_hover.append(
-                                f"<b>{indicador}</b><br>" +
-                                f"<span style='color:#3B82F6; font-weight:bold'>Valor: {formatar_valor(valor)}</span><br>" +
-                                f"<span style='color:#6B7280'>Meta: Não definida</span>"
-                            )
-                            metas_valores.append(None)
-                    
-                    # Ordena por valor
-                    dados_ordenados = sorted(zip(valores_grafico, dados_grafico, cores_grafico, 
-                                               textos_hover, metas_valores, valores_formatados), 
-                                           reverse=True)
-                    
-                    if dados_ordenados:
-                        valores_grafico, dados_grafico, cores_grafico, textos_hover, metas_valores, valores_formatados = zip(*dados_ordenados)
-                    
-                    # Cria gráfico
-                    fig = go.Figure()
-                    
-                    fig.add_trace(go.Bar(
-                        y=list(dados_grafico),
-                        x=list(valores_grafico),
-                        orientation='h',
-                        marker=dict(
-                            color=list(cores_grafico),
-                            line=dict(color='rgba(0,0,0,0.3)', width=1.5),
-                            opacity=0.9
-                        ),
-                        text=list(valores_formatados),
-                        textposition='outside',
-                        textfont=dict(size=11, color='black'),
-                        hovertemplate='%{customdata}<extra></extra>',
-                        customdata=list(textos_hover)
-                    ))
-                    
-                    fig.update_layout(
-                        title=dict(
-                            text=f'Indicadores - {consultor_selecionado}',
-                            font=dict(size=16, color="#1E3A8A"),
-                            x=0.5
-                        ),
-                        height=max(350, len(dados_grafico) * 40),
-                        margin=dict(l=5, r=5, t=50, b=30),
-                        plot_bgcolor='white',
-                        paper_bgcolor='white'
+                    st.caption(
+                        f"Aplica {nivel_lote} em {indicadores_chip[0]} e nas metas de PONTOS HAB/FIN "
+                        f"de {'toda a equipe ' + equipe_selecionada if equipe_selecionada not in (None, 'Todas as Equipes') else 'todos os consultores'}."
                     )
-                    
-                    st.plotly_chart(fig, use_container_width=True, config={
-                        'displayModeBar': True,
-                        'displaylogo': False,
-                        'modeBarButtonsToRemove': ['lasso2d', 'select2d']
-                    })
-                    
-                    # Legenda compacta
-                    with st.expander("🎯 Legenda do Gráfico", expanded=False):
-                        legenda_cols = st.columns(5)
-                        with legenda_cols[0]: st.markdown("🔵 Sem meta")
-                        with legenda_cols[1]: st.markdown("🟢 Meta ≥100%")
-                        with legenda_cols[2]: st.markdown("🟩 Meta ≥80%")
-                        with legenda_cols[3]: st.markdown("🟠 Meta ≥50%")
-                        with legenda_cols[4]: st.markdown("🔴 Meta <50%")
+            
+            # Dados do consultor selecionado
+            df_filtrado = indice.linhas(df, consultor_selecionado)
+            
+            if not df_filtrado.empty:
+                if modo_largo:
+                    secao_consultor(
+                        df_filtrado, consultor_selecionado, colunas_percentuais,
+                        ler_colunas=ler_colunas, indicadores_disponiveis=indicadores_arquivo
+                    )
+                    # Tabela e exportação com os indicadores escolhidos no fragmento
+                    df_filtrado, colunas_percentuais = completar_colunas(
+                        df_filtrado, st.session_state.get('indicadores_favoritos', []),
+                        ler_colunas, colunas_percentuais
+                    )
+                else:
+                    secao_consultor(df_filtrado, consultor_selecionado, colunas_percentuais)
                 
                 # ============================================================
                 # SEÇÃO 7: TABELA COMPLETA
@@ -460,6 +440,12 @@ if uploaded_file is not None:
                 )
                 
                 if busca_indicador:
+                    if modo_largo:
+                        # Busca também nas colunas ainda não carregadas
+                        encontradas = [c for c in indicadores_arquivo if busca_indicador.upper() in c.upper()]
+                        df_filtrado, colunas_percentuais = completar_colunas(
+                            df_filtrado, encontradas, ler_colunas, colunas_percentuais
+                        )
                     colunas_filtradas = [col for col in df_filtrado.columns 
                                        if busca_indicador.upper() in col.upper()]
                     df_mostrar = df_filtrado[colunas_filtradas]
@@ -470,12 +456,10 @@ if uploaded_file is not None:
                 df_mostrar = df_mostrar.drop(columns=[c for c in colunas_remover if c in df_mostrar.columns])
                 
                 if not df_mostrar.empty:
-                    df_formatado = df_mostrar.copy()
-                    for col in df_formatado.columns:
-                        if pd.api.types.is_numeric_dtype(df_formatado[col]):
-                            df_formatado[col] = df_formatado[col].apply(lambda x: formatar_valor(x))
+                    df_formatado = formatar_dataframe(df_mostrar, colunas_percentuais)
                     
-                    st.dataframe(df_formatado, use_container_width=True, height=250)
+                    with medir("st.dataframe"):
+                        st.dataframe(df_formatado, use_container_width=True, height=250)
                 else:
                     st.warning("Nenhum indicador encontrado")
                 
@@ -488,31 +472,31 @@ if uploaded_file is not None:
                 col_acao1, col_acao2, col_acao3 = st.columns(3)
                 
                 with col_acao1:
-                    if st.button("📥 Exportar Excel", use_container_width=True):
-                        output = BytesIO()
-                        with pd.ExcelWriter(output, engine='openpyxl') as writer:
-                            df_filtrado.to_excel(writer, index=False, sheet_name='Dados')
-                            
-                            metas_consultor = []
-                            for chave, meta in st.session_state.metas.items():
-                                if consultor_selecionado in chave:
-                                    progresso = calcular_progresso_meta(
-                                        df_filtrado[meta['indicador']].iloc[0] if meta['indicador'] in df_filtrado.columns else 0,
-                                        meta['valor']
-                                    )
-                                    metas_consultor.append({
-                                        'Indicador': meta['indicador'],
-                                        'Meta': meta['valor'],
-                                        'Valor Atual': df_filtrado[meta['indicador']].iloc[0] if meta['indicador'] in df_filtrado.columns else 'N/A',
-                                        'Progresso': f"{progresso:.1f}%"
-                                    })
-                            
-                            if metas_consultor:
-                                pd.DataFrame(metas_consultor).to_excel(writer, index=False, sheet_name='Metas')
-                        
-                        output.seek(0)
-                        st.download_button("⬇️ Baixar", data=output, 
-                                         file_name=f"relatorio_{consultor_selecionado}.xlsx")
+                    # O .xlsx só é montado no clique e fica na sessão: os reruns não o geram de novo
+                    opcoes_excel = (
+                        consultor_selecionado, df.attrs.get('hash_arquivo'), tuple(df_filtrado.columns),
+                        assinatura_metas(consultor_selecionado)
+                    )
+                    if st.button("📊 Gerar Excel", key="gerar_excel_individual", use_container_width=True):
+                        st.session_state.excel_individual = {
+                            'opcoes': opcoes_excel,
+                            'dados': gerar_excel({
+                                'Dados': df_filtrado,
+                                'Metas': planilha_metas(
+                                    df_filtrado, consultor_selecionado, ler_colunas if modo_largo else None
+                                )
+                            })
+                        }
+                    
+                    gerado = st.session_state.get('excel_individual')
+                    if gerado and gerado['opcoes'] == opcoes_excel:
+                        st.download_button(
+                            "📥 Baixar Excel",
+                            data=gerado['dados'],
+                            file_name=f"relatorio_{consultor_selecionado}.xlsx",
+                            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+                            use_container_width=True
+                        )
                 
                 with col_acao2:
                     if st.button("🖨️ Imprimir", use_container_width=True):
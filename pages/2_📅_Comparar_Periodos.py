@@ -1,6 +1,8 @@
 # pages/2_📅_Comparar_Periodos.py
 import streamlit as st
 import pandas as pd
+import numpy as np
+import plotly.graph_objects as go
 from datetime import datetime
 import sys
 from pathlib import Path
@@ -8,9 +10,22 @@ from pathlib import Path
 sys.path.append(str(Path(__file__).parent.parent))
 
 from src.utils import (
-    carregar_csv, extrair_equipe_nome, formatar_valor,
+    carregar_csv, formatar_valor,
     calcular_variacao_percentual, obter_cor_variacao,
-    formatar_periodo_nome
+    formatar_periodo_nome, formatar_coluna, preparar_usuarios, esquema_csv,
+    carregar_csv_colunas, obter_indice_consultores, tabela_nomes_curtos,
+    COLUNAS_IDENTIFICACAO
+)
+from src.armazem import obter_armazem_padrao, salvar_upload
+from src.exportacao import gerar_excel
+from src.ranking import extremos
+from src.graficos import figura_variacao_equipe
+from src.perfil import iniciar_execucao, medir
+from src.historico import (
+    ordenar_periodos, empilhar_periodos, serie_consultor, serie_media
+)
+from src.comparacao import (
+    comparar_periodos, tabela_variacao, classificar_variacao_vetorizada
 )
 from src.metas import (
     inicializar_sistema_metas, obter_meta, calcular_progresso_meta,
@@ -57,10 +72,51 @@ with col_title:
 # INICIALIZAR SISTEMA
 # ============================================================================
 inicializar_sistema_metas()
+iniciar_execucao("Comparar Períodos")
 
 # ============================================================================
 # FUNÇÕES AUXILIARES
 # ============================================================================
+# Acima deste número de colunas o arquivo é lido só com os indicadores em uso
+LIMITE_COLUNAS_LARGO = 80
+
+def esquema_periodo(origem):
+    """Colunas (e numéricas) de um período enviado ou salvo, sem carregá-lo."""
+    if isinstance(origem, str):
+        return armazem.esquema(origem)
+    return esquema_csv(origem)
+
+def carregar_periodo(origem, numero, colunas=None):
+    """
+    Lê um período enviado (arquivo) ou salvo no histórico (chave) -> (df, nome).
+    Com colunas, lê só elas e as de identificação (arquivo largo).
+    """
+    if isinstance(origem, str):
+        return armazem.carregar(origem, colunas), rotulos_salvos.get(origem, origem)
+    if colunas is not None:
+        df, _ = carregar_csv_colunas(origem, colunas)
+    else:
+        df, _ = carregar_csv(origem)
+    return df, formatar_periodo_nome(origem.name, numero)
+
+def indicadores_dos_esquemas(esquemas, todos=True):
+    """Indicadores numéricos presentes em todos (ou em algum) dos esquemas."""
+    conjuntos = [set(e['numericas']) - set(COLUNAS_IDENTIFICACAO) for e in esquemas]
+    if not conjuntos:
+        return []
+    return sorted(set.intersection(*conjuntos) if todos else set.union(*conjuntos))
+
+def alternar_modo_largo(esquemas):
+    """Toggle do modo arquivo largo, exibido só quando algum arquivo é largo."""
+    maior = max(len(e['colunas']) for e in esquemas)
+    if maior <= LIMITE_COLUNAS_LARGO:
+        return False
+    return st.toggle(
+        f"⚡ Arquivo largo ({maior} colunas): carregar só os indicadores em uso",
+        value=True,
+        key="modo_largo"
+    )
+
 def safe_float(valor, default=0.0):
     try:
         if pd.isna(valor) or valor is None:
@@ -79,49 +135,194 @@ def safe_formatar_valor(valor):
 # ============================================================================
 # UPLOAD DOS ARQUIVOS
 # ============================================================================
+armazem = obter_armazem_padrao()
+periodos_salvos = armazem.periodos() if armazem else []
+rotulos_salvos = {p['chave']: p['rotulo'] for p in periodos_salvos}
+
 with st.container(border=True):
     st.markdown("### 📁 Carregar arquivos")
-    st.caption("Dois arquivos CSV com a mesma estrutura (coluna USUÁRIO)")
+    col_modo, col_origem = st.columns(2)
+    with col_modo:
+        modo_upload = st.radio(
+            "Modo",
+            ["📅 Dois períodos", "📈 Série histórica"],
+            horizontal=True,
+            key="modo_upload",
+            label_visibility="collapsed"
+        )
+    with col_origem:
+        origem = "📁 Enviar CSV"
+        if periodos_salvos:
+            origem = st.radio(
+                "Origem",
+                ["📁 Enviar CSV", "🗄️ Histórico salvo"],
+                horizontal=True,
+                key="origem_comp",
+                label_visibility="collapsed"
+            )
     
-    col1, col2 = st.columns(2)
-    with col1:
-        file1 = st.file_uploader("Primeiro período", type="csv", key="per1")
-    with col2:
-        file2 = st.file_uploader("Segundo período", type="csv", key="per2")
+    chaves_salvas = list(rotulos_salvos)
+    if modo_upload == "📈 Série histórica":
+        file1 = file2 = None
+        if origem == "🗄️ Histórico salvo":
+            arquivos_serie = st.multiselect(
+                "Períodos salvos",
+                chaves_salvas,
+                default=chaves_salvas,
+                format_func=rotulos_salvos.get,
+                key="per_n_salvo"
+            )
+        else:
+            st.caption("Vários CSVs mensais com a mesma estrutura (o mês/ano vem do nome do arquivo)")
+            arquivos_serie = st.file_uploader("Períodos", type="csv", key="per_n", accept_multiple_files=True)
+    else:
+        arquivos_serie = None
+        col1, col2 = st.columns(2)
+        if origem == "🗄️ Histórico salvo":
+            with col1:
+                file1 = st.selectbox(
+                    "Primeiro período", chaves_salvas,
+                    index=max(len(chaves_salvas) - 2, 0),
+                    format_func=rotulos_salvos.get, key="per1_salvo"
+                )
+            with col2:
+                file2 = st.selectbox(
+                    "Segundo período", chaves_salvas,
+                    index=len(chaves_salvas) - 1,
+                    format_func=rotulos_salvos.get, key="per2_salvo"
+                )
+        else:
+            st.caption("Dois arquivos CSV com a mesma estrutura (coluna USUÁRIO)")
+            with col1:
+                file1 = st.file_uploader("Primeiro período", type="csv", key="per1")
+            with col2:
+                file2 = st.file_uploader("Segundo período", type="csv", key="per2")
+    
+    # Guardar os CSVs enviados no histórico local para as próximas sessões
+    enviados = [a for a in (arquivos_serie or [file1, file2]) if a and not isinstance(a, str)]
+    if armazem is not None and enviados:
+        if st.button("💾 Salvar no histórico", key="salvar_historico_comp"):
+            chaves = [salvar_upload(armazem, a, carregar_csv(a)[0]) for a in enviados]
+            st.toast(f"Períodos salvos: {', '.join(chaves)}", icon="💾")
+
+# ============================================================================
+# SÉRIE HISTÓRICA (N ARQUIVOS)
+# ============================================================================
+if modo_upload == "📈 Série histórica":
+    if not arquivos_serie or len(arquivos_serie) < 2:
+        st.info("📁 Carregue ao menos dois arquivos mensais")
+        st.stop()
+    
+    esquemas_serie = [esquema_periodo(a) for a in arquivos_serie]
+    modo_largo = alternar_modo_largo(esquemas_serie)
+    colunas_serie = None
+    if modo_largo:
+        colunas_serie = st.session_state.get('indicadores_serie', [])
+    
+    with st.spinner("🔄 Montando série histórica..."):
+        carregados = []
+        for numero, arquivo in enumerate(arquivos_serie, start=1):
+            df_mes, nome_mes = carregar_periodo(arquivo, numero, colunas_serie)
+            df_mes = preparar_usuarios(df_mes)
+            if df_mes is None:
+                st.warning(f"⚠️ {nome_mes}: coluna 'USUÁRIO' não encontrada (ignorado)")
+                continue
+            # Para arquivos enviados o nome original ordena melhor que o rótulo
+            carregados.append((getattr(arquivo, 'name', nome_mes), df_mes))
+        
+        periodos = ordenar_periodos(carregados)
+        historico = empilhar_periodos(periodos, colunas_serie)
+    
+    if modo_largo:
+        opcoes_indicadores = indicadores_dos_esquemas(esquemas_serie, todos=False)
+    elif historico.empty:
+        st.error("❌ Nenhum dado numérico encontrado nos arquivos")
+        st.stop()
+    else:
+        opcoes_indicadores = list(historico['indicador'].cat.categories)
+    
+    st.divider()
+    with st.container(border=True):
+        st.markdown(f"### 📈 Série histórica • {len(periodos)} períodos")
+        st.caption(" → ".join(rotulo for rotulo, _ in periodos))
+        
+        col_s1, col_s2 = st.columns(2)
+        with col_s1:
+            consultores_serie = sorted(set().union(*(df_mes['USUARIO'] for _, df_mes in periodos)))
+            opcoes_serie = ["📊 Média de todos"] + consultores_serie
+            alvo_serie = st.selectbox("Consultor", opcoes_serie, key="cons_serie")
+        with col_s2:
+            indicadores_serie = st.multiselect(
+                "Indicadores",
+                opcoes_indicadores,
+                key="indicadores_serie",
+                placeholder="Selecione os indicadores..."
+            )
+    
+    if not indicadores_serie:
+        st.info("👆 Selecione ao menos um indicador")
+        st.stop()
+    
+    if alvo_serie == "📊 Média de todos":
+        tabela_serie = serie_media(historico, indicadores_serie)
+    else:
+        tabela_serie = serie_consultor(historico, alvo_serie, indicadores_serie)
+    
+    fig = go.Figure()
+    for indicador in tabela_serie.columns:
+        fig.add_trace(go.Scatter(
+            x=tabela_serie.index.astype(str),
+            y=tabela_serie[indicador],
+            mode='lines+markers',
+            name=criar_nome_curto_grafico(indicador),
+            connectgaps=False,
+            hovertemplate=f'<b>{indicador}</b><br>%{{x}}: %{{y:,.2f}}<extra></extra>'
+        ))
+    fig.update_layout(
+        height=420,
+        margin=dict(l=5, r=5, t=30, b=30),
+        plot_bgcolor='white',
+        paper_bgcolor='white',
+        hovermode='x unified',
+        legend=dict(orientation='h', y=-0.15)
+    )
+    st.plotly_chart(fig, use_container_width=True)
+    
+    st.dataframe(tabela_serie.T.round(2), use_container_width=True)
+    st.stop()
 
 if file1 and file2:
+    # Arquivo largo: só identificação + indicadores em uso (o resto sob demanda)
+    esquemas = [esquema_periodo(file1), esquema_periodo(file2)]
+    modo_largo = alternar_modo_largo(esquemas)
+    indicadores_arquivo = indicadores_dos_esquemas(esquemas)
+    colunas_largo = None
+    if modo_largo:
+        colunas_largo = st.session_state.get('indicadores_selecionados') or indicadores_arquivo[:4]
+        if st.session_state.get('modo_comp') == "Equipe inteira":
+            colunas_largo = colunas_largo + (st.session_state.get('indicadores_matriz') or indicadores_arquivo[:15])
+    
     with st.spinner("🔄 Processando comparação..."):
         # ====================================================================
         # CARREGAR DADOS
         # ====================================================================
-        df1, _ = carregar_csv(file1)
-        df2, _ = carregar_csv(file2)
-        
-        periodo1_nome = formatar_periodo_nome(file1.name, 1) or "Período 1"
-        periodo2_nome = formatar_periodo_nome(file2.name, 2) or "Período 2"
+        df1, periodo1_nome = carregar_periodo(file1, 1, colunas_largo)
+        df2, periodo2_nome = carregar_periodo(file2, 2, colunas_largo)
+        periodo1_nome = periodo1_nome or "Período 1"
+        periodo2_nome = periodo2_nome or "Período 2"
         
-        # Padronizar coluna de usuário
-        for df in [df1, df2]:
-            for col in df.columns:
-                if any(t in str(col).upper() for t in ['USUÁRIO', 'USUARIO', 'CONSULTOR']):
-                    df.rename(columns={col: 'USUARIO'}, inplace=True)
-                    break
+        # Padronizar USUARIO/EQUIPE/NOME_PURO e indexar consultores (em cache por arquivo)
+        df1 = preparar_usuarios(df1)
+        df2 = preparar_usuarios(df2)
         
-        if 'USUARIO' in df1.columns and 'USUARIO' in df2.columns:
-            # Processar nomes e equipes
-            for df in [df1, df2]:
-                df['USUARIO'] = df['USUARIO'].astype(str).str.strip()
-                df = df[~df['USUARIO'].isin(['', 'nan', 'NaN', 'None'])]
-                df[['EQUIPE', 'NOME_PURO']] = df['USUARIO'].apply(
-                    lambda x: pd.Series(extrair_equipe_nome(x))
-                )
+        if df1 is not None and df2 is not None:
+            indice1 = obter_indice_consultores(df1)
+            indice2 = obter_indice_consultores(df2)
             
             # ====================================================================
             # SELEÇÃO DE CONSULTOR
             # ====================================================================
-            consultores1 = set(df1['USUARIO'].unique())
-            consultores2 = set(df2['USUARIO'].unique())
-            consultores_comuns = sorted(list(consultores1 & consultores2))
+            consultores_comuns = sorted(set(indice1.posicoes) & set(indice2.posicoes))
             consultores_comuns = [c for c in consultores_comuns if c and str(c).lower() not in ['nan', 'none', '']]
             
             if consultores_comuns:
@@ -133,9 +334,7 @@ if file1 and file2:
                     col_eq, col_cons = st.columns(2)
                     
                     with col_eq:
-                        equipes_df1 = df1['EQUIPE'].dropna().unique()
-                        equipes_df2 = df2['EQUIPE'].dropna().unique()
-                        equipes_comuns = list(set(equipes_df1) & set(equipes_df2))
+                        equipes_comuns = list(set(indice1.equipes) & set(indice2.equipes))
                         equipes_comuns = [str(e) for e in equipes_comuns if str(e).strip()]
                         
                         if equipes_comuns:
@@ -147,19 +346,21 @@ if file1 and file2:
                     with col_eq if equipes_comuns else col_cons:
                         modo_comp = st.radio(
                             "🔄 Comparar",
-                            ["Mesmo consultor", "Consultores diferentes"],
+                            ["Mesmo consultor", "Consultores diferentes", "Equipe inteira"],
                             horizontal=True,
                             key="modo_comp"
                         )
                     
                     with col_cons:
-                        if modo_comp == "Mesmo consultor":
-                            if equipe_filtro != 'Todas' and equipes_comuns:
-                                cons_filtrados = df1[df1['EQUIPE'] == equipe_filtro]['USUARIO'].unique()
-                                cons_filtrados = [c for c in cons_filtrados if c in consultores_comuns]
-                            else:
-                                cons_filtrados = consultores_comuns
-                            
+                        if equipe_filtro != 'Todas' and equipes_comuns:
+                            comuns = set(consultores_comuns)
+                            cons_filtrados = [c for c in indice1.consultores_da_equipe(equipe_filtro) if c in comuns]
+                        else:
+                            cons_filtrados = consultores_comuns
+                        
+                        if modo_comp == "Equipe inteira":
+                            st.metric("Consultores na comparação", len(cons_filtrados))
+                        elif modo_comp == "Mesmo consultor":
                             if cons_filtrados:
                                 consultor = st.selectbox("Consultor", sorted(cons_filtrados), key="cons_unico")
                                 consultor1 = consultor2 = consultor
@@ -174,11 +375,80 @@ if file1 and file2:
                                 cons2_opcoes = [c for c in consultores_comuns if c != consultor1]
                                 consultor2 = st.selectbox("Consultor 2", cons2_opcoes, key="cons_b")
                 
+                # ====================================================================
+                # MODO EQUIPE INTEIRA: MATRIZ CONSULTORES × INDICADORES
+                # ====================================================================
+                if modo_comp == "Equipe inteira":
+                    st.divider()
+                    st.markdown(f"### 🗺️ Variação da equipe • {periodo1_nome} → {periodo2_nome}")
+                    
+                    if modo_largo:
+                        indicadores_equipe = indicadores_arquivo
+                    else:
+                        indicadores_equipe = sorted(
+                            (set(df1.select_dtypes(include=['number']).columns)
+                             & set(df2.select_dtypes(include=['number']).columns))
+                            - set(COLUNAS_IDENTIFICACAO)
+                        )
+                    indicadores_matriz = st.multiselect(
+                        "Indicadores",
+                        indicadores_equipe,
+                        default=indicadores_equipe[:15],
+                        key="indicadores_matriz",
+                        placeholder="Selecione os indicadores..."
+                    )
+                    
+                    if not cons_filtrados or not indicadores_matriz:
+                        st.info("👆 Selecione ao menos um indicador")
+                        st.stop()
+                    
+                    # Uma única passada vetorizada para todos os consultores × indicadores
+                    resultado_equipe = comparar_periodos(
+                        df1, df2, indicadores_matriz,
+                        pares=[(c, c) for c in sorted(cons_filtrados)],
+                        indice1=indice1,
+                        indice2=indice2
+                    )
+                    tabela = tabela_variacao(resultado_equipe)
+                    faixas = classificar_variacao_vetorizada(tabela.to_numpy())
+                    
+                    col_r1, col_r2, col_r3 = st.columns(3)
+                    with col_r1:
+                        st.metric("📈 Acima de +5%", int((faixas == 1).sum()))
+                    with col_r2:
+                        st.metric("➡️ Entre ±5%", int((faixas == 0).sum()))
+                    with col_r3:
+                        st.metric("📉 Abaixo de -5%", int((faixas == -1).sum()))
+                    
+                    # Heatmap nas mesmas faixas de obter_cor_variacao (±5%); equipes grandes em blocos
+                    fig, tamanho_bloco = figura_variacao_equipe(tabela)
+                    if tamanho_bloco > 1:
+                        st.caption(
+                            f"{len(tabela)} consultores ordenados pela variação média e agrupados em blocos "
+                            f"de {tamanho_bloco}: cada linha mostra a média do bloco. A tabela abaixo tem todos."
+                        )
+                    with medir("plotly_chart"):
+                        st.plotly_chart(fig, use_container_width=True)
+                    
+                    # Tabela ordenável (clique no cabeçalho); média para ordenar o geral
+                    tabela_exibir = tabela.copy()
+                    tabela_exibir.insert(0, 'Média variação %', tabela.mean(axis=1).round(1))
+                    tabela_exibir = tabela_exibir.sort_values('Média variação %', ascending=False)
+                    st.dataframe(
+                        tabela_exibir,
+                        use_container_width=True,
+                        column_config={
+                            col: st.column_config.NumberColumn(col, format="%+.1f%%")
+                            for col in tabela_exibir.columns
+                        }
+                    )
+                    st.stop()
+                
                 # ====================================================================
                 # CARDS DOS PERÍODOS (único HTML permitido)
                 # ====================================================================
-                df1_filtrado = df1[df1['USUARIO'] == consultor1].copy()
-                df2_filtrado = df2[df2['USUARIO'] == consultor2].copy()
+                df1_filtrado = indice1.linhas(df1, consultor1)
+                df2_filtrado = indice2.linhas(df2, consultor2)
                 
                 if not df1_filtrado.empty and not df2_filtrado.empty:
                     st.divider()
@@ -199,7 +469,7 @@ if file1 and file2:
                             </div>
                             <div style="font-size: 28px; font-weight: 700; margin-bottom: 4px;">{consultor1}</div>
                             <div style="color: rgba(255,255,255,0.7); font-size: 14px;">
-                                {len(df1_filtrado.select_dtypes(include=['number']).columns)} indicadores
+                                {len(esquemas[0]['numericas']) if modo_largo else len(df1_filtrado.select_dtypes(include=['number']).columns)} indicadores
                             </div>
                         </div>
                         """, unsafe_allow_html=True)
@@ -218,7 +488,7 @@ if file1 and file2:
                             </div>
                             <div style="font-size: 28px; font-weight: 700; margin-bottom: 4px;">{consultor2}</div>
                             <div style="color: rgba(255,255,255,0.7); font-size: 14px;">
-                                {len(df2_filtrado.select_dtypes(include=['number']).columns)} indicadores
+                                {len(esquemas[1]['numericas']) if modo_largo else len(df2_filtrado.select_dtypes(include=['number']).columns)} indicadores
                             </div>
                         </div>
                         """, unsafe_allow_html=True)
@@ -233,23 +503,15 @@ if file1 and file2:
                     nums1 = df1_filtrado.select_dtypes(include=['number']).columns.tolist()
                     nums2 = df2_filtrado.select_dtypes(include=['number']).columns.tolist()
                     
-                    cvs_cols = []
-                    for col in df1_filtrado.columns:
-                        if 'CVS' in col.upper() or 'CALLBACK' in col.upper():
-                            if col not in nums1:
-                                cvs_cols.append(col)
-                                df1_filtrado[col] = pd.to_numeric(
-                                    df1_filtrado[col].astype(str).str.replace(',', '.').str.replace('%', ''),
-                                    errors='coerce'
-                                )
-                                df2_filtrado[col] = pd.to_numeric(
-                                    df2_filtrado[col].astype(str).str.replace(',', '.').str.replace('%', ''),
-                                    errors='coerce'
-                                )
-                    
-                    indicadores_comuns = sorted(list(set(nums1 + cvs_cols) & set(nums2)))
+                    # CVS/CALLBACK com vírgula ou '%' já vêm como número de carregar_csv
+                    indicadores_comuns = sorted(list(set(nums1) & set(nums2)))
+                    if modo_largo:
+                        # Opções vêm do cabeçalho; a coluna é lida ao ser adicionada
+                        indicadores_comuns = indicadores_arquivo
+                    colunas_percentuais = set(df1.attrs.get('colunas_percentuais', [])) | set(df2.attrs.get('colunas_percentuais', []))
                     excluir = ['USUARIO', 'EQUIPE', 'NOME_PURO']
                     indicadores_comuns = [i for i in indicadores_comuns if i not in excluir]
+                    nomes_curtos_comuns = tabela_nomes_curtos(indicadores_comuns)
                     
                     # Session state
                     if 'indicadores_selecionados' not in st.session_state:
@@ -266,7 +528,7 @@ if file1 and file2:
                             resultados = [i for i in indicadores_comuns if busca.upper() in i.upper()]
                             if resultados:
                                 for ind in resultados[:6]:
-                                    nome_curto = criar_nome_curto_grafico(ind)
+                                    nome_curto = nomes_curtos_comuns[ind]
                                     if st.button(f"➕ {nome_curto}", key=f"add_{ind}", use_container_width=True):
                                         if ind not in st.session_state.indicadores_selecionados:
                                             st.session_state.indicadores_selecionados.append(ind)
@@ -306,47 +568,36 @@ if file1 and file2:
                         # ====================================================================
                         # PROCESSAR DADOS (uma vez só)
                         # ====================================================================
-                        dados_cards = []
-                        for indicador in indicadores_selecionados:
-                            if indicador in df1_filtrado.columns and indicador in df2_filtrado.columns:
-                                v1 = safe_float(df1_filtrado[indicador].iloc[0])
-                                v2 = safe_float(df2_filtrado[indicador].iloc[0])
-                                
-                                variacao = calcular_variacao_percentual(v1, v2)
-                                
-                                # Metas
-                                meta1 = None
-                                if 'EQUIPE' in df1_filtrado.columns:
-                                    meta1 = obter_meta(indicador, consultor1, df1_filtrado['EQUIPE'].iloc[0])
-                                else:
-                                    meta1 = obter_meta(indicador, consultor1)
-                                
-                                meta2 = None
-                                if 'EQUIPE' in df2_filtrado.columns:
-                                    meta2 = obter_meta(indicador, consultor2, df2_filtrado['EQUIPE'].iloc[0])
-                                else:
-                                    meta2 = obter_meta(indicador, consultor2)
-                                
-                                prog1 = calcular_progresso_meta(v1, meta1['valor']) if meta1 else None
-                                prog2 = calcular_progresso_meta(v2, meta2['valor']) if meta2 else None
-                                
-                                dados_cards.append({
-                                    'indicador': indicador,
-                                    'nome_curto': criar_nome_curto_grafico(indicador),
-                                    'v1': v1,
-                                    'v2': v2,
-                                    'v1_fmt': safe_formatar_valor(v1),
-                                    'v2_fmt': safe_formatar_valor(v2),
-                                    'variacao': variacao,
-                                    'meta1': meta1,
-                                    'meta2': meta2,
-                                    'meta1_fmt': safe_formatar_valor(meta1['valor']) if meta1 else None,
-                                    'meta2_fmt': safe_formatar_valor(meta2['valor']) if meta2 else None,
-                                    'prog1': prog1,
-                                    'prog2': prog2,
-                                    'equipe1': df1_filtrado['EQUIPE'].iloc[0] if 'EQUIPE' in df1_filtrado.columns else None,
-                                    'equipe2': df2_filtrado['EQUIPE'].iloc[0] if 'EQUIPE' in df2_filtrado.columns else None
-                                })
+                        # Motor vetorizado: todos os indicadores de uma vez
+                        resultado = comparar_periodos(
+                            df1_filtrado, df2_filtrado, indicadores_selecionados,
+                            st.session_state.metas, pares=[(consultor1, consultor2)]
+                        )
+                        indicadores_validos = resultado['indicadores']
+                        v1s, v2s = resultado['v1'][0], resultado['v2'][0]
+                        metas1, metas2 = resultado['meta1'][0], resultado['meta2'][0]
+                        progs1, progs2 = resultado['prog1'][0], resultado['prog2'][0]
+                        v1_fmts, v2_fmts = formatar_coluna(v1s), formatar_coluna(v2s)
+                        meta1_fmts, meta2_fmts = formatar_coluna(metas1), formatar_coluna(metas2)
+                        
+                        dados_cards = [{
+                            'indicador': indicador,
+                            'nome_curto': criar_nome_curto_grafico(indicador),
+                            'formato': 'porcentagem' if indicador in colunas_percentuais else 'auto',
+                            'v1': float(v1s[j]),
+                            'v2': float(v2s[j]),
+                            'v1_fmt': v1_fmts[j],
+                            'v2_fmt': v2_fmts[j],
+                            'variacao': float(resultado['variacao'][0][j]),
+                            'meta1': None if np.isnan(metas1[j]) else float(metas1[j]),
+                            'meta2': None if np.isnan(metas2[j]) else float(metas2[j]),
+                            'meta1_fmt': None if np.isnan(metas1[j]) else meta1_fmts[j],
+                            'meta2_fmt': None if np.isnan(metas2[j]) else meta2_fmts[j],
+                            'prog1': None if np.isnan(progs1[j]) else float(progs1[j]),
+                            'prog2': None if np.isnan(progs2[j]) else float(progs2[j]),
+                            'equipe1': resultado['equipes1'][0],
+                            'equipe2': resultado['equipes2'][0]
+                        } for j, indicador in enumerate(indicadores_validos)]
                         
                         if dados_cards:
                             # Ordenar por impacto
@@ -373,7 +624,9 @@ if file1 and file2:
                                                 card['v1'], 
                                                 card['indicador'], 
                                                 consultor1, 
-                                                card['equipe1']
+                                                card['equipe1'],
+                                                card['formato'],
+                                                contexto='p1'
                                             )
                                         with col_p2:
                                             st.markdown(f":orange[📅 {periodo2_nome}]")
@@ -381,7 +634,9 @@ if file1 and file2:
                                                 card['v2'], 
                                                 card['indicador'], 
                                                 consultor2, 
-                                                card['equipe2']
+                                                card['equipe2'],
+                                                card['formato'],
+                                                contexto='p2'
                                             )
                                         
                                         if card['variacao'] > 5:
@@ -405,7 +660,9 @@ if file1 and file2:
                                                     card['v1'], 
                                                     card['indicador'], 
                                                     consultor1, 
-                                                    card['equipe1']
+                                                    card['equipe1'],
+                                                    card['formato'],
+                                                    contexto='p1'
                                                 )
                                             with col_p2:
                                                 st.markdown(f":orange[📅 {periodo2_nome}]")
@@ -413,7 +670,9 @@ if file1 and file2:
                                                     card['v2'], 
                                                     card['indicador'], 
                                                     consultor2, 
-                                                    card['equipe2']
+                                                    card['equipe2'],
+                                                    card['formato'],
+                                                    contexto='p2'
                                                 )
                                             
                                             if card['variacao'] > 5:
@@ -441,7 +700,7 @@ if file1 and file2:
                                         with col_m1:
                                             st.markdown(f":blue[**{periodo1_nome}**]")
                                             st.metric("Realizado", card['v1_fmt'])
-                                            if card['meta1']:
+                                            if card['meta1'] is not None:
                                                 st.markdown(f"🎯 Meta: {card['meta1_fmt']}")
                                                 if card['prog1'] and card['prog1'] >= 100:
                                                     st.success(f"✅ {card['prog1']:.0f}%")
@@ -453,7 +712,7 @@ if file1 and file2:
                                         with col_m2:
                                             st.markdown(f":orange[**{periodo2_nome}**]")
                                             st.metric("Realizado", card['v2_fmt'])
-                                            if card['meta2']:
+                                            if card['meta2'] is not None:
                                                 st.markdown(f"🎯 Meta: {card['meta2_fmt']}")
                                                 if card['prog2'] and card['prog2'] >= 100:
                                                     st.success(f"✅ {card['prog2']:.0f}%")
@@ -472,7 +731,7 @@ if file1 and file2:
                                             with col_m1:
                                                 st.markdown(f":blue[**{periodo1_nome}**]")
                                                 st.metric("Realizado", card['v1_fmt'])
-                                                if card['meta1']:
+                                                if card['meta1'] is not None:
                                                     st.markdown(f"🎯 Meta: {card['meta1_fmt']}")
                                                     if card['prog1'] and card['prog1'] >= 100:
                                                         st.success(f"✅ {card['prog1']:.0f}%")
@@ -484,7 +743,7 @@ if file1 and file2:
                                             with col_m2:
                                                 st.markdown(f":orange[**{periodo2_nome}**]")
                                                 st.metric("Realizado", card['v2_fmt'])
-                                                if card['meta2']:
+                                                if card['meta2'] is not None:
                                                     st.markdown(f"🎯 Meta: {card['meta2_fmt']}")
                                                     if card['prog2'] and card['prog2'] >= 100:
                                                         st.success(f"✅ {card['prog2']:.0f}%")
@@ -551,11 +810,14 @@ if file1 and file2:
                             st.divider()
                             st.markdown("### ⚡ Destaques")
                             
-                            variacoes = [d['variacao'] for d in dados_cards]
-                            melhor = max(variacoes) if variacoes else 0
-                            pior = min(variacoes) if variacoes else 0
-                            melhor_idx = variacoes.index(melhor) if variacoes else 0
-                            pior_idx = variacoes.index(pior) if variacoes else 0
+                            # Seleção parcial (src.ranking); empate fica com o primeiro, como max/index
+                            variacoes = np.array([d['variacao'] for d in dados_cards], dtype='float64')
+                            melhor_idx, pior_idx, melhor, pior = 0, 0, 0, 0
+                            if len(variacoes):
+                                linhas, valores_ext = extremos(variacoes, 1, maiores=True)
+                                melhor_idx, melhor = int(linhas[0, 0]), float(valores_ext[0, 0])
+                                linhas, valores_ext = extremos(variacoes, 1, maiores=False)
+                                pior_idx, pior = int(linhas[0, 0]), float(valores_ext[0, 0])
                             metas_atingidas = sum(1 for d in dados_cards if d['prog2'] and d['prog2'] >= 100)
                             
                             col_d1, col_d2, col_d3, col_d4 = st.columns(4)
@@ -595,39 +857,44 @@ if file1 and file2:
                             col_act1, col_act2 = st.columns(2)
                             
                             with col_act1:
-                                if st.button("📥 Exportar Excel", use_container_width=True):
-                                    from io import BytesIO
+                                # O .xlsx só é montado no clique e fica na sessão: os reruns não o geram de novo
+                                opcoes_excel = (consultor1, consultor2, periodo1_nome, periodo2_nome, tuple(
+                                    (d['indicador'], d['v1_fmt'], d['meta1_fmt'], d['v2_fmt'], d['meta2_fmt']) for d in dados_cards
+                                ))
+                                if st.button("📊 Gerar Excel", key="gerar_excel_comparativo", use_container_width=True):
+                                    df_export = pd.DataFrame([{
+                                        'Indicador': d['indicador'],
+                                        f'{periodo1_nome}': d['v1_fmt'],
+                                        f'Meta {periodo1_nome}': d['meta1_fmt'] if d['meta1_fmt'] else '—',
+                                        f'{periodo2_nome}': d['v2_fmt'],
+                                        f'Meta {periodo2_nome}': d['meta2_fmt'] if d['meta2_fmt'] else '—',
+                                        'Variação %': f"{d['variacao']:+.1f}%",
+                                        'Progresso P1': f"{d['prog1']:.0f}%" if d['prog1'] else '—',
+                                        'Progresso P2': f"{d['prog2']:.0f}%" if d['prog2'] else '—'
+                                    } for d in dados_cards])
                                     
-                                    output = BytesIO()
-                                    with pd.ExcelWriter(output, engine='openpyxl') as writer:
-                                        df_export = pd.DataFrame([{
-                                            'Indicador': d['indicador'],
-                                            f'{periodo1_nome}': d['v1_fmt'],
-                                            f'Meta {periodo1_nome}': d['meta1_fmt'] if d['meta1_fmt'] else '—',
-                                            f'{periodo2_nome}': d['v2_fmt'],
-                                            f'Meta {periodo2_nome}': d['meta2_fmt'] if d['meta2_fmt'] else '—',
-                                            'Variação %': f"{d['variacao']:+.1f}%",
-                                            'Progresso P1': f"{d['prog1']:.0f}%" if d['prog1'] else '—',
-                                            'Progresso P2': f"{d['prog2']:.0f}%" if d['prog2'] else '—'
-                                        } for d in dados_cards])
-                                        
-                                        df_export.to_excel(writer, index=False, sheet_name='Comparativo')
-                                        
-                                        pd.DataFrame([{
-                                            'Consultor 1': consultor1,
-                                            'Consultor 2': consultor2,
-                                            'Período 1': periodo1_nome,
-                                            'Período 2': periodo2_nome,
-                                            'Data': datetime.now().strftime('%d/%m/%Y %H:%M'),
-                                            'Total Indicadores': len(dados_cards),
-                                            'Metas Atingidas': metas_atingidas
-                                        }]).to_excel(writer, index=False, sheet_name='Resumo')
+                                    df_resumo = pd.DataFrame([{
+                                        'Consultor 1': consultor1,
+                                        'Consultor 2': consultor2,
+                                        'Período 1': periodo1_nome,
+                                        'Período 2': periodo2_nome,
+                                        'Data': datetime.now().strftime('%d/%m/%Y %H:%M'),
+                                        'Total Indicadores': len(dados_cards),
+                                        'Metas Atingidas': metas_atingidas
+                                    }])
                                     
-                                    output.seek(0)
+                                    st.session_state.excel_comparativo = {
+                                        'opcoes': opcoes_excel,
+                                        'dados': gerar_excel({'Comparativo': df_export, 'Resumo': df_resumo})
+                                    }
+                                
+                                gerado = st.session_state.get('excel_comparativo')
+                                if gerado and gerado['opcoes'] == opcoes_excel:
                                     st.download_button(
-                                        "⬇️ Baixar relatório",
-                                        data=output,
+                                        "📥 Baixar Excel",
+                                        data=gerado['dados'],
                                         file_name=f"comparativo_{consultor1}_vs_{consultor2}.xlsx",
+                                        mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
                                         use_container_width=True
                                     )
                             
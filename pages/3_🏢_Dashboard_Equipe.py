@@ -1,77 +1,356 @@
 import streamlit as st
+import pandas as pd
+import plotly.graph_objects as go
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from src.utils import carregar_csv, preparar_usuarios, formatar_coluna
+from src.armazem import obter_armazem_padrao
+from src.equipe import (
+    agregar_equipes, resumo_indicador, ranking_indicador, lideres_por_indicador,
+    progresso_metas_equipes, relatorio_metas
+)
+from src.exportacao import (
+    excel_relatorio_equipe, zip_csv_relatorio_equipe, LIMITE_ABAS_CONSULTOR, LIMITE_LINHAS_EXCEL
+)
+from src.perfil import iniciar_execucao
+from src.metas import (
+    inicializar_sistema_metas, criar_nome_curto_grafico, obter_cor_progresso_grafico
+)
+
+# ============================================================================
+# FUNÇÕES AUXILIARES
+# ============================================================================
+def assinatura_metas(indicadores, equipe=None):
+    """Metas dos indicadores (e da equipe) como tupla comparável (para invalidar o relatório)."""
+    return tuple(sorted(
+        (chave, meta['valor'])
+        for indicador in indicadores
+        for chave, meta in st.session_state.metas.por_indicador(indicador).items()
+        if equipe is None or meta['equipe'] == equipe
+    ))
 
 # ============================================================================
 # PÁGINA: DASHBOARD DA EQUIPE
 # ============================================================================
+st.set_page_config(page_title="Dashboard da Equipe", page_icon="🏢", layout="wide")
 st.title("🏢 Dashboard da Equipe")
 
-st.info("""
-## 🚀 **Em desenvolvimento - versão 2.2**
-
-### **Funcionalidades planejadas:**
-
-#### 📊 **Visão Geral da Equipe**
-- Ranking de performance
-- Médias por equipe
-- Distribuição de indicadores
-- Progresso das metas coletivas
-
-#### 🏆 **Análise Comparativa**
-- Equipe vs Equipe
-- Médias do mês vs histórico
-- Top performers
-- Áreas de melhoria
-
-#### 📈 **Tendências e Insights**
-- Evolução temporal
-- Correlação entre indicadores
-- Detecção de padrões
-- Alertas automáticos
-
-#### ⚙️ **Gestão de Equipe**
-- Definição de metas coletivas
-- Monitoramento em tempo real
-- Relatórios automáticos
-- Compartilhamento de dashboards
-
----
-
-### **Próximos passos:**
-1. ✅ Sistema de metas individual (v2.1)
-2. 🔄 Dashboard da equipe (v2.2) 
-3. 📊 Análise preditiva (v2.3)
-4. 🤖 Alertas inteligentes (v2.4)
-
-**Previsão de lançamento:** Março 2024
-""")
-
-# Placeholder para futura implementação
-with st.expander("🔮 Prévia das funcionalidades"):
-    st.markdown("""
-    ### 📊 Exemplo de Dashboard Futuro
+inicializar_sistema_metas()
+iniciar_execucao("Dashboard da Equipe")
+
+# ============================================================================
+# CARREGAR ARQUIVO (upload ou histórico local)
+# ============================================================================
+armazem = obter_armazem_padrao()
+periodos_salvos = armazem.periodos() if armazem else []
+rotulos_salvos = {p['chave']: p['rotulo'] for p in periodos_salvos}
+chave_salva = None
+arquivo = None
+
+with st.container(border=True):
+    st.markdown("### 📁 Carregar arquivo do mês")
+    origem = "📁 Enviar CSV"
+    if periodos_salvos:
+        origem = st.radio(
+            "Origem",
+            ["📁 Enviar CSV", "🗄️ Histórico salvo"],
+            horizontal=True,
+            key="origem_equipe",
+            label_visibility="collapsed"
+        )
+    
+    if origem == "🗄️ Histórico salvo":
+        chave_salva = st.selectbox(
+            "Período salvo:",
+            list(rotulos_salvos),
+            index=len(rotulos_salvos) - 1,
+            format_func=rotulos_salvos.get,
+            key="periodo_salvo_equipe"
+        )
+    else:
+        arquivo = st.file_uploader("Arquivo CSV com todos os consultores", type="csv", key="upload_equipe")
+
+if arquivo is None and not chave_salva:
+    with st.expander("💡 Como usar", expanded=True):
+        st.markdown("""
+        1. **Carregue o CSV do mês** (o mesmo da Visão Individual)
+        2. **Escolha um indicador** para ver médias, distribuição e ranking por equipe
+        3. **Acompanhe as metas coletivas** definidas nas outras páginas
+        """)
+    st.stop()
+
+with st.spinner("📊 Calculando indicadores da equipe..."):
+    if arquivo is not None:
+        df, _ = carregar_csv(arquivo)
+    else:
+        df = armazem.carregar(chave_salva)
     
-    ```python
-    # Código futuro para dashboard da equipe
-    def criar_dashboard_equipe(df):
-        # 1. Ranking de consultores
-        # 2. Médias por equipe  
-        # 3. Gráficos comparativos
-        # 4. Análise de tendências
-        pass
-    ```
+    colunas_percentuais = df.attrs.get('colunas_percentuais', [])
+    df = preparar_usuarios(df)
+    if df is None:
+        st.error("❌ Coluna de consultor não encontrada")
+        st.stop()
     
-    ### 📈 Métricas Planejadas:
-    - **Eficiência média**: Tempo por venda
-    - **Qualidade média**: Índice de satisfação
-    - **Produtividade**: Vendas por hora
-    - **Crescimento**: Evolução mês a mês
+    # Todas as estatísticas de todos os indicadores numéricos (em cache por arquivo)
+    agregado = agregar_equipes(df)
+
+indicadores = agregado['indicadores']
+if not indicadores:
+    st.error("❌ Nenhum indicador numérico encontrado")
+    st.stop()
+
+# ============================================================================
+# VISÃO GERAL
+# ============================================================================
+col_m1, col_m2, col_m3 = st.columns(3)
+with col_m1:
+    st.metric("👥 Consultores", f"{int(agregado['consultores'].sum()):,}".replace(",", "."))
+with col_m2:
+    st.metric("🏢 Equipes", len(agregado['consultores']))
+with col_m3:
+    st.metric("📊 Indicadores", len(indicadores))
+
+col_ind, col_est = st.columns([3, 2])
+with col_ind:
+    indicador = st.selectbox("🎯 Indicador", indicadores, key="indicador_equipe")
+with col_est:
+    estatistica = st.radio(
+        "Estatística",
+        ["Média", "Mediana", "Soma"],
+        horizontal=True,
+        key="estatistica_equipe"
+    )
+
+formato = 'porcentagem' if indicador in colunas_percentuais else 'auto'
+resumo = resumo_indicador(agregado, indicador)
+
+# ============================================================================
+# MÉDIAS POR EQUIPE
+# ============================================================================
+st.divider()
+st.markdown(f"### 📊 {estatistica} por equipe • {criar_nome_curto_grafico(indicador)}")
+
+valores_equipe = resumo[estatistica]
+barra = dict(
+    x=resumo.index.tolist(),
+    y=valores_equipe,
+    marker_color='#3B82F6',
+    text=formatar_coluna(valores_equipe, formato),
+    textposition='outside',
+    hovertemplate='<b>%{x}</b><br>' + estatistica + ': %{text}<extra></extra>'
+)
+if estatistica != "Soma":
+    # Faixa P25–P75 da equipe como barra de erro
+    barra['error_y'] = dict(
+        type='data',
+        symmetric=False,
+        array=(resumo['P75'] - valores_equipe).clip(lower=0),
+        arrayminus=(valores_equipe - resumo['P25']).clip(lower=0),
+        color='#94A3B8'
+    )
+fig = go.Figure(go.Bar(**barra))
+fig.update_layout(
+    height=380,
+    margin=dict(l=5, r=5, t=30, b=30),
+    plot_bgcolor='white',
+    paper_bgcolor='white'
+)
+st.plotly_chart(fig, use_container_width=True)
+
+tabela_resumo = pd.DataFrame(
+    {col: resumo[col] if col == 'Consultores' else formatar_coluna(resumo[col], formato) for col in resumo.columns},
+    index=resumo.index
+)
+st.dataframe(tabela_resumo, use_container_width=True)
+
+# ============================================================================
+# DISTRIBUIÇÃO
+# ============================================================================
+st.divider()
+st.markdown("### 📦 Distribuição por equipe")
+st.caption("Caixa: P25–P75 • Linha: mediana • Hastes: P10–P90 • Tracejado: média")
+
+# Caixas montadas com os percentis já calculados: nenhum ponto individual é enviado
+fig = go.Figure(go.Box(
+    x=resumo.index.tolist(),
+    q1=resumo['P25'],
+    median=resumo['Mediana'],
+    q3=resumo['P75'],
+    lowerfence=resumo['P10'],
+    upperfence=resumo['P90'],
+    mean=resumo['Média'],
+    marker_color='#1E40AF',
+    boxmean=True
+))
+fig.update_layout(
+    height=380,
+    margin=dict(l=5, r=5, t=30, b=30),
+    plot_bgcolor='white',
+    paper_bgcolor='white',
+    showlegend=False
+)
+st.plotly_chart(fig, use_container_width=True)
+
+# ============================================================================
+# RANKING DE CONSULTORES
+# ============================================================================
+st.divider()
+st.markdown("### 🏆 Ranking de consultores")
+
+col_eq, col_n = st.columns([3, 2])
+with col_eq:
+    equipe_ranking = st.selectbox(
+        "🏢 Equipe",
+        ['Todas'] + agregado['consultores'].index.tolist(),
+        key="equipe_ranking"
+    )
+with col_n:
+    top_n = st.slider("Consultores", min_value=3, max_value=50, value=10, key="top_n_equipe")
+
+# Seleção parcial (argpartition): custo linear mesmo com milhares de consultores
+melhores, piores = ranking_indicador(
+    agregado, indicador, top_n,
+    equipe=None if equipe_ranking == 'Todas' else equipe_ranking
+)
+
+col_top, col_base = st.columns(2)
+with col_top:
+    st.markdown("**🔝 Melhores**")
+    st.dataframe(
+        melhores.assign(Valor=formatar_coluna(melhores['Valor'], formato)),
+        use_container_width=True,
+        hide_index=True
+    )
+with col_base:
+    st.markdown("**🔻 A desenvolver**")
+    st.dataframe(
+        piores.assign(Valor=formatar_coluna(piores['Valor'], formato)),
+        use_container_width=True,
+        hide_index=True
+    )
+
+with st.expander(f"🏅 Líder de cada indicador ({len(indicadores)})"):
+    lideres = lideres_por_indicador(agregado)
+    st.dataframe(lideres, use_container_width=True, hide_index=True)
+
+# ============================================================================
+# METAS COLETIVAS
+# ============================================================================
+st.divider()
+st.markdown("### 🎯 Progresso das metas por equipe")
+
+progresso, quantidade = progresso_metas_equipes(agregado, st.session_state.metas, [indicador])
+progresso = progresso[indicador]
+quantidade = quantidade[indicador]
+
+if quantidade.sum() == 0:
+    st.info("Nenhuma meta definida para este indicador. Defina metas na Visão Individual.")
+else:
+    com_meta = quantidade[quantidade > 0].index
+    fig = go.Figure(go.Bar(
+        x=com_meta.tolist(),
+        y=progresso[com_meta],
+        marker_color=[obter_cor_progresso_grafico(p) for p in progresso[com_meta]],
+        text=[f"{p:.0f}%" for p in progresso[com_meta]],
+        textposition='outside',
+        customdata=quantidade[com_meta],
+        hovertemplate='<b>%{x}</b><br>Progresso médio: %{y:.1f}%<br>Consultores com meta: %{customdata}<extra></extra>'
+    ))
+    fig.add_hline(y=100, line_dash='dash', line_color='#059669')
+    fig.update_layout(
+        height=340,
+        margin=dict(l=5, r=5, t=30, b=30),
+        plot_bgcolor='white',
+        paper_bgcolor='white',
+        yaxis=dict(range=[0, 160], title='% da meta')
+    )
+    st.plotly_chart(fig, use_container_width=True)
     
-    ### 🎯 Metas Coletivas:
-    - Metas por equipe
-    - Competição saudável
-    - Bonificações por desempenho
-    - Reconhecimento público
-    """)
-
-st.markdown("---")
-st.markdown("💡 **Sugestões para o dashboard da equipe? Fale conosco!**")
\ No newline at end of file
+    st.caption(
+        f"Média do progresso dos {int(quantidade.sum())} consultores com meta em "
+        f"{indicador} (limitado a 150%, como nos cards)."
+    )
+
+# ============================================================================
+# RELATÓRIO EM LOTE
+# ============================================================================
+st.divider()
+st.markdown("### 📦 Relatório de todos os consultores")
+st.caption("Valores, metas e progresso de cada consultor em um único arquivo.")
+
+FORMATOS_RELATORIO = {
+    "📗 Excel • uma aba por consultor": 'abas',
+    "📘 Excel • aba única": 'longo',
+    "🗜️ CSV compactado (.zip)": 'zip',
+}
+
+indicadores_com_meta = [i for i in indicadores if st.session_state.metas.por_indicador(i)]
+
+col_r1, col_r2 = st.columns([2, 3])
+with col_r1:
+    equipe_relatorio = st.selectbox(
+        "🏢 Equipe",
+        ['Todas'] + agregado['consultores'].index.tolist(),
+        key="equipe_relatorio"
+    )
+    formato_relatorio = FORMATOS_RELATORIO[st.radio(
+        "Formato",
+        list(FORMATOS_RELATORIO),
+        key="formato_relatorio"
+    )]
+with col_r2:
+    indicadores_relatorio = st.multiselect(
+        "📊 Indicadores",
+        indicadores,
+        default=indicadores_com_meta or [indicador],
+        key="indicadores_relatorio"
+    )
+
+equipe_filtro = None if equipe_relatorio == 'Todas' else equipe_relatorio
+total_consultores = int(
+    agregado['consultores'].sum() if equipe_filtro is None else agregado['consultores'][equipe_filtro]
+)
+total_linhas = total_consultores * len(indicadores_relatorio)
+
+problema = None
+if not indicadores_relatorio:
+    problema = "Escolha ao menos um indicador."
+elif formato_relatorio == 'abas' and total_consultores > LIMITE_ABAS_CONSULTOR:
+    problema = (f"{total_consultores} consultores: uma aba por consultor vai até {LIMITE_ABAS_CONSULTOR}. "
+                "Use a aba única ou o CSV compactado.")
+elif formato_relatorio == 'longo' and total_linhas > LIMITE_LINHAS_EXCEL:
+    problema = f"{total_linhas:,} linhas passam do limite do Excel. Use o CSV compactado.".replace(",", ".")
+
+# Outro arquivo ou metas alteradas também invalidam o relatório já gerado
+opcoes_relatorio = (
+    equipe_relatorio, formato_relatorio, tuple(indicadores_relatorio), df.attrs.get('hash_arquivo'),
+    assinatura_metas(indicadores_relatorio, equipe_filtro)
+)
+
+if problema:
+    st.warning(problema)
+elif st.button("⚙️ Gerar relatório", key="gerar_relatorio_equipe"):
+    with st.spinner(f"Gerando {total_linhas:,} linhas...".replace(",", ".")):
+        relatorio = relatorio_metas(agregado, st.session_state.metas, indicadores_relatorio, equipe=equipe_filtro)
+        sufixo = 'todas' if equipe_filtro is None else equipe_filtro
+        if formato_relatorio == 'zip':
+            dados = zip_csv_relatorio_equipe(relatorio)
+            nome, mime = f"relatorio_equipe_{sufixo}.zip", "application/zip"
+        else:
+            dados = excel_relatorio_equipe(relatorio, por_consultor=formato_relatorio == 'abas')
+            nome, mime = (f"relatorio_equipe_{sufixo}.xlsx",
+                          "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
+    # Guardado na sessão: o clique no download (que reexecuta a página) não gera de novo
+    st.session_state.relatorio_equipe = {'opcoes': opcoes_relatorio, 'dados': dados, 'nome': nome, 'mime': mime}
+
+gerado = st.session_state.get('relatorio_equipe')
+if not problema and gerado and gerado['opcoes'] == opcoes_relatorio:
+    st.download_button(
+        f"⬇️ Baixar {gerado['nome']}",
+        data=gerado['dados'],
+        file_name=gerado['nome'],
+        mime=gerado['mime']
+    )
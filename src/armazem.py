@@ -0,0 +1,177 @@
+import json
+import os
+import re
+from importlib.util import find_spec
+from datetime import datetime
+from pathlib import Path
+
+from .utils import colunas_identificacao, extrair_mes_ano, formatar_periodo_nome
+
+# ============================================================================
+# HISTÓRICO LOCAL DE PERÍODOS (ARROW IPC / FEATHER)
+# ============================================================================
+# Cada período já normalizado (corrigir_colunas + conversão numérica) é
+# gravado como um arquivo Feather v2 sem compressão em dados/historico/.
+# Sem compressão o arquivo pode ser mapeado em memória: ler só algumas
+# colunas toca apenas os bytes dessas colunas, sem reprocessar o CSV.
+# indice.json guarda rótulo, origem e metadados de cada período.
+# pyarrow é opcional (sem ele o histórico fica desativado) e só é
+# importado pelos métodos que leem ou gravam os arquivos.
+
+DIRETORIO_PADRAO = Path(__file__).parent.parent / "dados" / "historico"
+ARMAZEM_DISPONIVEL = find_spec("pyarrow") is not None
+
+
+def chave_periodo(arquivo_nome):
+    """Chave do período no histórico: 'AAAA-MM' quando o nome tem mês e ano."""
+    ano, mes = extrair_mes_ano(arquivo_nome)
+    if ano and mes:
+        return f"{ano:04d}-{mes:02d}"
+    nome = Path(arquivo_nome or 'periodo').stem.lower()
+    return re.sub(r'[^a-z0-9_-]+', '_', nome).strip('_') or 'periodo'
+
+
+class ArmazemHistorico:
+    """
+    Períodos salvos em disco, um arquivo .feather por chave.
+    Todas as leituras aceitam uma lista de colunas (poda de colunas).
+    """
+    def __init__(self, diretorio=DIRETORIO_PADRAO):
+        if not ARMAZEM_DISPONIVEL:
+            raise ImportError("pyarrow é necessário para o histórico local")
+        self.diretorio = Path(diretorio)
+        self.diretorio.mkdir(parents=True, exist_ok=True)
+        self._caminho_indice = self.diretorio / "indice.json"
+    
+    def _ler_indice(self):
+        if not self._caminho_indice.exists():
+            return {}
+        try:
+            return json.loads(self._caminho_indice.read_text(encoding='utf-8'))
+        except (OSError, ValueError):
+            return {}
+    
+    def _gravar_indice(self, indice):
+        temporario = self._caminho_indice.with_suffix('.tmp')
+        temporario.write_text(json.dumps(indice, ensure_ascii=False, indent=1), encoding='utf-8')
+        os.replace(temporario, self._caminho_indice)
+    
+    def _caminho(self, chave):
+        return self.diretorio / f"{chave}.feather"
+    
+    def periodos(self):
+        """Lista de períodos salvos (dicts com 'chave', 'rotulo', ...) em ordem cronológica."""
+        indice = self._ler_indice()
+        return [
+            dict(info, chave=chave)
+            for chave, info in sorted(indice.items())
+            if self._caminho(chave).exists()
+        ]
+    
+    def rotulo(self, chave):
+        return self._ler_indice().get(chave, {}).get('rotulo', chave)
+    
+    def salvar(self, chave, df, rotulo=None, origem=None):
+        """Grava (ou substitui) um período já normalizado."""
+        import pyarrow as pa
+        import pyarrow.feather as feather
+        
+        tabela = df.copy()
+        tabela.columns = [str(c) for c in tabela.columns]
+        # Colunas de texto misto (ex.: número e texto) viram texto para o Arrow
+        for col in tabela.columns:
+            if tabela[col].dtype == object:
+                tabela[col] = tabela[col].where(tabela[col].isna(), tabela[col].astype(str))
+        
+        temporario = self._caminho(chave).with_suffix('.tmp')
+        feather.write_feather(
+            pa.Table.from_pandas(tabela, preserve_index=False),
+            temporario,
+            compression='uncompressed'
+        )
+        os.replace(temporario, self._caminho(chave))
+        
+        indice = self._ler_indice()
+        indice[chave] = {
+            'rotulo': rotulo or chave,
+            'origem': origem,
+            'linhas': len(tabela),
+            'colunas': len(tabela.columns),
+            'colunas_percentuais': list(df.attrs.get('colunas_percentuais', [])),
+            'salvo_em': datetime.now().isoformat(timespec='seconds')
+        }
+        self._gravar_indice(indice)
+    
+    def colunas(self, chave):
+        """Nomes das colunas do período (lê só o esquema)."""
+        import pyarrow as pa
+        
+        with pa.memory_map(str(self._caminho(chave))) as fonte:
+            return pa.ipc.open_file(fonte).schema.names
+    
+    def esquema(self, chave):
+        """Mesmo formato de utils.esquema_csv: 'colunas' e 'numericas'."""
+        import pyarrow as pa
+        
+        with pa.memory_map(str(self._caminho(chave))) as fonte:
+            schema = pa.ipc.open_file(fonte).schema
+        return {
+            'colunas': schema.names,
+            'numericas': [
+                campo.name for campo in schema
+                if pa.types.is_integer(campo.type) or pa.types.is_floating(campo.type)
+            ]
+        }
+    
+    def carregar(self, chave, colunas=None):
+        """
+        Lê o período mapeando o arquivo em memória. Com colunas, só elas
+        (mais as de identificação) são lidas e as inexistentes são ignoradas;
+        attrs['colunas_disponiveis'] guarda então todas as colunas salvas.
+        """
+        import pyarrow.feather as feather
+        
+        existentes = None
+        if colunas is not None:
+            existentes = self.colunas(chave)
+            nomes = set(existentes)
+            colunas = colunas_identificacao(existentes) + [c for c in colunas if c in nomes]
+            colunas = list(dict.fromkeys(colunas))
+        
+        df = feather.read_table(self._caminho(chave), columns=colunas, memory_map=True).to_pandas()
+        info = self._ler_indice().get(chave, {})
+        df.attrs['colunas_percentuais'] = [c for c in info.get('colunas_percentuais', []) if c in df.columns]
+        df.attrs['hash_arquivo'] = f"historico:{chave}:{info.get('salvo_em')}"
+        if existentes is not None:
+            df.attrs['colunas_disponiveis'] = list(existentes)
+        return df
+    
+    def remover(self, chave):
+        self._caminho(chave).unlink(missing_ok=True)
+        indice = self._ler_indice()
+        if indice.pop(chave, None) is not None:
+            self._gravar_indice(indice)
+
+
+def salvar_upload(armazem, arquivo, df):
+    """Salva o CSV enviado (já carregado por carregar_csv) e devolve a chave usada."""
+    chave = chave_periodo(arquivo.name)
+    armazem.salvar(chave, df, rotulo=formatar_periodo_nome(arquivo.name, 1), origem=arquivo.name)
+    return chave
+
+
+_armazem_padrao = None
+
+
+def obter_armazem_padrao():
+    """
+    Histórico usado pelas páginas. O diretório vem de PAINEL_HISTORICO_DIR;
+    vazio (ou sem pyarrow) desativa o histórico.
+    """
+    global _armazem_padrao
+    diretorio = os.environ.get("PAINEL_HISTORICO_DIR", str(DIRETORIO_PADRAO))
+    if not diretorio or not ARMAZEM_DISPONIVEL:
+        return None
+    if _armazem_padrao is None or str(_armazem_padrao.diretorio) != diretorio:
+        _armazem_padrao = ArmazemHistorico(diretorio)
+    return _armazem_padrao
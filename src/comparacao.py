@@ -0,0 +1,170 @@
+import numpy as np
+import pandas as pd
+
+from .metas import criar_chave_meta
+from .perfil import cronometrar
+
+# ============================================================================
+# MOTOR DE COMPARAÇÃO ENTRE PERÍODOS (VETORIZADO)
+# ============================================================================
+
+def _sem_nan(valores):
+    valores = np.asarray(valores, dtype='float64')
+    return np.where(np.isnan(valores), 0.0, valores)
+
+def _arredondar_1(valores):
+    """
+    round(x, 1) do Python para arrays. np.round multiplica por 10 antes de
+    arredondar e erra alguns valores perto do meio (…x5); esses poucos
+    passam pelo round do Python, que arredonda pelo valor exato.
+    """
+    arredondado = np.round(valores, 1)
+    with np.errstate(invalid='ignore'):
+        fracao = np.abs(valores * 10) % 1
+        perto_do_meio = np.flatnonzero(np.abs(fracao - 0.5) < 1e-6)
+    if len(perto_do_meio):
+        arredondado = np.array(arredondado, dtype='float64', copy=True)
+        arredondado.flat[perto_do_meio] = [round(v, 1) for v in np.ravel(valores)[perto_do_meio].tolist()]
+    return arredondado
+
+def variacao_percentual_vetorizada(valores1, valores2):
+    """
+    Mesma regra de calcular_variacao_percentual, para arrays inteiros:
+    NaN conta como 0 e, com base zero, a variação é +100, 0 ou -100.
+    """
+    v1 = _sem_nan(valores1)
+    v2 = _sem_nan(valores2)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        variacao = _arredondar_1((v2 - v1) / np.abs(v1) * 100)
+    base_zero = np.where(v2 > 0, 100.0, np.where(v2 == 0, 0.0, -100.0))
+
+    return np.where(v1 == 0, base_zero, variacao)
+
+def progresso_meta_vetorizado(valores, metas):
+    """
+    Mesma regra de calcular_progresso_meta (limitado a 150%), para arrays.
+    Onde não há meta (NaN) o resultado é NaN; meta zero dá progresso 0.
+    """
+    valores = _sem_nan(valores)
+    metas = np.asarray(metas, dtype='float64')
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        progresso = np.minimum(valores / metas * 100, 150)
+    progresso = np.where(metas == 0, 0.0, progresso)
+
+    return np.where(np.isnan(metas), np.nan, progresso)
+
+def classificar_variacao_vetorizada(variacoes):
+    """Faixas de obter_cor_variacao: 1 (> +5%), -1 (< -5%), 0 (entre ±5%)."""
+    variacoes = np.asarray(variacoes, dtype='float64')
+    return np.where(variacoes > 5.0, 1, np.where(variacoes < -5.0, -1, 0))
+
+def matriz_valores(df, consultores, indicadores, indice=None):
+    """
+    Matriz consultores × indicadores (float64) com a primeira linha de cada
+    USUARIO, na ordem pedida. Consultor ausente vira linha de NaN.
+    Com o IndiceConsultores de df, só as linhas pedidas são lidas.
+    """
+    if indice is not None:
+        posicoes = [indice.primeira_posicao(c) for c in consultores]
+        por_usuario = df.iloc[[p for p in posicoes if p is not None]].set_index('USUARIO')
+    else:
+        por_usuario = df.drop_duplicates('USUARIO').set_index('USUARIO')
+    bloco = por_usuario.reindex(index=list(consultores), columns=list(indicadores))
+
+    for col in bloco.columns:
+        if not pd.api.types.is_numeric_dtype(bloco[col]):
+            bloco[col] = pd.to_numeric(bloco[col], errors='coerce')
+
+    return bloco.to_numpy(dtype='float64', na_value=np.nan)
+
+def equipes_por_consultor(df, consultores, indice=None):
+    """EQUIPE da primeira linha de cada consultor (None se não houver a coluna)."""
+    if indice is not None:
+        return [indice.equipe(c) for c in consultores]
+    if 'EQUIPE' not in df.columns:
+        return [None] * len(consultores)
+    equipes = df.drop_duplicates('USUARIO').set_index('USUARIO')['EQUIPE']
+    return [equipes.get(c) for c in consultores]
+
+def matriz_metas(metas, consultores, equipes, indicadores):
+    """
+    Matriz consultores × indicadores com o valor das metas (NaN = sem meta).
+    Usa o índice por consultor do RepositorioMetas: custo proporcional às
+    metas dos consultores pedidos, não ao total de metas.
+    """
+    resultado = np.full((len(consultores), len(indicadores)), np.nan)
+    if metas is None:
+        return resultado
+
+    posicao = {indicador: j for j, indicador in enumerate(indicadores)}
+    for i, (consultor, equipe) in enumerate(zip(consultores, equipes)):
+        if hasattr(metas, 'por_consultor'):
+            candidatas = metas.por_consultor(consultor)
+        else:
+            candidatas = {c: m for c, m in metas.items() if m.get('consultor') == consultor}
+
+        for chave, meta in candidatas.items():
+            j = posicao.get(meta['indicador'])
+            # A chave precisa bater com a de obter_meta(indicador, consultor, equipe)
+            if j is not None and chave == criar_chave_meta(meta['indicador'], consultor, equipe):
+                resultado[i, j] = meta['valor']
+
+    return resultado
+
+@cronometrar()
+def comparar_periodos(df1, df2, indicadores, metas=None, pares=None, indice1=None, indice2=None):
+    """
+    Compara dois períodos para todos os consultores × indicadores de uma vez.
+
+    pares: lista de (consultor no período 1, consultor no período 2). Por
+    padrão, todos os consultores presentes nos dois arquivos comparados
+    consigo mesmos. indice1/indice2 (IndiceConsultores de df1/df2) evitam
+    percorrer os arquivos inteiros.
+
+    Retorna dict com listas 'consultores1', 'consultores2', 'equipes1',
+    'equipes2', 'indicadores' e matrizes (pares × indicadores) 'v1', 'v2',
+    'diferenca', 'variacao', 'meta1', 'meta2', 'prog1' e 'prog2'.
+    """
+    indicadores = [i for i in indicadores if i in df1.columns and i in df2.columns]
+
+    if pares is None:
+        if indice1 is not None and indice2 is not None:
+            comuns = sorted(set(indice1.posicoes) & set(indice2.posicoes))
+        else:
+            comuns = sorted(set(df1['USUARIO'].unique()) & set(df2['USUARIO'].unique()))
+        pares = [(c, c) for c in comuns]
+    consultores1 = [p[0] for p in pares]
+    consultores2 = [p[1] for p in pares]
+
+    v1 = matriz_valores(df1, consultores1, indicadores, indice1)
+    v2 = matriz_valores(df2, consultores2, indicadores, indice2)
+    equipes1 = equipes_por_consultor(df1, consultores1, indice1)
+    equipes2 = equipes_por_consultor(df2, consultores2, indice2)
+    meta1 = matriz_metas(metas, consultores1, equipes1, indicadores)
+    meta2 = matriz_metas(metas, consultores2, equipes2, indicadores)
+
+    return {
+        'consultores1': consultores1,
+        'consultores2': consultores2,
+        'equipes1': equipes1,
+        'equipes2': equipes2,
+        'indicadores': indicadores,
+        'v1': _sem_nan(v1),
+        'v2': _sem_nan(v2),
+        'diferenca': _sem_nan(v2) - _sem_nan(v1),
+        'variacao': variacao_percentual_vetorizada(v1, v2),
+        'meta1': meta1,
+        'meta2': meta2,
+        'prog1': progresso_meta_vetorizado(v1, meta1),
+        'prog2': progresso_meta_vetorizado(v2, meta2),
+    }
+
+def tabela_variacao(resultado):
+    """DataFrame consultor × indicador com a variação % de comparar_periodos."""
+    return pd.DataFrame(
+        resultado['variacao'],
+        index=pd.Index(resultado['consultores1'], name='USUARIO'),
+        columns=resultado['indicadores']
+    )
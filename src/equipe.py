@@ -0,0 +1,183 @@
+import numpy as np
+import pandas as pd
+
+from .comparacao import matriz_metas, progresso_meta_vetorizado
+from .perfil import cronometrar
+from .ranking import extremos, posicoes
+from .utils import CacheLRU, indicadores_numericos
+
+# ============================================================================
+# AGREGAÇÕES POR EQUIPE (DASHBOARD DA EQUIPE)
+# ============================================================================
+# Todas as estatísticas saem do mesmo groupby por EQUIPE (o agrupamento é
+# calculado uma vez e reaproveitado), para todos os indicadores de uma vez.
+# O resultado fica em cache por (hash do arquivo, indicadores).
+
+PERCENTIS = (0.1, 0.25, 0.75, 0.9)
+
+_cache_agregacoes = CacheLRU(max_itens=16, max_bytes=256 * 1024 * 1024)
+
+def _tamanho(resultado):
+    tamanho = 0
+    for valor in resultado.values():
+        if isinstance(valor, (pd.DataFrame, pd.Series)):
+            tamanho += int(np.sum(valor.memory_usage(deep=False)))
+        elif isinstance(valor, dict):
+            tamanho += sum(int(np.sum(v.memory_usage(deep=False))) for v in valor.values())
+    return tamanho
+
+@cronometrar()
+def agregar_equipes(df, indicadores=None, percentis=PERCENTIS):
+    """
+    Estatísticas por EQUIPE de todos os indicadores. df precisa das colunas
+    USUARIO e EQUIPE (preparar_usuarios); cada consultor conta uma vez.
+    
+    Retorna dict com:
+      'indicadores'       lista de indicadores usados
+      'consultores'       Series EQUIPE -> nº de consultores
+      'media', 'mediana', 'soma'  DataFrames EQUIPE × indicador
+      'percentis'         {p: DataFrame EQUIPE × indicador}
+      'valores'           DataFrame USUARIO × [EQUIPE + indicadores]
+    """
+    if indicadores is None:
+        indicadores = indicadores_numericos(df)
+    indicadores = list(dict.fromkeys(indicadores))
+    
+    chave = df.attrs.get('hash_arquivo')
+    if chave is not None:
+        chave = (chave, len(df), tuple(indicadores), tuple(percentis))
+        em_cache = _cache_agregacoes.obter(chave)
+        if em_cache is not None:
+            return em_cache
+    
+    valores = df.drop_duplicates('USUARIO').set_index('USUARIO')[['EQUIPE'] + indicadores]
+    grupos = valores.groupby('EQUIPE', sort=True)
+    bloco = grupos[indicadores]
+    
+    quantis = bloco.quantile(list(percentis)) if len(valores) else None
+    
+    resultado = {
+        'indicadores': indicadores,
+        'consultores': grupos.size(),
+        'media': bloco.mean(),
+        'mediana': bloco.median(),
+        'soma': bloco.sum(),
+        'percentis': {
+            p: quantis.xs(p, level=-1) if quantis is not None else pd.DataFrame(columns=indicadores)
+            for p in percentis
+        },
+        'valores': valores,
+    }
+    
+    if chave is not None:
+        _cache_agregacoes.guardar(chave, resultado, _tamanho(resultado))
+    return resultado
+
+def resumo_indicador(agregado, indicador):
+    """Tabela EQUIPE × estatísticas de um indicador (para exibição)."""
+    colunas = {
+        'Consultores': agregado['consultores'],
+        'Média': agregado['media'][indicador],
+        'Mediana': agregado['mediana'][indicador],
+        'Soma': agregado['soma'][indicador],
+    }
+    for p, tabela in agregado['percentis'].items():
+        colunas[f"P{int(round(p * 100))}"] = tabela[indicador]
+    return pd.DataFrame(colunas)
+
+def ranking_indicador(agregado, indicador, n=10, equipe=None):
+    """
+    Melhores e piores n consultores de um indicador (opcionalmente só de uma
+    equipe), por seleção parcial. Retorna (melhores, piores): DataFrames com
+    Posição (1 = maior valor, empates com a mesma posição), Consultor,
+    Equipe e Valor. Os piores vêm do menor valor para cima. Empates (também
+    no corte dos n) são decididos pelo nome do consultor, então a lista não
+    muda entre execuções.
+    """
+    valores = agregado['valores']
+    if equipe is not None:
+        valores = valores[valores['EQUIPE'] == equipe]
+    coluna = valores[indicador].to_numpy(dtype='float64', na_value=np.nan)
+    nomes = valores.index.astype(str).to_numpy()
+    
+    tabelas = []
+    for maiores in (True, False):
+        linhas, selecionados = extremos(coluna, n, maiores=maiores, desempate=nomes)
+        linhas, selecionados = linhas[:, 0], selecionados[:, 0]
+        validos = linhas >= 0
+        linhas, selecionados = linhas[validos], selecionados[validos]
+        tabelas.append(pd.DataFrame({
+            'Posição': posicoes(coluna, selecionados)[:, 0].astype(int),
+            'Consultor': valores.index[linhas],
+            'Equipe': valores['EQUIPE'].to_numpy()[linhas],
+            'Valor': selecionados,
+        }))
+    return tabelas[0], tabelas[1]
+
+def lideres_por_indicador(agregado, indicadores=None):
+    """
+    Consultor com o maior valor de cada indicador, todos de uma vez (uma
+    seleção 2-D sobre consultores × indicadores). Empate: o primeiro nome.
+    """
+    if indicadores is None:
+        indicadores = agregado['indicadores']
+    valores = agregado['valores']
+    linhas, melhores = extremos(
+        valores[indicadores].to_numpy(dtype='float64', na_value=np.nan), 1,
+        desempate=valores.index.astype(str).to_numpy()
+    )
+    linhas, melhores = linhas[0], melhores[0]
+    validos = linhas >= 0
+    
+    return pd.DataFrame({
+        'Indicador': np.asarray(indicadores, dtype=object)[validos],
+        'Líder': valores.index[linhas[validos]],
+        'Equipe': valores['EQUIPE'].to_numpy()[linhas[validos]],
+        'Valor': melhores[validos],
+    })
+
+def progresso_metas_equipes(agregado, metas, indicadores=None):
+    """
+    Progresso médio das metas por EQUIPE (só consultores com meta entram na
+    média). Retorna (progresso, quantidade): DataFrames EQUIPE × indicador.
+    Não usa cache: as metas mudam durante a sessão.
+    """
+    if indicadores is None:
+        indicadores = agregado['indicadores']
+    valores = agregado['valores']
+    consultores = valores.index.tolist()
+    equipes = valores['EQUIPE'].tolist()
+    
+    alvo = matriz_metas(metas, consultores, equipes, indicadores)
+    progresso = progresso_meta_vetorizado(valores[indicadores].to_numpy(dtype='float64', na_value=np.nan), alvo)
+    
+    tabela = pd.DataFrame(progresso, index=valores.index, columns=indicadores)
+    tabela['EQUIPE'] = equipes
+    grupos = tabela.groupby('EQUIPE', sort=True)
+    return grupos.mean(), grupos.count()
+
+def relatorio_metas(agregado, metas, indicadores=None, equipe=None):
+    """
+    Valores, metas e progresso de todos os consultores (ou só de uma equipe)
+    para o relatório em lote. Retorna dict com listas 'consultores',
+    'equipes' e 'indicadores' e matrizes consultores × indicadores
+    'valores', 'metas' e 'progresso' (NaN = sem meta).
+    """
+    if indicadores is None:
+        indicadores = agregado['indicadores']
+    valores = agregado['valores']
+    if equipe is not None:
+        valores = valores[valores['EQUIPE'] == equipe]
+    consultores = valores.index.tolist()
+    equipes = valores['EQUIPE'].tolist()
+    
+    matriz = valores[indicadores].to_numpy(dtype='float64', na_value=np.nan)
+    alvo = matriz_metas(metas, consultores, equipes, indicadores)
+    return {
+        'consultores': consultores,
+        'equipes': equipes,
+        'indicadores': list(indicadores),
+        'valores': matriz,
+        'metas': alvo,
+        'progresso': progresso_meta_vetorizado(matriz, alvo),
+    }
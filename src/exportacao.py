@@ -0,0 +1,245 @@
+import codecs
+import hashlib
+import os
+import re
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+
+import numpy as np
+import pandas as pd
+
+from .perfil import cronometrar
+from .utils import CacheLRU
+
+# ============================================================================
+# EXPORTAÇÃO PARA EXCEL (STREAMING)
+# ============================================================================
+# O openpyxl no modo write_only grava cada linha direto no XML da planilha
+# e a descarta: a memória fica constante em vez de crescer com o modelo
+# completo de células do pd.ExcelWriter. As linhas são convertidas em
+# blocos, então nem o DataFrame inteiro vira lista de Python de uma vez.
+# O .xlsx pronto fica em cache pelo hash do conteúdo das planilhas: um
+# rerun da página devolve os mesmos bytes sem gerar o arquivo de novo.
+
+LINHAS_POR_BLOCO = 5000
+
+_cache_exportacoes = CacheLRU(max_itens=16, max_bytes=128 * 1024 * 1024)
+
+def hash_planilhas(planilhas):
+    """Hash do conteúdo (nomes das abas, colunas e valores) de {aba: DataFrame}."""
+    h = hashlib.blake2b(digest_size=16)
+    for nome, df in planilhas.items():
+        h.update(repr((nome, [str(c) for c in df.columns], len(df))).encode('utf-8'))
+        if len(df):
+            h.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    return h.hexdigest()
+
+def _linhas(df):
+    """Linhas do DataFrame como listas de valores do Python (NaN -> célula vazia)."""
+    for inicio in range(0, len(df), LINHAS_POR_BLOCO):
+        bloco = df.iloc[inicio:inicio + LINHAS_POR_BLOCO].astype(object)
+        bloco = bloco.where(bloco.notna(), None)
+        yield from bloco.itertuples(index=False, name=None)
+
+def _valor_celula(valor):
+    if isinstance(valor, np.generic):
+        return valor.item()
+    return valor
+
+def escrever_excel(planilhas, destino):
+    """Grava {aba: DataFrame} em destino (caminho ou buffer) no modo write_only."""
+    # Importado só na primeira exportação: o openpyxl pesa na abertura das páginas
+    from openpyxl import Workbook
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.styles import Font
+    
+    livro = Workbook(write_only=True)
+    negrito = Font(bold=True)
+    
+    for nome, df in planilhas.items():
+        aba = livro.create_sheet(title=str(nome)[:31])
+        cabecalho = []
+        for coluna in df.columns:
+            celula = WriteOnlyCell(aba, value=str(coluna))
+            celula.font = negrito
+            cabecalho.append(celula)
+        aba.append(cabecalho)
+        
+        for linha in _linhas(df):
+            aba.append([_valor_celula(v) for v in linha])
+    
+    livro.save(destino)
+
+@cronometrar()
+def gerar_excel(planilhas):
+    """
+    Bytes do .xlsx com uma aba por item de {aba: DataFrame}, em cache pelo
+    conteúdo. Pode ser passado direto para st.download_button.
+    """
+    planilhas = {nome: df for nome, df in planilhas.items() if df is not None}
+    try:
+        chave = hash_planilhas(planilhas)
+    except TypeError:  # valores que o pandas não sabe hashear: gera sem cache
+        chave = None
+    
+    if chave is not None:
+        em_cache = _cache_exportacoes.obter(chave)
+        if em_cache is not None:
+            return em_cache
+    
+    saida = BytesIO()
+    escrever_excel(planilhas, saida)
+    conteudo = saida.getvalue()
+    
+    if chave is not None:
+        _cache_exportacoes.guardar(chave, conteudo, len(conteudo))
+    return conteudo
+
+# ============================================================================
+# RELATÓRIO DA EQUIPE EM LOTE
+# ============================================================================
+# Valores, metas e progresso de todos os consultores de uma vez (saída de
+# equipe.relatorio_metas), em três formatos: uma aba por consultor, uma aba
+# única no formato longo (consultor × indicador) ou CSVs compactados, um por
+# equipe. O CSV é o formato para equipes grandes: os blocos de consultores
+# viram texto em processos separados e são gravados no .zip em ordem.
+
+COLUNAS_RELATORIO = ['Consultor', 'Equipe', 'Indicador', 'Valor', 'Meta', 'Progresso %']
+LIMITE_LINHAS_EXCEL = 1_048_575  # linhas por aba, fora o cabeçalho
+LIMITE_ABAS_CONSULTOR = 300
+LINHAS_POR_TAREFA = 200_000
+LIMITE_PARALELO = 400_000  # abaixo disso, abrir processos custa mais do que ganha
+
+_CARACTERES_INVALIDOS = re.compile(r'[\[\]:*?/\\]')
+
+def linhas_relatorio(relatorio):
+    """Linhas do relatório no formato longo (consultores × indicadores)."""
+    return len(relatorio['consultores']) * len(relatorio['indicadores'])
+
+def _fatia(relatorio, posicoes):
+    """Sub-relatório só com os consultores nas posições dadas."""
+    return {
+        'consultores': [relatorio['consultores'][i] for i in posicoes],
+        'equipes': [relatorio['equipes'][i] for i in posicoes],
+        'indicadores': relatorio['indicadores'],
+        'valores': relatorio['valores'][posicoes],
+        'metas': relatorio['metas'][posicoes],
+        'progresso': relatorio['progresso'][posicoes],
+    }
+
+def tabela_longa(relatorio):
+    """DataFrame com uma linha por consultor × indicador (COLUNAS_RELATORIO)."""
+    indicadores = relatorio['indicadores']
+    consultores = relatorio['consultores']
+    return pd.DataFrame({
+        'Consultor': np.repeat(np.asarray(consultores, dtype=object), len(indicadores)),
+        'Equipe': np.repeat(np.asarray(relatorio['equipes'], dtype=object), len(indicadores)),
+        'Indicador': np.tile(np.asarray(indicadores, dtype=object), len(consultores)),
+        'Valor': relatorio['valores'].ravel(),
+        'Meta': relatorio['metas'].ravel(),
+        'Progresso %': relatorio['progresso'].ravel().round(1),
+    }, columns=COLUNAS_RELATORIO)
+
+def _hash_relatorio(relatorio, formato):
+    h = hashlib.blake2b(digest_size=16)
+    h.update(repr((formato, relatorio['consultores'], relatorio['equipes'], relatorio['indicadores'])).encode('utf-8'))
+    for nome in ('valores', 'metas'):
+        h.update(np.ascontiguousarray(relatorio[nome]).tobytes())
+    return h.hexdigest()
+
+def _nome_seguro(nome, limite=31, usados=None):
+    """Nome válido para aba/arquivo, sem repetir os já usados."""
+    base = _CARACTERES_INVALIDOS.sub('_', str(nome) if nome else 'SEM_EQUIPE')[:limite]
+    candidato, n = base, 2
+    while usados is not None and candidato.lower() in usados:
+        sufixo = f"~{n}"
+        candidato = base[:limite - len(sufixo)] + sufixo
+        n += 1
+    if usados is not None:
+        usados.add(candidato.lower())
+    return candidato
+
+def excel_relatorio_equipe(relatorio, por_consultor=True):
+    """
+    Bytes do .xlsx do relatório: uma aba por consultor (Indicador, Valor,
+    Meta, Progresso %) ou uma aba 'Relatório' no formato longo. Em cache
+    pelo conteúdo, como gerar_excel.
+    """
+    if por_consultor and len(relatorio['consultores']) > LIMITE_ABAS_CONSULTOR:
+        raise ValueError(f"Máximo de {LIMITE_ABAS_CONSULTOR} consultores com uma aba por consultor")
+    if not por_consultor and linhas_relatorio(relatorio) > LIMITE_LINHAS_EXCEL:
+        raise ValueError("O relatório passa do limite de linhas do Excel; use o CSV compactado")
+    
+    chave = _hash_relatorio(relatorio, 'abas' if por_consultor else 'longo')
+    em_cache = _cache_exportacoes.obter(chave)
+    if em_cache is not None:
+        return em_cache
+    
+    if por_consultor:
+        usados = set()
+        planilhas = {
+            _nome_seguro(consultor, usados=usados): tabela_longa(_fatia(relatorio, [i])).drop(columns=['Consultor', 'Equipe'])
+            for i, consultor in enumerate(relatorio['consultores'])
+        }
+    else:
+        planilhas = {'Relatório': tabela_longa(relatorio)}
+    
+    saida = BytesIO()
+    escrever_excel(planilhas, saida)
+    conteudo = saida.getvalue()
+    _cache_exportacoes.guardar(chave, conteudo, len(conteudo))
+    return conteudo
+
+def _csv_bloco(fatia, cabecalho):
+    """CSV de uma fatia (separador ; e vírgula decimal, como o Excel em português)."""
+    return tabela_longa(fatia).to_csv(index=False, header=cabecalho, sep=';', decimal=',').encode('utf-8')
+
+def _tarefas_csv(relatorio):
+    """(arquivo, fatia, cabeçalho?) por bloco de consultores, agrupados por equipe."""
+    por_bloco = max(1, LINHAS_POR_TAREFA // max(1, len(relatorio['indicadores'])))
+    equipes = pd.Series([e or '' for e in relatorio['equipes']], dtype=object)
+    grupos = equipes.groupby(equipes, sort=True).indices
+    usados = set()
+    for equipe, posicoes in grupos.items():
+        arquivo = _nome_seguro(equipe, limite=100, usados=usados) + '.csv'
+        for inicio in range(0, len(posicoes), por_bloco):
+            yield arquivo, _fatia(relatorio, posicoes[inicio:inicio + por_bloco]), inicio == 0
+
+def zip_csv_relatorio_equipe(relatorio, processos=None):
+    """
+    Bytes de um .zip com um CSV por equipe. Relatórios grandes são
+    convertidos em processos paralelos (processos=None usa todos os núcleos).
+    """
+    chave = _hash_relatorio(relatorio, 'zip')
+    em_cache = _cache_exportacoes.obter(chave)
+    if em_cache is not None:
+        return em_cache
+    
+    arquivos, fatias, cabecalhos = zip(*_tarefas_csv(relatorio)) if relatorio['consultores'] else ((), (), ())
+    paralelo = linhas_relatorio(relatorio) >= LIMITE_PARALELO and (processos or os.cpu_count() or 1) > 1
+    
+    saida = BytesIO()
+    with zipfile.ZipFile(saida, 'w', zipfile.ZIP_DEFLATED) as pacote:
+        if paralelo:
+            with ProcessPoolExecutor(max_workers=processos) as executor:
+                _gravar_csvs(pacote, arquivos, executor.map(_csv_bloco, fatias, cabecalhos))
+        else:
+            _gravar_csvs(pacote, arquivos, map(_csv_bloco, fatias, cabecalhos))
+    
+    conteudo = saida.getvalue()
+    _cache_exportacoes.guardar(chave, conteudo, len(conteudo))
+    return conteudo
+
+def _gravar_csvs(pacote, arquivos, blocos):
+    """Grava os blocos em ordem, abrindo um arquivo novo a cada equipe."""
+    atual, destino = None, None
+    for arquivo, bloco in zip(arquivos, blocos):
+        if arquivo != atual:
+            if destino is not None:
+                destino.close()
+            atual, destino = arquivo, pacote.open(arquivo, 'w')
+            destino.write(codecs.BOM_UTF8)
+        destino.write(bloco)
+    if destino is not None:
+        destino.close()
@@ -0,0 +1,220 @@
+import numpy as np
+import plotly.graph_objects as go
+
+from .comparacao import progresso_meta_vetorizado, classificar_variacao_vetorizada
+from .metas import obter_cor_progresso_grafico, formatar_valor_grafico
+from .perfil import cronometrar
+from .utils import (
+    CacheLRU, converter_numero, formatar_coluna, criar_nome_curto_grafico, tabela_nomes_curtos
+)
+
+# ============================================================================
+# GRÁFICO DE INDICADORES DO CONSULTOR
+# ============================================================================
+# A figura é guardada por (consultor, indicadores, valores, metas): um rerun
+# causado por outro widget devolve o mesmo objeto, sem montar nada. O layout
+# depende só do consultor e do número de barras e também fica em cache;
+# quando só os valores ou as metas mudam, apenas os dados do trace são
+# refeitos. O hover usa um único hovertemplate com os campos em customdata,
+# em vez de um HTML montado para cada barra.
+
+COR_SEM_META = '#3B82F6'
+
+# Acima deste número de barras o gráfico vira pontos em WebGL (Scattergl)
+LIMITE_BARRAS = 60
+
+HOVER_INDICADOR = (
+    "<b>%{customdata[0]}</b><br>"
+    "<span style='color:#3B82F6; font-weight:bold'>Valor: %{customdata[1]}</span><br>"
+    "<span style='color:#059669; font-weight:bold'>Meta: %{customdata[2]}</span><br>"
+    "<span style='color:#6B7280'>Progresso: %{customdata[3]}</span><br>"
+    "<b>%{customdata[4]}</b><extra></extra>"
+)
+
+_cache_figuras = CacheLRU(max_itens=64, max_bytes=64 * 1024 * 1024)
+_cache_layouts = CacheLRU(max_itens=64, max_bytes=8 * 1024 * 1024)
+
+def _situacao(progresso):
+    if progresso >= 100:
+        return '✅ Meta atingida'
+    if progresso >= 50:
+        return '🟡 Em progresso'
+    return '🔴 Abaixo da meta'
+
+def _layout_indicadores(consultor, barras):
+    chave = (consultor, barras)
+    layout = _cache_layouts.obter(chave)
+    if layout is None:
+        layout = dict(
+            title=dict(
+                text=f'Indicadores - {consultor}',
+                font=dict(size=16, color="#1E3A8A"),
+                x=0.5
+            ),
+            height=max(350, barras * 40) if barras <= LIMITE_BARRAS else barras * 16,
+            margin=dict(l=5, r=5, t=50, b=30),
+            plot_bgcolor='white',
+            paper_bgcolor='white'
+        )
+        if barras > LIMITE_BARRAS:
+            layout['yaxis'] = dict(autorange='reversed', tickfont=dict(size=10))
+            layout['xaxis'] = dict(showgrid=True, gridcolor='#E5E7EB')
+        _cache_layouts.guardar(chave, layout, 1024)
+    return layout
+
+def _barras_indicadores(indicadores, valores, metas):
+    """Trace das barras, do maior valor para o menor."""
+    ordem = sorted(
+        range(len(indicadores)),
+        key=lambda i: (valores[i], criar_nome_curto_grafico(indicadores[i])),
+        reverse=True
+    )
+    indicadores = [indicadores[i] for i in ordem]
+    numeros = np.array([valores[i] for i in ordem], dtype='float64')
+    alvo = np.array([np.nan if metas[i] is None else metas[i] for i in ordem], dtype='float64')
+    progresso = progresso_meta_vetorizado(numeros, alvo)
+    com_meta = ~np.isnan(alvo)
+    
+    valores_fmt = formatar_coluna(numeros)
+    metas_fmt = formatar_coluna(alvo)
+    customdata = [
+        [indicador, valores_fmt[i], metas_fmt[i], f"{progresso[i]:.1f}%", _situacao(progresso[i])]
+        if com_meta[i] else
+        [indicador, valores_fmt[i], 'Não definida', '—', '']
+        for i, indicador in enumerate(indicadores)
+    ]
+    
+    # Nomes únicos: dois indicadores com o mesmo nome curto virariam uma só categoria
+    nomes_curtos = tabela_nomes_curtos(indicadores)
+    nomes = [nomes_curtos[i] for i in indicadores]
+    cores = [obter_cor_progresso_grafico(p) if m else COR_SEM_META for p, m in zip(progresso, com_meta)]
+    
+    if len(indicadores) > LIMITE_BARRAS:
+        # Muitos indicadores: um ponto por indicador desenhado em WebGL, sem rótulos de texto
+        return go.Scattergl(
+            y=nomes,
+            x=numeros,
+            mode='markers',
+            marker=dict(color=cores, size=9, line=dict(color='rgba(0,0,0,0.3)', width=1)),
+            hovertemplate=HOVER_INDICADOR,
+            customdata=customdata
+        )
+    
+    return go.Bar(
+        y=nomes,
+        x=numeros,
+        orientation='h',
+        marker=dict(
+            color=cores,
+            line=dict(color='rgba(0,0,0,0.3)', width=1.5),
+            opacity=0.9
+        ),
+        text=[formatar_valor_grafico(v) for v in numeros],
+        textposition='outside',
+        textfont=dict(size=11, color='black'),
+        hovertemplate=HOVER_INDICADOR,
+        customdata=customdata
+    )
+
+@cronometrar()
+def figura_indicadores(consultor, indicadores, valores, metas):
+    """
+    Barras horizontais dos indicadores do consultor, coloridas pelo
+    progresso da meta (pontos em WebGL acima de LIMITE_BARRAS). valores
+    (brutos) e metas (valor ou None) seguem a ordem de indicadores.
+    A figura devolvida é compartilhada: não altere.
+    """
+    indicadores = tuple(indicadores)
+    valores = tuple(converter_numero(v) for v in valores)
+    metas = tuple(None if m is None else float(m) for m in metas)
+    
+    chave = (consultor, indicadores, valores, metas)
+    fig = _cache_figuras.obter(chave)
+    if fig is None:
+        fig = go.Figure(
+            data=[_barras_indicadores(indicadores, valores, metas)],
+            layout=_layout_indicadores(consultor, len(indicadores))
+        )
+        _cache_figuras.guardar(chave, fig, 4096 + 512 * len(indicadores))
+    return fig
+
+# ============================================================================
+# MAPA DE VARIAÇÃO DA EQUIPE (CONSULTORES × INDICADORES)
+# ============================================================================
+# Até LIMITE_CELULAS_MAPA células (e LIMITE_LINHAS_MAPA linhas) o mapa
+# mostra uma linha por consultor. Acima disso os consultores são ordenados
+# pela variação média e agrupados em blocos de tamanho igual no servidor;
+# cada linha do mapa é a média de um bloco. O navegador recebe no máximo
+# esse número de células, e o texto do hover é montado pelo hovertemplate
+# só quando o mouse passa.
+
+LIMITE_CELULAS_MAPA = 6000
+LIMITE_LINHAS_MAPA = 150
+
+ESCALA_FAIXAS = [
+    [0.0, '#EF4444'], [0.33, '#EF4444'],
+    [0.33, '#6B7280'], [0.67, '#6B7280'],
+    [0.67, '#10B981'], [1.0, '#10B981']
+]
+
+def _medias_em_blocos(matriz, tamanho):
+    """Média (ignorando NaN) de cada bloco de `tamanho` linhas consecutivas."""
+    inicios = np.arange(0, len(matriz), tamanho)
+    validos = ~np.isnan(matriz)
+    somas = np.add.reduceat(np.where(validos, matriz, 0.0), inicios, axis=0)
+    contagens = np.add.reduceat(validos, inicios, axis=0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return somas / contagens, inicios
+
+@cronometrar()
+def figura_variacao_equipe(tabela, limite=LIMITE_CELULAS_MAPA):
+    """
+    Mapa consultores × indicadores da variação % (tabela de
+    tabela_variacao), colorido pelas faixas de ±5% de obter_cor_variacao.
+    Retorna (fig, tamanho_bloco); tamanho_bloco > 1 indica que cada linha
+    é a média de um bloco de consultores.
+    """
+    valores = tabela.to_numpy(dtype='float64')
+    linhas, colunas = valores.shape
+    # Eixo x pelo nome completo (categorias distintas, hover correto) e
+    # rótulos curtos só no texto das marcas
+    indicadores = [str(c) for c in tabela.columns]
+    nomes_curtos = list(tabela_nomes_curtos(tabela.columns).values())
+    
+    if linhas * colunas <= limite and linhas <= LIMITE_LINHAS_MAPA:
+        tamanho, rotulos, customdata = 1, tabela.index.tolist(), valores
+        hover = '<b>%{y}</b><br>%{x}<br>Variação: %{customdata:+.1f}%<extra></extra>'
+        eixo_y = dict()
+    else:
+        max_linhas = max(1, min(LIMITE_LINHAS_MAPA, limite // max(1, colunas)))
+        tamanho = -(-linhas // max_linhas)
+        validos = ~np.isnan(valores)
+        media = np.where(validos, valores, 0.0).sum(axis=1) / np.maximum(validos.sum(axis=1), 1)
+        ordem = np.argsort(-media, kind='stable')
+        customdata, inicios = _medias_em_blocos(valores[ordem], tamanho)
+        rotulos = [f"{i + 1}–{min(i + tamanho, linhas)}" for i in inicios]
+        hover = '<b>Consultores %{y}</b><br>%{x}<br>Variação média: %{customdata:+.1f}%<extra></extra>'
+        eixo_y = dict(autorange='reversed', title='Consultores (pela variação média)')
+    
+    fig = go.Figure(go.Heatmap(
+        z=classificar_variacao_vetorizada(customdata),
+        x=indicadores,
+        y=rotulos,
+        customdata=customdata,
+        zmin=-1,
+        zmax=1,
+        colorscale=ESCALA_FAIXAS,
+        showscale=False,
+        xgap=1,
+        ygap=1,
+        hovertemplate=hover
+    ))
+    fig.update_layout(
+        height=max(350, 22 * len(rotulos) + 120),
+        margin=dict(l=5, r=5, t=30, b=30),
+        plot_bgcolor='white',
+        paper_bgcolor='white',
+        xaxis=dict(tickmode='array', tickvals=indicadores, ticktext=nomes_curtos),
+        yaxis=eixo_y
+    )
+    return fig, tamanho
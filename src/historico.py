@@ -0,0 +1,109 @@
+import numpy as np
+import pandas as pd
+
+from .utils import extrair_mes_ano, formatar_periodo_nome, indicadores_numericos
+
+# ============================================================================
+# SÉRIE HISTÓRICA (N PERÍODOS EM FORMATO LONGO)
+# ============================================================================
+# Cada mês vira um bloco (periodo, USUARIO, indicador, valor) empilhado em um
+# único DataFrame. periodo, USUARIO e indicador são categóricos: cada linha
+# guarda só códigos inteiros, então a memória cresce com o número de valores
+# e não com o tamanho dos textos repetidos mês a mês.
+
+def chave_ordenacao_periodo(arquivo_nome):
+    """Chave (ano, mês, nome) para ordenar arquivos cronologicamente."""
+    ano, mes = extrair_mes_ano(arquivo_nome)
+    return (ano or 0, mes or 0, (arquivo_nome or '').lower())
+
+def ordenar_periodos(periodos):
+    """
+    Ordena uma lista de (nome_arquivo, df) pelo mês/ano do nome do arquivo
+    e devolve [(rotulo, df)] com rótulos únicos (ex.: 'Jan/2026').
+    """
+    ordenados = sorted(periodos, key=lambda p: chave_ordenacao_periodo(p[0]))
+    
+    resultado = []
+    usados = set()
+    for i, (nome, df) in enumerate(ordenados, start=1):
+        rotulo = formatar_periodo_nome(nome, i)
+        if rotulo in usados:
+            rotulo = f"{rotulo} ({i})"
+        usados.add(rotulo)
+        resultado.append((rotulo, df))
+    
+    return resultado
+
+def empilhar_periodos(periodos, indicadores=None):
+    """
+    Empilha [(rotulo, df)] (já em ordem cronológica) em um DataFrame longo
+    com colunas periodo, USUARIO, indicador e valor. Cada df precisa da
+    coluna USUARIO; valores ausentes não geram linha.
+    """
+    colunas = ['periodo', 'USUARIO', 'indicador', 'valor']
+    if not periodos:
+        return pd.DataFrame(columns=colunas)
+    
+    rotulos = [rotulo for rotulo, _ in periodos]
+    usuarios = pd.Index(sorted(set().union(*(df['USUARIO'].unique() for _, df in periodos))))
+    
+    if indicadores is None:
+        indicadores = []
+        for _, df in periodos:
+            indicadores.extend(i for i in indicadores_numericos(df) if i not in indicadores)
+    indicadores = pd.Index(list(dict.fromkeys(indicadores)))
+    
+    partes = []
+    for p, (_, df) in enumerate(periodos):
+        cols = [i for i in indicadores if i in df.columns]
+        if not cols or df.empty:
+            continue
+        
+        bloco = df[cols].apply(pd.to_numeric, errors='coerce').to_numpy(dtype='float64', na_value=np.nan)
+        n, k = bloco.shape
+        valores = bloco.ravel()
+        presentes = ~np.isnan(valores)
+        
+        partes.append((
+            np.full(n * k, p, dtype='int32')[presentes],
+            np.repeat(usuarios.get_indexer(df['USUARIO']).astype('int32'), k)[presentes],
+            np.tile(indicadores.get_indexer(cols).astype('int32'), n)[presentes],
+            valores[presentes],
+        ))
+    
+    if not partes:
+        return pd.DataFrame(columns=colunas)
+    
+    cod_periodo, cod_usuario, cod_indicador, valores = (np.concatenate(v) for v in zip(*partes))
+    
+    return pd.DataFrame({
+        'periodo': pd.Categorical.from_codes(cod_periodo, categories=rotulos, ordered=True),
+        'USUARIO': pd.Categorical.from_codes(cod_usuario, categories=usuarios),
+        'indicador': pd.Categorical.from_codes(cod_indicador, categories=indicadores),
+        'valor': valores,
+    })
+
+def _tabela_plana(tabela, indicadores):
+    """Tira os índices categóricos da tabela dinâmica (período × indicador)."""
+    tabela = tabela.reindex(columns=list(indicadores))
+    tabela.index = pd.Index(tabela.index.astype(str), name='periodo')
+    tabela.columns = pd.Index(list(indicadores), name='indicador')
+    return tabela
+
+def serie_consultor(historico, consultor, indicadores):
+    """Tabela período × indicador de um consultor (NaN onde não houver valor)."""
+    filtro = (historico['USUARIO'] == consultor) & historico['indicador'].isin(indicadores)
+    tabela = historico[filtro].pivot_table(
+        index='periodo', columns='indicador', values='valor', aggfunc='first', observed=False
+    )
+    return _tabela_plana(tabela, indicadores)
+
+def serie_media(historico, indicadores, consultores=None):
+    """Média por período dos indicadores (opcionalmente só de alguns consultores)."""
+    filtro = historico['indicador'].isin(indicadores)
+    if consultores is not None:
+        filtro &= historico['USUARIO'].isin(consultores)
+    tabela = historico[filtro].pivot_table(
+        index='periodo', columns='indicador', values='valor', aggfunc='mean', observed=False
+    )
+    return _tabela_plana(tabela, indicadores)
@@ -1,17 +1,205 @@
 import streamlit as st
+from streamlit.errors import StreamlitAPIException
 from datetime import datetime
-from .utils import formatar_valor
+from collections.abc import MutableMapping
+from .utils import formatar_valor, converter_numero, criar_nome_curto_grafico
+from .persistencia import obter_backend_padrao
+from .perfil import cronometrar
 import pandas as pd
 import hashlib
+import logging
+import sqlite3
+from html import escape
+import weakref
+
+# ============================================================================
+# REPOSITÓRIO DE METAS (DICT COM ÍNDICES)
+# ============================================================================
+
+class RepositorioMetas(MutableMapping):
+    """
+    Metas indexadas pela chave de criar_chave_meta, com índices secundários
+    por consultor, equipe e indicador. Se comporta como dict, então o código
+    que itera/apaga em st.session_state.metas continua funcionando.
+    
+    Com um backend (ver src.persistencia), as metas são carregadas de uma vez
+    na criação e as alterações ficam pendentes até persistir(): leituras são
+    sempre em memória e as escritas vão em lote.
+    """
+    def __init__(self, metas=None, backend=None, tamanho_lote=50):
+        self._metas = {}
+        # dict como "conjunto ordenado": mantém a ordem de inserção
+        self._por_consultor = {}
+        self._por_equipe = {}
+        self._por_indicador = {}
+        self.backend = backend
+        self.tamanho_lote = tamanho_lote
+        self._gravacoes = {}
+        self._remocoes = set()
+        
+        if backend is not None:
+            for chave, meta in backend.carregar().items():
+                self._guardar(chave, meta)
+            self._registrar_finalizador()
+        if metas:
+            self.update(metas)
+    
+    def _indices(self, meta):
+        return (
+            (self._por_consultor, meta.get('consultor')),
+            (self._por_equipe, meta.get('equipe')),
+            (self._por_indicador, meta.get('indicador')),
+        )
+    
+    def _indexar(self, chave, meta):
+        for indice, valor in self._indices(meta):
+            indice.setdefault(valor, {})[chave] = None
+    
+    def _desindexar(self, chave, meta):
+        for indice, valor in self._indices(meta):
+            chaves = indice.get(valor)
+            if chaves is not None:
+                chaves.pop(chave, None)
+                if not chaves:
+                    del indice[valor]
+    
+    def _guardar(self, chave, meta):
+        if chave in self._metas:
+            self._desindexar(chave, self._metas[chave])
+        self._metas[chave] = meta
+        self._indexar(chave, meta)
+    
+    def _registrar_pendencia(self, chave, meta=None):
+        if self.backend is None:
+            return
+        if meta is None:
+            self._gravacoes.pop(chave, None)
+            self._remocoes.add(chave)
+        else:
+            self._remocoes.discard(chave)
+            self._gravacoes[chave] = meta
+        if len(self._gravacoes) + len(self._remocoes) >= self.tamanho_lote:
+            self.persistir()
+    
+    def __getitem__(self, chave):
+        return self._metas[chave]
+    
+    def __setitem__(self, chave, meta):
+        self._guardar(chave, meta)
+        self._registrar_pendencia(chave, meta)
+    
+    def __delitem__(self, chave):
+        meta = self._metas.pop(chave)
+        self._desindexar(chave, meta)
+        self._registrar_pendencia(chave)
+    
+    def _registrar_finalizador(self):
+        # O que estiver pendente é gravado quando o repositório é coletado
+        # (sessão expirada ou substituída) ou ao encerrar o processo. O
+        # finalizador guarda só o backend e os pendentes, nunca o repositório.
+        weakref.finalize(self, _persistir_pendentes, self.backend, self._gravacoes, self._remocoes)
+    
+    def __setstate__(self, estado):
+        self.__dict__.update(estado)
+        if self.backend is not None:
+            self._registrar_finalizador()
+    
+    def atualizar_lote(self, metas):
+        """Grava várias metas e persiste tudo em uma única transação."""
+        for chave, meta in metas.items():
+            self._guardar(chave, meta)
+            if self.backend is not None:
+                self._remocoes.discard(chave)
+                self._gravacoes[chave] = meta
+        self.persistir()
+    
+    def remover_lote(self, chaves):
+        """Remove várias metas (as que existirem); retorna quantas foram removidas."""
+        removidas = 0
+        for chave in chaves:
+            if chave in self._metas:
+                self._desindexar(chave, self._metas.pop(chave))
+                if self.backend is not None:
+                    self._gravacoes.pop(chave, None)
+                    self._remocoes.add(chave)
+                removidas += 1
+        self.persistir()
+        return removidas
+    
+    @property
+    def pendentes(self):
+        return len(self._gravacoes) + len(self._remocoes)
+    
+    def persistir(self):
+        """Grava no backend, em uma transação, tudo o que está pendente."""
+        if self.backend is None or not self.pendentes:
+            return
+        # Esvazia os mesmos objetos (o finalizador guarda referência a eles)
+        gravacoes, remocoes = dict(self._gravacoes), set(self._remocoes)
+        self._gravacoes.clear()
+        self._remocoes.clear()
+        self.backend.gravar_lote(gravacoes, remocoes)
+    
+    def __iter__(self):
+        return iter(self._metas)
+    
+    def __len__(self):
+        return len(self._metas)
+    
+    def __contains__(self, chave):
+        return chave in self._metas
+    
+    def _selecionar(self, indice, valor):
+        return {chave: self._metas[chave] for chave in indice.get(valor, ())}
+    
+    def por_consultor(self, consultor):
+        """Metas do consultor (comparação exata, não por substring da chave)."""
+        return self._selecionar(self._por_consultor, consultor)
+    
+    def por_equipe(self, equipe):
+        """Metas dos consultores da equipe."""
+        return self._selecionar(self._por_equipe, equipe)
+    
+    def por_indicador(self, indicador):
+        """Metas definidas para o indicador."""
+        return self._selecionar(self._por_indicador, indicador)
+    
+    def consultores(self):
+        return list(self._por_consultor)
+    
+    def equipes(self):
+        return [e for e in self._por_equipe if e]
+
+def _persistir_pendentes(backend, gravacoes, remocoes):
+    """Finalizador do RepositorioMetas: grava o que ficou pendente."""
+    if not gravacoes and not remocoes:
+        return
+    try:
+        backend.gravar_lote(dict(gravacoes), set(remocoes))
+    except (sqlite3.Error, OSError):
+        # Sem sessão para avisar: registra no log o que não pôde ser gravado
+        logging.getLogger(__name__).exception(
+            "Falha ao gravar %d meta(s) e remover %d pendentes ao descartar o repositório",
+            len(gravacoes), len(remocoes)
+        )
 
 # ============================================================================
 # FUNÇÕES DO SISTEMA DE METAS
 # ============================================================================
 
 def inicializar_sistema_metas():
-    """Inicializa o sistema de metas no session_state"""
+    """
+    Inicializa o sistema de metas no session_state.
+    Roda no início de cada execução da página: grava em lote as alterações
+    feitas na execução anterior (salvar/remover seguidos de st.rerun()).
+    """
     if 'metas' not in st.session_state:
-        st.session_state.metas = {}
+        st.session_state.metas = RepositorioMetas(backend=obter_backend_padrao())
+    elif not isinstance(st.session_state.metas, RepositorioMetas):
+        # Sessões antigas (dict simples) ou módulo recarregado
+        st.session_state.metas = RepositorioMetas(st.session_state.metas, backend=obter_backend_padrao())
+    else:
+        st.session_state.metas.persistir()
     if 'mostrar_metas' not in st.session_state:
         st.session_state.mostrar_metas = True
     if 'modal_aberto' in st.session_state:
@@ -25,7 +213,7 @@ def criar_chave_meta(indicador, consultor, equipe=None):
         return f"meta_{indicador}_{consultor}".replace(" ", "_").upper()
 
 def salvar_meta(indicador, meta_valor, consultor, equipe=None):
-    """Salva uma meta no session_state"""
+    """Salva uma meta no session_state (gravada em disco no próximo persistir)"""
     chave = criar_chave_meta(indicador, consultor, equipe)
     
     try:
@@ -56,13 +244,71 @@ def obter_meta(indicador, consultor, equipe=None):
     chave = criar_chave_meta(indicador, consultor, equipe)
     return st.session_state.metas.get(chave)
 
+# ============================================================================
+# NÍVEIS CHIP (CHIP HABILITADO → PONTOS HAB/FIN)
+# ============================================================================
+
+METAS_CHIP = {
+    "🥉 Prata": {"chip": 23, "hab": 351, "fin": 491},
+    "🥈 Ouro": {"chip": 29, "hab": 491, "fin": 614},
+    "📊 Step 1": {"chip": 39, "hab": 585, "fin": 724},
+    "🏆 Step 2": {"chip": 44, "hab": 685, "fin": 851}
+}
+
+# Indicadores cujas metas acompanham o nível CHIP
+INDICADORES_VINCULADOS_CHIP = {"hab": 'PONTOS HAB TOTAL', "fin": 'PONTOS FIN TOTAL'}
+
+def eh_indicador_chip(indicador):
+    return "CHIP" in indicador.upper() and "HABILITADO" in indicador.upper()
+
+def aplicar_nivel_chip(nivel, indicador_chip, consultores, indicadores_disponiveis=None):
+    """
+    Aplica um nível de METAS_CHIP a vários consultores de uma vez.
+    consultores: lista de (consultor, equipe). Grava também as metas de
+    PONTOS HAB/FIN quando esses indicadores existem no arquivo.
+    Retorna quantos consultores receberam o nível.
+    """
+    valores = METAS_CHIP[nivel]
+    if indicadores_disponiveis is None:
+        indicadores_disponiveis = st.session_state.get('todos_indicadores', [])
+    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    
+    novas = {}
+    for consultor, equipe in consultores:
+        metas_nivel = [(indicador_chip, valores["chip"])]
+        for campo, indicador in INDICADORES_VINCULADOS_CHIP.items():
+            if indicador in indicadores_disponiveis:
+                metas_nivel.append((indicador, valores[campo]))
+        
+        for indicador, valor in metas_nivel:
+            novas[criar_chave_meta(indicador, consultor, equipe)] = {
+                'valor': float(valor),
+                'indicador': indicador,
+                'consultor': consultor,
+                'equipe': equipe,
+                'timestamp': timestamp
+            }
+    
+    st.session_state.metas.atualizar_lote(novas)
+    return len(consultores)
+
+def remover_nivel_chip(indicador_chip, consultores):
+    """Remove o nível CHIP (e as metas de PONTOS vinculadas) de vários consultores."""
+    chaves = []
+    for consultor, equipe in consultores:
+        for indicador in [indicador_chip, *INDICADORES_VINCULADOS_CHIP.values()]:
+            chaves.append(criar_chave_meta(indicador, consultor, equipe))
+    return st.session_state.metas.remover_lote(chaves)
+
 def calcular_progresso_meta(valor_atual, meta_valor):
     """Calcula o progresso em relação à meta (0-150%)"""
     if meta_valor is None or meta_valor == 0:
         return 0
     
     try:
-        valor_numerico = float(str(valor_atual).replace(',', '.').replace('%', ''))
+        valor_numerico = converter_numero(valor_atual, padrao=None)
+        if valor_numerico is None:
+            return 0
         meta_numerica = float(meta_valor)
         
         if meta_numerica == 0:
@@ -111,257 +357,215 @@ def obter_gradiente_por_tipo(indicador):
         return "linear-gradient(135deg, #6B7280 0%, #9CA3AF 100%)"
 
 # ============================================================================
-# FUNÇÃO PRINCIPAL DO CARD - VERSÃO 7.0 (SEM COLUMNS NO POPOVER)
+# FUNÇÃO PRINCIPAL DO CARD - VERSÃO 8.0 (HTML EM UMA ÚNICA CHAMADA)
 # ============================================================================
 
-def criar_card_indicador(valor, indicador, consultor, equipe=None):
+def recarregar(escopo='app'):
     """
-    Cria um card de indicador compacto com metas integradas
-    CORREÇÃO FINAL: Removeu ALL columns de dentro do popover
+    st.rerun no escopo pedido. scope='fragment' só é aceito durante a execução
+    do próprio fragmento; fora dela (ex.: primeira execução) recarrega a página.
     """
-    # Formata valor
-    valor_formatado = formatar_valor(valor)
+    if escopo == 'fragment':
+        try:
+            st.rerun(scope='fragment')
+        except StreamlitAPIException:
+            pass
+    st.rerun()
+
+def eh_indicador_cvs(indicador):
+    return "CVS" in indicador.upper() and "CALLBACK" in indicador.upper()
+
+def eh_indicador_editavel(indicador):
+    """Só CHIP HABILITADO e CVS C/ CALLBACK têm meta editável."""
+    return eh_indicador_chip(indicador) or eh_indicador_cvs(indicador)
+
+def gerar_html_card(valor, indicador, consultor, equipe=None, formato='auto'):
+    """
+    Monta o HTML completo do card (cabeçalho, barra de progresso e corpo).
+    Retorna (html, meta). Não escreve nada na página.
+    """
+    valor_formatado = formatar_valor(valor, formato)
     gradiente = obter_gradiente_por_tipo(indicador)
+    nome = escape(indicador[:18] + ('...' if len(indicador) > 18 else ''))
     
-    # Verifica meta existente
-    meta = None
-    progresso = 0
-    cor_progresso = ""
-    texto_progresso = ""
-    meta_valor_formatado = ""
+    meta = obter_meta(indicador, consultor, equipe) if st.session_state.mostrar_metas else None
     
-    if st.session_state.mostrar_metas:
-        meta = obter_meta(indicador, consultor, equipe)
-        if meta:
-            progresso = calcular_progresso_meta(valor, meta['valor'])
-            cor_progresso = obter_cor_progresso(progresso)
-            texto_progresso = formatar_progresso_texto(progresso)
-            meta_valor_formatado = formatar_valor(meta['valor'])
-    
-    # ========== CHAVE ESTÁVEL ==========
-    chave_base = f"{indicador}_{consultor}_{equipe if equipe else 'sem_equipe'}"
-    hash_id = hashlib.md5(chave_base.encode()).hexdigest()[:8]
-    
-    # ========== METAS PREDEFINIDAS ==========
-    METAS_CHIP = {
-        "🥉 Prata": {"chip": 23, "hab": 351, "fin": 491},
-        "🥈 Ouro": {"chip": 29, "hab": 491, "fin": 614},
-        "📊 Step 1": {"chip": 39, "hab": 585, "fin": 724},
-        "🏆 Step 2": {"chip": 44, "hab": 685, "fin": 851}
-    }
-    
-    # ========== CARD PRINCIPAL ==========
     # CABEÇALHO
-    st.markdown(f"""
-    <div style='
-        background: {gradiente};
-        padding: 10px 14px;
-        color: white;
-        border-radius: 8px 8px 0 0;
-        margin: 0;
-    '>
-        <div style="display: flex; justify-content: space-between; align-items: center;">
-            <span style="font-size: 12px; font-weight: 600;">
-                {indicador[:18]}{'...' if len(indicador) > 18 else ''}
-            </span>
-            <span style="font-size: 9px; background: rgba(255,255,255,0.2); 
-                        padding: 2px 6px; border-radius: 10px;">
-                {valor_formatado}
-            </span>
-        </div>
-        <div style="margin: 4px 0 0 0; font-size: 22px; font-weight: 700;">
-            {valor_formatado}
-        </div>
-    """, unsafe_allow_html=True)
+    partes = [
+        f"<div style='background: {gradiente}; padding: 10px 14px; color: white; border-radius: 8px 8px 0 0; margin: 0;'>",
+        "<div style='display: flex; justify-content: space-between; align-items: center;'>",
+        f"<span style='font-size: 12px; font-weight: 600;'>{nome}</span>",
+        "<span style='font-size: 9px; background: rgba(255,255,255,0.2); padding: 2px 6px; border-radius: 10px;'>",
+        f"{valor_formatado}</span>",
+        "</div>",
+        f"<div style='margin: 4px 0 0 0; font-size: 22px; font-weight: 700;'>{valor_formatado}</div>",
+    ]
     
     # BARRA DE PROGRESSO
     if meta:
+        progresso = calcular_progresso_meta(valor, meta['valor'])
+        cor_progresso = obter_cor_progresso(progresso)
+        meta_valor_formatado = formatar_valor(meta['valor'])
         if progresso >= 100:
             estilo_progresso = 'background: #059669; color: white; font-weight: 700; padding: 2px 8px; border-radius: 12px;'
         else:
             estilo_progresso = f'font-weight: 600; color: {cor_progresso};'
         
-        st.markdown(f"""
-        <div style='
-            background: {gradiente};
-            padding: 0 14px 10px 14px;
-            color: white;
-            margin: 0;
-        '>
-            <div style="display: flex; justify-content: space-between; font-size: 10px; margin-bottom: 2px;">
-                <span>Meta: {meta_valor_formatado}</span>
-                <span style="{estilo_progresso}">{texto_progresso}</span>
-            </div>
-            <div style="width: 100%; height: 4px; background: rgba(255,255,255,0.3); border-radius: 2px;">
-                <div style="width: {min(progresso, 100)}%; height: 100%; 
-                            background: {cor_progresso}; border-radius: 2px;"></div>
-            </div>
-        </div>
-        """, unsafe_allow_html=True)
-    else:
-        st.markdown("</div>", unsafe_allow_html=True)
+        partes += [
+            "<div style='display: flex; justify-content: space-between; font-size: 10px; margin: 4px 0 2px 0;'>",
+            f"<span>Meta: {meta_valor_formatado}</span>",
+            f"<span style='{estilo_progresso}'>{formatar_progresso_texto(progresso)}</span>",
+            "</div>",
+            "<div style='width: 100%; height: 4px; background: rgba(255,255,255,0.3); border-radius: 2px;'>",
+            f"<div style='width: {min(progresso, 100)}%; height: 100%; background: {cor_progresso}; border-radius: 2px;'></div>",
+            "</div>",
+        ]
+    partes.append("</div>")
     
     # CORPO DO CARD
     if meta:
-        st.markdown(f"""
-        <div style='
-            background: #F9FAFB;
-            padding: 10px;
-            color: #111827;
-            border-radius: 0 0 8px 8px;
-            border: 1px solid #E5E7EB;
-            border-top: none;
-        '>
-            <div style="display: flex; justify-content: space-between; align-items: center;">
-                <span style="font-size: 11px; color: #6B7280;">🎯 Meta</span>
-                <span style="font-size: 13px; font-weight: 700; color: #059669;">
-                    {meta_valor_formatado}
-                </span>
-            </div>
-        </div>
-        """, unsafe_allow_html=True)
+        partes += [
+            "<div style='background: #F9FAFB; padding: 10px; color: #111827; border-radius: 0 0 8px 8px; ",
+            "border: 1px solid #E5E7EB; border-top: none;'>",
+            "<div style='display: flex; justify-content: space-between; align-items: center;'>",
+            "<span style='font-size: 11px; color: #6B7280;'>🎯 Meta</span>",
+            f"<span style='font-size: 13px; font-weight: 700; color: #059669;'>{meta_valor_formatado}</span>",
+            "</div></div>",
+        ]
     else:
-        st.markdown("""
-        <div style='
-            background: #F9FAFB;
-            padding: 10px;
-            border-radius: 0 0 8px 8px;
-            border: 1px dashed #9CA3AF;
-            border-top: none;
-            text-align: center;
-        '>
-            <span style="font-size: 11px; color: #6B7280;">
-                ⚡ Sem meta
-            </span>
-        </div>
-        """, unsafe_allow_html=True)
+        partes += [
+            "<div style='background: #F9FAFB; padding: 10px; border-radius: 0 0 8px 8px; ",
+            "border: 1px dashed #9CA3AF; border-top: none; text-align: center;'>",
+            "<span style='font-size: 11px; color: #6B7280;'>⚡ Sem meta</span>",
+            "</div>",
+        ]
     
-    # ========== POPOVER (SEM COLUMNS) ==========
-    texto_botao = "✏️" if meta else "🎯"
+    return "".join(partes), meta
+
+def renderizar_editor_meta(valor, indicador, consultor, equipe=None, formato='auto', contexto='',
+                           escopo_rerun='app'):
+    """
+    Conteúdo de edição de meta de um indicador (níveis CHIP, meta CVS ou aviso).
+    contexto diferencia as keys quando o mesmo indicador aparece duas vezes na página.
+    escopo_rerun='fragment' quando o editor roda dentro de um st.fragment: salvar
+    ou remover reexecuta só o fragmento, não a página inteira.
+    """
+    valor_formatado = formatar_valor(valor, formato)
+    meta = obter_meta(indicador, consultor, equipe)
     
-    with st.popover(texto_botao, use_container_width=True):
-        st.markdown(f"**{indicador[:30]}**")
-        st.metric("Atual", valor_formatado, delta=None)
+    # ========== CHAVE ESTÁVEL ==========
+    chave_base = f"{indicador}_{consultor}_{equipe if equipe else 'sem_equipe'}{contexto}"
+    hash_id = hashlib.md5(chave_base.encode()).hexdigest()[:8]
+    
+    st.markdown(f"**{indicador[:30]}**")
+    st.metric("Atual", valor_formatado, delta=None)
+    
+    # ----- CHIP HABILITADO (USANDO BOTÕES INDIVIDUAIS) -----
+    if eh_indicador_chip(indicador):
+        meta_atual = meta['valor'] if meta else None
         
-        # ----- CHIP HABILITADO (USANDO BOTÕES INDIVIDUAIS) -----
-        if "CHIP" in indicador.upper() and "HABILITADO" in indicador.upper():
-            meta_atual = meta['valor'] if meta else None
-            
-            st.markdown("**Níveis:**")
-            
-            # Prata
-            if meta_atual == 23:
-                st.success("🥉 Prata (ativo)")
-                if st.button("Remover Prata", key=f"rm_p_{hash_id}", use_container_width=True):
-                    remover_meta(indicador, consultor, equipe)
-                    remover_meta('PONTOS HAB TOTAL', consultor, equipe)
-                    remover_meta('PONTOS FIN TOTAL', consultor, equipe)
-                    st.rerun()
-            else:
-                if st.button("🥉 Prata", key=f"p_{hash_id}", use_container_width=True):
-                    metas = METAS_CHIP["🥉 Prata"]
-                    salvar_meta(indicador, metas["chip"], consultor, equipe)
-                    if 'PONTOS HAB TOTAL' in st.session_state.get('todos_indicadores', []):
-                        salvar_meta('PONTOS HAB TOTAL', metas["hab"], consultor, equipe)
-                    if 'PONTOS FIN TOTAL' in st.session_state.get('todos_indicadores', []):
-                        salvar_meta('PONTOS FIN TOTAL', metas["fin"], consultor, equipe)
-                    st.rerun()
-            
-            # Ouro
-            if meta_atual == 29:
-                st.success("🥈 Ouro (ativo)")
-                if st.button("Remover Ouro", key=f"rm_o_{hash_id}", use_container_width=True):
-                    remover_meta(indicador, consultor, equipe)
-                    remover_meta('PONTOS HAB TOTAL', consultor, equipe)
-                    remover_meta('PONTOS FIN TOTAL', consultor, equipe)
-                    st.rerun()
-            else:
-                if st.button("🥈 Ouro", key=f"o_{hash_id}", use_container_width=True):
-                    metas = METAS_CHIP["🥈 Ouro"]
-                    salvar_meta(indicador, metas["chip"], consultor, equipe)
-                    if 'PONTOS HAB TOTAL' in st.session_state.get('todos_indicadores', []):
-                        salvar_meta('PONTOS HAB TOTAL', metas["hab"], consultor, equipe)
-                    if 'PONTOS FIN TOTAL' in st.session_state.get('todos_indicadores', []):
-                        salvar_meta('PONTOS FIN TOTAL', metas["fin"], consultor, equipe)
-                    st.rerun()
-            
-            # Step 1
-            if meta_atual == 39:
-                st.success("📊 Step 1 (ativo)")
-                if st.button("Remover Step 1", key=f"rm_s1_{hash_id}", use_container_width=True):
-                    remover_meta(indicador, consultor, equipe)
-                    remover_meta('PONTOS HAB TOTAL', consultor, equipe)
-                    remover_meta('PONTOS FIN TOTAL', consultor, equipe)
-                    st.rerun()
-            else:
-                if st.button("📊 Step 1", key=f"s1_{hash_id}", use_container_width=True):
-                    metas = METAS_CHIP["📊 Step 1"]
-                    salvar_meta(indicador, metas["chip"], consultor, equipe)
-                    if 'PONTOS HAB TOTAL' in st.session_state.get('todos_indicadores', []):
-                        salvar_meta('PONTOS HAB TOTAL', metas["hab"], consultor, equipe)
-                    if 'PONTOS FIN TOTAL' in st.session_state.get('todos_indicadores', []):
-                        salvar_meta('PONTOS FIN TOTAL', metas["fin"], consultor, equipe)
-                    st.rerun()
-            
-            # Step 2
-            if meta_atual == 44:
-                st.success("🏆 Step 2 (ativo)")
-                if st.button("Remover Step 2", key=f"rm_s2_{hash_id}", use_container_width=True):
-                    remover_meta(indicador, consultor, equipe)
-                    remover_meta('PONTOS HAB TOTAL', consultor, equipe)
-                    remover_meta('PONTOS FIN TOTAL', consultor, equipe)
-                    st.rerun()
-            else:
-                if st.button("🏆 Step 2", key=f"s2_{hash_id}", use_container_width=True):
-                    metas = METAS_CHIP["🏆 Step 2"]
-                    salvar_meta(indicador, metas["chip"], consultor, equipe)
-                    if 'PONTOS HAB TOTAL' in st.session_state.get('todos_indicadores', []):
-                        salvar_meta('PONTOS HAB TOTAL', metas["hab"], consultor, equipe)
-                    if 'PONTOS FIN TOTAL' in st.session_state.get('todos_indicadores', []):
-                        salvar_meta('PONTOS FIN TOTAL', metas["fin"], consultor, equipe)
-                    st.rerun()
+        st.markdown("**Níveis:**")
         
-        # ----- CVS (USANDO COLUNAS AQUI É PERMITIDO - ESTÁ NO NÍVEL RAÍZ DO POPOVER) -----
-        elif "CVS" in indicador.upper() and "CALLBACK" in indicador.upper():
-            if meta:
-                valor_sugerido = float(meta['valor'])
+        for nivel, sufixo in zip(METAS_CHIP, ["p", "o", "s1", "s2"]):
+            nome_nivel = nivel.split(" ", 1)[1]
+            if meta_atual == METAS_CHIP[nivel]["chip"]:
+                st.success(f"{nivel} (ativo)")
+                if st.button(f"Remover {nome_nivel}", key=f"rm_{sufixo}_{hash_id}", use_container_width=True):
+                    remover_nivel_chip(indicador, [(consultor, equipe)])
+                    recarregar(escopo_rerun)
             else:
-                try:
-                    valor_sugerido = float(str(valor).replace(',', '.').replace('%', '')) * 1.1
-                except:
-                    valor_sugerido = 0.0
-            
-            nova_meta = st.number_input(
-                "Meta:",
-                value=float(valor_sugerido) if valor_sugerido > 0 else 0.0,
-                min_value=0.0,
-                step=1.0,
-                format="%.1f",
-                key=f"cvs_{hash_id}",
-                label_visibility="collapsed",
-                placeholder="Valor da meta"
-            )
-            
-            col_s, col_r = st.columns(2)
-            with col_s:
-                if st.button("💾 Salvar", key=f"save_cvs_{hash_id}", use_container_width=True):
-                    if salvar_meta(indicador, nova_meta, consultor, equipe):
-                        st.rerun()
-            with col_r:
-                if meta:
-                    if st.button("🗑️ Remover", key=f"rm_cvs_{hash_id}", use_container_width=True):
-                        if remover_meta(indicador, consultor, equipe):
-                            st.rerun()
+                if st.button(nivel, key=f"{sufixo}_{hash_id}", use_container_width=True):
+                    aplicar_nivel_chip(nivel, indicador, [(consultor, equipe)])
+                    recarregar(escopo_rerun)
+    
+    # ----- CVS (SEM COLUMNS: O EDITOR PODE ESTAR DENTRO DE COLUNAS ANINHADAS) -----
+    elif eh_indicador_cvs(indicador):
+        if meta:
+            valor_sugerido = float(meta['valor'])
+        else:
+            valor_sugerido = converter_numero(valor) * 1.1
         
-        # ----- OUTROS -----
+        nova_meta = st.number_input(
+            "Meta:",
+            value=float(valor_sugerido) if valor_sugerido > 0 else 0.0,
+            min_value=0.0,
+            step=1.0,
+            format="%.1f",
+            key=f"cvs_{hash_id}",
+            label_visibility="collapsed",
+            placeholder="Valor da meta"
+        )
+        
+        if st.button("💾 Salvar", key=f"save_cvs_{hash_id}", use_container_width=True):
+            if salvar_meta(indicador, nova_meta, consultor, equipe):
+                recarregar(escopo_rerun)
+        if meta:
+            if st.button("🗑️ Remover", key=f"rm_cvs_{hash_id}", use_container_width=True):
+                if remover_meta(indicador, consultor, equipe):
+                    recarregar(escopo_rerun)
+    
+    # ----- OUTROS -----
+    else:
+        if "PONTOS" in indicador.upper():
+            st.caption("Controlado pelo CHIP")
         else:
-            if "PONTOS" in indicador.upper():
-                st.caption("Controlado pelo CHIP")
-            else:
-                st.caption("Meta apenas para CHIP/CVS")
+            st.caption("Meta apenas para CHIP/CVS")
+
+@cronometrar()
+def criar_card_indicador(valor, indicador, consultor, equipe=None, formato='auto', contexto=''):
+    """
+    Cria um card de indicador compacto com metas integradas
+    (HTML em uma única chamada + popover de edição)
+    """
+    html_card, meta = gerar_html_card(valor, indicador, consultor, equipe, formato)
+    st.markdown(html_card, unsafe_allow_html=True)
+    
+    # ========== POPOVER (SEM COLUMNS) ==========
+    texto_botao = "✏️" if meta else "🎯"
+    with st.popover(texto_botao, use_container_width=True):
+        renderizar_editor_meta(valor, indicador, consultor, equipe, formato, contexto)
     
     return meta
 
+@cronometrar()
+def renderizar_grade_cards(itens, consultor, equipe=None, colunas=3, escopo_rerun='app'):
+    """
+    Renderiza todos os cards do consultor em um único bloco HTML (grid CSS).
+    itens: lista de (indicador, valor, formato).
+    O editor de meta é criado só para o indicador escolhido no seletor abaixo
+    da grade, em vez de um popover por card.
+    Dentro de um st.fragment, use escopo_rerun='fragment'.
+    """
+    cards = [
+        f"<div>{gerar_html_card(valor, indicador, consultor, equipe, formato)[0]}</div>"
+        for indicador, valor, formato in itens
+    ]
+    st.markdown(
+        f"<div style='display: grid; grid-template-columns: repeat({colunas}, minmax(0, 1fr)); "
+        f"gap: 8px; margin-bottom: 8px;'>{''.join(cards)}</div>",
+        unsafe_allow_html=True
+    )
+    
+    editaveis = {indicador: (valor, formato) for indicador, valor, formato in itens
+                 if eh_indicador_editavel(indicador)}
+    if not editaveis:
+        return
+    
+    chave_grade = hashlib.md5(f"{consultor}_{equipe}".encode()).hexdigest()[:8]
+    indicador_editado = st.selectbox(
+        "Editar meta",
+        list(editaveis),
+        index=None,
+        placeholder="🎯 Definir/editar meta de...",
+        key=f"editar_meta_{chave_grade}",
+        label_visibility="collapsed"
+    )
+    if indicador_editado:
+        valor, formato = editaveis[indicador_editado]
+        with st.container(border=True):
+            renderizar_editor_meta(valor, indicador_editado, consultor, equipe, formato,
+                                   escopo_rerun=escopo_rerun)
+
 # ============================================================================
 # FUNÇÕES AUXILIARES PARA GRÁFICOS
 # ============================================================================
@@ -378,34 +582,11 @@ def formatar_valor_grafico(valor):
     """Formata valores para gráficos"""
     try:
         if pd.isna(valor): return "0"
-        valor_str = str(valor).replace('%', '').replace(',', '.').strip()
-        num_valor = float(valor_str)
+        num_valor = converter_numero(valor, padrao=None)
+        if num_valor is None: return str(valor)
         if num_valor >= 1000000: return f"{num_valor/1000000:.1f}M"
         elif num_valor >= 1000: return f"{num_valor/1000:.0f}K"
         elif num_valor.is_integer(): return f"{int(num_valor):,}".replace(",", ".")
         else: return f"{num_valor:.1f}"
     except:
-        return str(valor)
-
-def criar_nome_curto_grafico(indicador):
-    """Cria versão abreviada para gráficos"""
-    mapeamento = {
-        'PONTOS': 'PTS', 'HABILITADO': 'HAB', 'FINALIZADO': 'FIN',
-        'TOTAL': 'TOT', 'VENDAS': 'VDS', 'CHIP': 'CHP',
-        'CALLBACK': 'CB', 'CVS': 'CV', 'FIN': 'FN',
-        'TELEVISAO': 'TV', 'TELEVISÃO': 'TV', 'PRODUTO': 'PDT'
-    }
-    
-    resultado = indicador.upper()
-    for palavra, abrev in mapeamento.items():
-        resultado = resultado.replace(palavra, abrev)
-    
-    resultado = ' '.join(resultado.split())
-    if len(resultado) > 20:
-        partes = resultado.split()
-        if len(partes) > 2:
-            resultado = ' '.join(partes[:2]) + '...'
-        else:
-            resultado = resultado[:18] + "..."
-    
-    return resultado
\ No newline at end of file
+        return str(valor)
\ No newline at end of file
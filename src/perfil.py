@@ -0,0 +1,174 @@
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+from functools import wraps
+
+# ============================================================================
+# PERFIL DE EXECUÇÃO (TEMPO DE CADA ETAPA POR RERUN)
+# ============================================================================
+# Cada execução de página (ou de fragmento) abre um registro com
+# iniciar_execucao(); medir() e @cronometrar anotam nele a duração de cada
+# etapa. O registro fica na thread da execução (o Streamlit roda cada
+# rerun numa thread própria), então as funções de src não dependem do
+# st.session_state. Com a medição desligada o registro é None e cada
+# etapa custa só a leitura de um atributo.
+# Os registros ficam num buffer circular na sessão (MAX_EXECUCOES).
+
+MAX_EXECUCOES = 200
+CHAVE_EXECUCOES = 'perfil_execucoes'
+
+_local = threading.local()
+
+def perfil_padrao():
+    """Medição ligada por padrão quando PAINEL_PERFIL=1."""
+    return os.environ.get("PAINEL_PERFIL", "") not in ("", "0")
+
+def iniciar_execucao(pagina, fragmento=False):
+    """
+    Abre o registro desta execução se a medição estiver ligada na sessão
+    (st.session_state.perfil_ativo). Chamar no início da página e de cada
+    fragmento (fragmento=True): no rerun completo as etapas do fragmento
+    entram no registro da página; só o rerun do fragmento abre um novo.
+    """
+    # streamlit só aqui: src/utils usa este módulo sem depender da sessão
+    import streamlit as st
+    from streamlit.runtime.scriptrunner import get_script_run_ctx
+    
+    if fragmento:
+        contexto = get_script_run_ctx()
+        if contexto is None or not contexto.fragment_ids_this_run:
+            return
+    
+    _local.registro = None
+    if not st.session_state.get('perfil_ativo', perfil_padrao()):
+        return
+    
+    if CHAVE_EXECUCOES not in st.session_state:
+        st.session_state[CHAVE_EXECUCOES] = deque(maxlen=MAX_EXECUCOES)
+    registro = {
+        'pagina': pagina,
+        'inicio': datetime.now().isoformat(timespec='milliseconds'),
+        'etapas': []
+    }
+    st.session_state[CHAVE_EXECUCOES].append(registro)
+    _local.registro = registro
+    _local.origem = time.perf_counter()
+    _local.nivel = 0
+
+@contextmanager
+def _medicao(registro, etapa):
+    nivel = _local.nivel
+    _local.nivel = nivel + 1
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        fim = time.perf_counter()
+        _local.nivel = nivel
+        registro['etapas'].append({
+            'etapa': etapa,
+            'nivel': nivel,
+            'inicio_ms': round((inicio - _local.origem) * 1000, 3),
+            'ms': round((fim - inicio) * 1000, 3)
+        })
+
+class _SemMedicao:
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *erro):
+        return False
+
+_SEM_MEDICAO = _SemMedicao()
+
+def medir(etapa):
+    """Context manager que anota a duração do bloco (sem custo se desligado)."""
+    registro = getattr(_local, 'registro', None)
+    if registro is None:
+        return _SEM_MEDICAO
+    return _medicao(registro, etapa)
+
+def cronometrar(etapa=None):
+    """Decorador: anota a duração de cada chamada (etapa = nome da função)."""
+    def decorador(funcao):
+        nome = etapa or funcao.__name__
+        
+        @wraps(funcao)
+        def medida(*args, **kwargs):
+            registro = getattr(_local, 'registro', None)
+            if registro is None:
+                return funcao(*args, **kwargs)
+            with _medicao(registro, nome):
+                return funcao(*args, **kwargs)
+        return medida
+    return decorador
+
+def exportar_jsonl(execucoes):
+    """Uma linha JSON por execução, com as etapas em ordem de início."""
+    linhas = []
+    for registro in execucoes:
+        etapas = sorted(registro['etapas'], key=lambda e: (e['inicio_ms'], e['nivel']))
+        linhas.append(json.dumps(dict(registro, etapas=etapas), ensure_ascii=False))
+    return "\n".join(linhas) + "\n" if linhas else ""
+
+# ============================================================================
+# PAINEL DE DEPURAÇÃO (BARRA LATERAL)
+# ============================================================================
+def renderizar_painel_perfil():
+    """Liga/desliga a medição e mostra os tempos da sessão."""
+    import streamlit as st
+    
+    ativo = st.checkbox(
+        "Medir tempos das execuções",
+        value=st.session_state.get('perfil_ativo', perfil_padrao()),
+        help="Registra quanto tempo cada etapa levou em cada execução das páginas"
+    )
+    st.session_state.perfil_ativo = ativo
+    
+    execucoes = [r for r in st.session_state.get(CHAVE_EXECUCOES, ()) if r['etapas']]
+    if not execucoes:
+        st.caption("Nenhuma execução medida ainda. Ligue a medição e use as páginas.")
+        return
+    
+    # Só com execuções para mostrar: a página inicial abre sem o pandas
+    import pandas as pd
+    
+    ultima = execucoes[-1]
+    st.markdown(f"**Última execução** • {ultima['pagina']}")
+    etapas = sorted(ultima['etapas'], key=lambda e: (e['inicio_ms'], e['nivel']))
+    st.dataframe(
+        pd.DataFrame({
+            'Etapa': ['· ' * e['nivel'] + e['etapa'] for e in etapas],
+            'ms': [e['ms'] for e in etapas]
+        }),
+        use_container_width=True,
+        hide_index=True
+    )
+    
+    tabela = pd.DataFrame([
+        {'Página': r['pagina'], 'Etapa': e['etapa'], 'ms': e['ms']}
+        for r in execucoes for e in r['etapas']
+    ])
+    resumo = tabela.groupby(['Página', 'Etapa'])['ms'].agg(
+        Execuções='count', Média='mean', P95=lambda x: x.quantile(0.95), Máximo='max'
+    ).round(1).sort_values('Média', ascending=False)
+    st.markdown(f"**Todas as execuções** ({len(execucoes)})")
+    st.dataframe(resumo, use_container_width=True)
+    
+    col_exp, col_limpar = st.columns(2)
+    with col_exp:
+        st.download_button(
+            "⬇️ JSONL",
+            data=exportar_jsonl(execucoes),
+            file_name="perfil_execucoes.jsonl",
+            mime="application/x-ndjson",
+            use_container_width=True
+        )
+    with col_limpar:
+        if st.button("🧹 Limpar", use_container_width=True):
+            st.session_state[CHAVE_EXECUCOES].clear()
+            st.rerun()
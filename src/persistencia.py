@@ -0,0 +1,96 @@
+import os
+import sqlite3
+from contextlib import closing
+from pathlib import Path
+
+# ============================================================================
+# BACKENDS DE PERSISTÊNCIA DAS METAS
+# ============================================================================
+# Um backend só precisa de dois métodos:
+#   carregar()                      -> dict {chave: meta}
+#   gravar_lote(gravacoes, remocoes) -> grava/remove várias metas de uma vez
+# O RepositorioMetas (src.metas) mantém tudo em memória e chama o backend
+# apenas na carga inicial e ao persistir as alterações pendentes.
+
+CAMINHO_PADRAO = Path(__file__).parent.parent / "dados" / "metas.sqlite3"
+
+
+class BackendSQLite:
+    """
+    Persiste metas em um arquivo SQLite local (modo WAL).
+    Abre uma conexão por operação: o Streamlit roda cada sessão em uma
+    thread diferente e conexões sqlite3 não devem ser compartilhadas.
+    """
+    def __init__(self, caminho=CAMINHO_PADRAO):
+        self.caminho = Path(caminho)
+        self.caminho.parent.mkdir(parents=True, exist_ok=True)
+        with closing(self._conectar()) as con:
+            con.execute("PRAGMA journal_mode=WAL")
+            with con:
+                con.execute("""
+                    CREATE TABLE IF NOT EXISTS metas (
+                        chave TEXT PRIMARY KEY,
+                        indicador TEXT NOT NULL,
+                        consultor TEXT NOT NULL,
+                        equipe TEXT,
+                        valor REAL NOT NULL,
+                        timestamp TEXT
+                    )
+                """)
+
+    def _conectar(self):
+        con = sqlite3.connect(self.caminho, timeout=10)
+        con.execute("PRAGMA synchronous=NORMAL")
+        return con
+
+    def carregar(self):
+        """Lê todas as metas de uma vez (carga no início da sessão)."""
+        with closing(self._conectar()) as con:
+            linhas = con.execute(
+                "SELECT chave, indicador, consultor, equipe, valor, timestamp FROM metas"
+            ).fetchall()
+
+        return {
+            chave: {
+                'valor': valor,
+                'indicador': indicador,
+                'consultor': consultor,
+                'equipe': equipe,
+                'timestamp': timestamp
+            }
+            for chave, indicador, consultor, equipe, valor, timestamp in linhas
+        }
+
+    def gravar_lote(self, gravacoes, remocoes=()):
+        """Grava e remove metas em uma única transação."""
+        if not gravacoes and not remocoes:
+            return
+        with closing(self._conectar()) as con, con:
+            if remocoes:
+                con.executemany("DELETE FROM metas WHERE chave = ?", [(c,) for c in remocoes])
+            if gravacoes:
+                con.executemany(
+                    "INSERT OR REPLACE INTO metas (chave, indicador, consultor, equipe, valor, timestamp) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    [
+                        (chave, m['indicador'], m['consultor'], m.get('equipe'), m['valor'], m.get('timestamp'))
+                        for chave, m in gravacoes.items()
+                    ]
+                )
+
+
+_backend_padrao = None
+
+
+def obter_backend_padrao():
+    """
+    Backend usado pelo sistema de metas. O caminho vem de PAINEL_METAS_DB;
+    PAINEL_METAS_DB vazio desativa a persistência (metas só na sessão).
+    """
+    global _backend_padrao
+    caminho = os.environ.get("PAINEL_METAS_DB", str(CAMINHO_PADRAO))
+    if not caminho:
+        return None
+    if _backend_padrao is None or str(_backend_padrao.caminho) != caminho:
+        _backend_padrao = BackendSQLite(caminho)
+    return _backend_padrao
@@ -0,0 +1,91 @@
+import numpy as np
+
+# ============================================================================
+# RANKING TOP-N / BOTTOM-N (SELEÇÃO PARCIAL, 2-D)
+# ============================================================================
+# Matrizes sempre no formato linhas (consultores) × colunas (indicadores).
+# np.argpartition separa os n melhores de cada coluna em tempo linear, para
+# todas as colunas numa única chamada; só esses n são ordenados depois.
+# Ordenar tudo custaria O(linhas · log linhas) por indicador.
+# Só colunas com empate no corte dos n são ordenadas por inteiro.
+
+def _chave(matriz, maiores):
+    """Chave crescente (melhor primeiro); NaN vai para o fim."""
+    matriz = np.asarray(matriz, dtype='float64')
+    chave = -matriz if maiores else matriz.copy()
+    chave[np.isnan(chave)] = np.inf
+    return matriz, chave
+
+def _ordem_desempate(desempate, total):
+    """Posto inteiro de cada linha pela chave de desempate (padrão: a própria linha)."""
+    if desempate is None:
+        return np.arange(total)
+    postos = np.empty(total, dtype='int64')
+    postos[np.argsort(np.asarray(desempate), kind='stable')] = np.arange(total)
+    return postos
+
+def extremos(matriz, n, maiores=True, desempate=None):
+    """
+    Linhas dos n maiores (maiores=True) ou n menores valores de cada coluna,
+    do melhor para o pior. Retorna (linhas, valores), ambos n × colunas.
+    Colunas com menos de n valores válidos completam com linha -1 e NaN.
+    
+    Empates são decididos por desempate (uma chave por linha, ex.: nomes
+    dos consultores; padrão: a linha menor), inclusive no corte: se o
+    n-ésimo valor se repete fora dos n escolhidos, a coluna é ordenada por
+    inteiro com np.lexsort para que os mesmos empatados entrem sempre.
+    """
+    matriz, chave = _chave(matriz, maiores)
+    if matriz.ndim == 1:
+        matriz, chave = matriz[:, None], chave[:, None]
+    total, colunas = matriz.shape
+    n = min(n, total)
+    if n <= 0:
+        return np.empty((0, colunas), dtype='int64'), np.empty((0, colunas))
+    
+    if n == 1 and desempate is None:
+        # argmin devolve a primeira ocorrência: empate fica com a linha menor
+        linhas = np.argmin(chave, axis=0)[None, :]
+    else:
+        ordem_desempate = _ordem_desempate(desempate, total)
+        if n == 1:
+            # Entre os empatados no melhor valor, o de menor chave de desempate
+            melhor = chave.min(axis=0)
+            candidatos = np.where(chave == melhor, ordem_desempate[:, None], total)
+            parcial = np.argmin(candidatos, axis=0)[None, :]
+        elif n < total:
+            parcial = np.argpartition(chave, n - 1, axis=0)[:n]
+            # argpartition escolhe qualquer um entre os empatados no corte
+            limite = np.take_along_axis(chave, parcial[n - 1:n], axis=0)[0]
+            empatadas = np.flatnonzero(np.isfinite(limite) & ((chave <= limite).sum(axis=0) > n))
+            for coluna in empatadas:
+                parcial[:, coluna] = np.lexsort((ordem_desempate, chave[:, coluna]))[:n]
+        else:
+            parcial = np.broadcast_to(np.arange(total)[:, None], (total, colunas))
+        # Ordena só os n escolhidos (empate: menor chave de desempate primeiro)
+        ordem = np.lexsort((ordem_desempate[parcial], np.take_along_axis(chave, parcial, axis=0)), axis=0)
+        linhas = np.take_along_axis(parcial, ordem, axis=0)
+    
+    valores = np.take_along_axis(matriz, linhas, axis=0)
+    vazios = np.isnan(valores)
+    linhas = np.where(vazios, -1, linhas)
+    return linhas, valores
+
+def posicoes(matriz, valores, maiores=True):
+    """
+    Posição de cada valor na sua coluna (1 = melhor; empates ficam com a
+    menor posição, como rank(method='min')): 1 + nº de valores estritamente
+    melhores. valores é m × colunas (ex.: saída de extremos); NaN -> NaN.
+    """
+    matriz = np.asarray(matriz, dtype='float64')
+    valores = np.asarray(valores, dtype='float64')
+    if matriz.ndim == 1:
+        matriz, valores = matriz[:, None], valores.reshape(-1, 1)
+    
+    resultado = np.full(valores.shape, np.nan)
+    for i in range(valores.shape[0]):
+        linha = valores[i][None, :]
+        melhores = matriz > linha if maiores else matriz < linha
+        resultado[i] = melhores.sum(axis=0) + 1
+    resultado[np.isnan(valores)] = np.nan
+    return resultado
@@ -1,14 +1,105 @@
 import pandas as pd
 import numpy as np
 from datetime import datetime
+from collections import OrderedDict
+import codecs
+import hashlib
+import threading
 import re
+from functools import lru_cache
+
+from .perfil import cronometrar
+
+# ============================================================================
+# CACHE DE LEITURA DE CSV
+# ============================================================================
+class CacheLRU:
+    """
+    Cache LRU limitado por quantidade de itens e por tamanho aproximado (bytes).
+    Thread-safe: o Streamlit executa cada sessão em uma thread própria.
+    """
+    def __init__(self, max_itens=8, max_bytes=512 * 1024 * 1024):
+        self.max_itens = max_itens
+        self.max_bytes = max_bytes
+        self._itens = OrderedDict()
+        self._tamanhos = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+    
+    def obter(self, chave, padrao=None):
+        """Retorna o valor e marca a chave como usada recentemente."""
+        with self._lock:
+            if chave not in self._itens:
+                return padrao
+            self._itens.move_to_end(chave)
+            return self._itens[chave]
+    
+    def guardar(self, chave, valor, tamanho=0):
+        """Guarda o valor e descarta os itens menos usados se passar dos limites."""
+        with self._lock:
+            if chave in self._itens:
+                self._bytes -= self._tamanhos.pop(chave)
+                del self._itens[chave]
+            
+            # Itens maiores que o cache inteiro não são guardados
+            if tamanho > self.max_bytes:
+                return
+            
+            self._itens[chave] = valor
+            self._tamanhos[chave] = tamanho
+            self._bytes += tamanho
+            
+            while len(self._itens) > self.max_itens or self._bytes > self.max_bytes:
+                chave_antiga, _ = self._itens.popitem(last=False)
+                self._bytes -= self._tamanhos.pop(chave_antiga)
+    
+    def limpar(self):
+        with self._lock:
+            self._itens.clear()
+            self._tamanhos.clear()
+            self._bytes = 0
+    
+    def __contains__(self, chave):
+        with self._lock:
+            return chave in self._itens
+    
+    def __len__(self):
+        with self._lock:
+            return len(self._itens)
+
+_cache_csv = CacheLRU(max_itens=8, max_bytes=512 * 1024 * 1024)
+# Leitura por colunas (arquivos largos): uma entrada por (hash, coluna)
+_cache_colunas = CacheLRU(max_itens=4096, max_bytes=256 * 1024 * 1024)
+_cache_esquemas = CacheLRU(max_itens=32, max_bytes=16 * 1024 * 1024)
+_cache_indices = CacheLRU(max_itens=32, max_bytes=64 * 1024 * 1024)
+
+def hash_arquivo(arquivo):
+    """Calcula o hash do conteúdo do arquivo sem alterar a posição de leitura."""
+    h = hashlib.blake2b(digest_size=16)
+    
+    if hasattr(arquivo, 'getbuffer'):
+        # BytesIO/UploadedFile: lê direto do buffer, sem copiar o conteúdo
+        with arquivo.getbuffer() as buffer:
+            h.update(buffer)
+        return h.hexdigest()
+    
+    posicao = arquivo.tell()
+    arquivo.seek(0)
+    for bloco in iter(lambda: arquivo.read(1024 * 1024), b''):
+        h.update(bloco)
+    arquivo.seek(posicao)
+    return h.hexdigest()
 
 # ============================================================================
 # FUNÇÕES UTILITÁRIAS
 # ============================================================================
-def corrigir_colunas(df):
-    """Corrige encoding e padroniza nomes de colunas."""
-    df.columns = df.columns.str.encode('latin-1').str.decode('utf-8', errors='ignore')
+def corrigir_colunas(df, reparar_encoding=True):
+    """
+    Corrige encoding e padroniza nomes de colunas.
+    Use reparar_encoding=False quando o arquivo já foi lido com o encoding certo.
+    """
+    if reparar_encoding:
+        df.columns = df.columns.str.encode('latin-1').str.decode('utf-8', errors='ignore')
     
     # Correções específicas
     df.columns = df.columns.str.replace('Ã¡', 'á', regex=False)
@@ -26,6 +117,59 @@ def corrigir_colunas(df):
     
     return df
 
+# Colunas de identificação: nunca são convertidas nem tratadas como indicador
+COLUNAS_IDENTIFICACAO = ['USUARIO', 'EQUIPE', 'NOME_PURO', 'USUÁRIO', 'CONSULTOR', 'VENDEDOR']
+
+def indicadores_numericos(df):
+    """Colunas numéricas do DataFrame, fora as de identificação."""
+    return [
+        col for col in df.columns
+        if col not in COLUNAS_IDENTIFICACAO and pd.api.types.is_numeric_dtype(df[col])
+    ]
+
+@cronometrar()
+def inferir_tipos_numericos(df, colunas_excluir=COLUNAS_IDENTIFICACAO):
+    """
+    Converte para float64 as colunas texto que contêm apenas números no formato
+    brasileiro ('12,5', '12,5%'). Colunas com texto de verdade ficam como estão.
+    As colunas que tinham '%' ficam listadas em df.attrs['colunas_percentuais'].
+    """
+    percentuais = list(df.attrs.get('colunas_percentuais', []))
+    
+    for col in df.columns:
+        if col in colunas_excluir or df[col].dtype != object:
+            continue
+        
+        serie = df[col]
+        texto = serie.astype(str).str.strip()
+        preenchidos = serie.notna() & (texto != '')
+        if not preenchidos.any():
+            continue
+        
+        tem_percentual = texto.str.endswith('%')
+        limpo = texto.str.replace('%', '', regex=False).str.replace(',', '.', regex=False)
+        numeros = pd.to_numeric(limpo, errors='coerce')
+        
+        # Só converte se todo valor preenchido for numérico
+        if numeros[preenchidos].notna().all():
+            df[col] = numeros.astype('float64')
+            if tem_percentual[preenchidos].any() and col not in percentuais:
+                percentuais.append(col)
+    
+    df.attrs['colunas_percentuais'] = percentuais
+    return df
+
+def converter_numero(valor, padrao=0.0):
+    """Converte valor (número ou texto tipo '12,5%') para float; retorna padrao se não der."""
+    if isinstance(valor, (int, float, np.integer, np.floating)) and not isinstance(valor, bool):
+        return padrao if pd.isna(valor) else float(valor)
+    try:
+        if valor is None or pd.isna(valor):
+            return padrao
+        return float(str(valor).replace(',', '.').replace('%', '').strip())
+    except (ValueError, TypeError):
+        return padrao
+
 def extrair_equipe_nome(usuario):
     """Extrai equipe e nome puro do formato 'COD.EQUIPE.Nome'."""
     if isinstance(usuario, str):
@@ -37,6 +181,25 @@ def extrair_equipe_nome(usuario):
                 return equipe, nome
     return "", str(usuario)
 
+def separar_equipe_nome(usuarios):
+    """
+    Versão vetorizada de extrair_equipe_nome para uma Series inteira.
+    Retorna DataFrame com as colunas EQUIPE e NOME_PURO, no mesmo índice.
+    """
+    usuarios = pd.Series(usuarios)
+    equipe = np.full(len(usuarios), '', dtype=object)
+    nome = usuarios.astype(str).to_numpy(dtype=object, copy=True)
+    
+    # Só strings com '.' são separadas; str.contains devolve NaN para não-strings
+    if usuarios.dtype == object and len(usuarios):
+        com_ponto = usuarios.str.contains('.', regex=False, na=False).to_numpy()
+        if com_ponto.any():
+            partes = usuarios[com_ponto].str.partition('.')
+            equipe[com_ponto] = partes[0].to_numpy()
+            nome[com_ponto] = partes[2].to_numpy()
+    
+    return pd.DataFrame({'EQUIPE': equipe, 'NOME_PURO': nome}, index=usuarios.index)
+
 def formatar_valor(valor, formato='auto'):
     """
     Formata valores para exibição.
@@ -47,15 +210,19 @@ def formatar_valor(valor, formato='auto'):
         if valor is None or pd.isna(valor):
             return "0"
         
-        valor_str = str(valor).strip()
-        
-        # Verifica se é percentual
-        if '%' in valor_str:
-            num = float(valor_str.replace('%', '').replace(',', '.'))
-            return f"{num:.1f}%"
-        
-        # Tenta converter para número
-        num = float(valor_str.replace(',', '.'))
+        if isinstance(valor, (int, float, np.integer, np.floating)) and not isinstance(valor, bool):
+            # Já numérico (colunas convertidas na carga): não passa por string
+            num = float(valor)
+        else:
+            valor_str = str(valor).strip()
+            
+            # Verifica se é percentual
+            if '%' in valor_str:
+                num = float(valor_str.replace('%', '').replace(',', '.'))
+                return f"{num:.1f}%"
+            
+            # Tenta converter para número
+            num = float(valor_str.replace(',', '.'))
         
         # Formata baseado no formato solicitado
         if formato == 'porcentagem':
@@ -82,22 +249,366 @@ def formatar_valor(valor, formato='auto'):
     except (ValueError, AttributeError, TypeError):
         return "0"  # Sempre retorna string
 
+def _formatar_mascara(resultado, numeros, mascara, especificacao, de=None, para=None):
+    """Formata numeros[mascara] com a especificação dada, gravando em resultado."""
+    if not mascara.any():
+        return
+    if de is None:
+        textos = [format(n, especificacao) for n in numeros[mascara].tolist()]
+    else:
+        textos = [format(n, especificacao).replace(de, para) for n in numeros[mascara].tolist()]
+    resultado[mascara] = textos
+
+def formatar_coluna(valores, formato='auto'):
+    """
+    Versão vetorizada de formatar_valor: recebe um array/Series e devolve um
+    array de strings (dtype object) com saída idêntica à de formatar_valor.
+    Valores numéricos são formatados direto do float, sem ida e volta por string.
+    """
+    serie = pd.Series(valores)
+    if pd.api.types.is_bool_dtype(serie) or not pd.api.types.is_numeric_dtype(serie):
+        return serie.map(lambda v: formatar_valor(v, formato)).to_numpy(dtype=object)
+    
+    numeros = serie.to_numpy(dtype='float64', na_value=np.nan)
+    resultado = np.full(len(numeros), "0", dtype=object)
+    validos = ~np.isnan(numeros)
+    absoluto = np.abs(numeros)
+    
+    if formato == 'porcentagem':
+        _formatar_mascara(resultado, numeros, validos, '.1f')
+        resultado[validos] = resultado[validos] + "%"
+    elif formato == 'inteiro':
+        _formatar_mascara(resultado, numeros, validos, ',.0f', ',', '.')
+    else:
+        if formato != 'decimal':  # auto: zero vira "0"
+            validos = validos & (numeros != 0)
+        grandes = validos & (absoluto >= 1000)
+        medios = validos & (absoluto >= 1) & ~grandes
+        pequenos = validos & (absoluto < 1)
+        _formatar_mascara(resultado, numeros, grandes, ',.0f', ',', '.')
+        _formatar_mascara(resultado, numeros, medios, ',.1f', ',', '.')
+        _formatar_mascara(resultado, numeros, pequenos, '.3f', '.', ',')
+    
+    return resultado
+
+@cronometrar()
+def formatar_dataframe(df, colunas_percentuais=()):
+    """
+    Formata todas as colunas numéricas do DataFrame para exibição de uma vez.
+    Colunas com o mesmo formato são formatadas juntas, como um único array,
+    o que evita o custo por coluna em exportações com centenas de indicadores.
+    """
+    colunas_saida = {col: df[col] for col in df.columns}
+    numericas = [c for c in df.columns
+                 if pd.api.types.is_numeric_dtype(df[c]) and not pd.api.types.is_bool_dtype(df[c])]
+    
+    grupos = {}
+    for col in numericas:
+        formato = 'porcentagem' if col in colunas_percentuais else 'auto'
+        grupos.setdefault(formato, []).append(col)
+    
+    for formato, colunas in grupos.items():
+        bloco = df[colunas].to_numpy(dtype='float64', na_value=np.nan)
+        textos = formatar_coluna(bloco.ravel(), formato).reshape(bloco.shape)
+        for i, col in enumerate(colunas):
+            colunas_saida[col] = textos[:, i]
+    
+    # Colunas booleanas seguem o caminho escalar, como antes
+    for col in df.columns:
+        if pd.api.types.is_bool_dtype(df[col]):
+            colunas_saida[col] = df[col].map(formatar_valor)
+    
+    return pd.DataFrame(colunas_saida, index=df.index, columns=df.columns)
+
+# ============================================================================
+# NOMES CURTOS DE INDICADORES (GRÁFICOS, BOTÕES E TAGS)
+# ============================================================================
+# Todas as palavras viram uma única regex (as mais longas primeiro, para
+# 'FINALIZADO' vencer 'FINAL'), compilada na importação: o nome é
+# percorrido uma vez em vez de um replace por palavra. Os nomes já
+# abreviados ficam em cache, e tabela_nomes_curtos guarda o dicionário
+# inteiro por conjunto de colunas carregado.
+ABREVIACOES = {
+    'PONTOS': 'PTS',
+    'HABILITADO': 'HAB',
+    'FINALIZADO': 'FIN',
+    'TOTAL': 'TOT',
+    'VENDAS': 'VDS',
+    'CHIP': 'CHP',
+    'TELEVISAO': 'TV',
+    'TELEVISÃO': 'TV',
+    'TELEVISION': 'TV',
+    'PRODUTO': 'PDT',
+    'QUALIDADE': 'QLD',
+    'ATENDIMENTO': 'ATD',
+    'CALLBACK': 'CB',
+    'RECEITA': 'REC',
+    'MEDIA': 'MED',
+    'MÉDIA': 'MED',
+    'MAXIMO': 'MAX',
+    'MÁXIMO': 'MAX',
+    'MINIMO': 'MIN',
+    'MÍNIMO': 'MIN',
+    'FINAL': 'FIN',
+    'HABILITACAO': 'HAB',
+    'HABILITAÇÃO': 'HAB',
+    'NOVO': 'NV',
+    'PME': 'PM',
+    'CPF': 'CP',
+    'CNPJ': 'CN',
+    'GERAL': 'GER',
+    'FIXA': 'FX',
+    'MOVEL': 'MV',
+    'MÓVEL': 'MV',
+    'CVS': 'CV',
+    'C/': ''
+}
+
+_REGEX_ABREVIACOES = re.compile(
+    '|'.join(re.escape(palavra) for palavra in sorted(ABREVIACOES, key=len, reverse=True))
+)
+
+def _abreviar(encontrado):
+    return ABREVIACOES[encontrado.group(0)]
+
+@lru_cache(maxsize=4096)
+def criar_nome_curto_grafico(indicador):
+    """Versão abreviada do nome do indicador para gráficos, botões e tags."""
+    resultado = _REGEX_ABREVIACOES.sub(_abreviar, str(indicador).upper())
+    resultado = ' '.join(resultado.split())
+    
+    # Se ainda for muito longo, corta inteligentemente
+    if len(resultado) > 20:
+        partes = resultado.split()
+        if len(partes) > 2:
+            resultado = ' '.join(partes[:2]) + '...'
+        else:
+            resultado = resultado[:18] + "..."
+    
+    return resultado
+
+@lru_cache(maxsize=32)
+def _tabela_nomes_curtos(colunas):
+    tabela = {}
+    usados = set()
+    for coluna in colunas:
+        nome = base = criar_nome_curto_grafico(coluna)
+        repeticao = 2
+        while nome in usados:
+            nome = f"{base} ({repeticao})"
+            repeticao += 1
+        usados.add(nome)
+        tabela[coluna] = nome
+    return tabela
+
+def tabela_nomes_curtos(colunas):
+    """
+    {indicador: nome curto} das colunas, montado uma vez por conjunto de
+    colunas. Os nomes são únicos: o corte de nomes longos pode gerar o mesmo
+    nome curto para dois indicadores, e os repetidos ganham ' (2)', ' (3)'...
+    """
+    return _tabela_nomes_curtos(tuple(colunas))
+
+def detectar_formato_csv(arquivo, tamanho_amostra=64 * 1024):
+    """
+    Detecta separador, encoding e separador decimal lendo só o início do arquivo.
+    Retorna dict com 'sep', 'encoding' e 'decimal'. A posição de leitura é restaurada.
+    """
+    posicao = arquivo.tell()
+    amostra = arquivo.read(tamanho_amostra)
+    arquivo.seek(posicao)
+    
+    # Encoding: BOM > UTF-8 válido > latin-1
+    if amostra.startswith(codecs.BOM_UTF8):
+        encoding = 'utf-8-sig'
+        amostra = amostra[len(codecs.BOM_UTF8):]
+    else:
+        encoding = 'utf-8'
+    
+    try:
+        # final=False tolera um caractere multibyte cortado no fim da amostra
+        texto = codecs.getincrementaldecoder('utf-8')().decode(amostra, final=False)
+    except UnicodeDecodeError:
+        encoding = 'latin-1'
+        texto = amostra.decode('latin-1')
+    
+    linhas = texto.splitlines()
+    # A última linha pode estar incompleta
+    if len(amostra) == tamanho_amostra and len(linhas) > 1:
+        linhas = linhas[:-1]
+    cabecalho = linhas[0] if linhas else ''
+    
+    sep = ';' if ';' in cabecalho else ','
+    
+    # Decimal: com ';' como separador, valores tipo "12,5" indicam vírgula decimal
+    decimal = '.'
+    if sep == ';':
+        virgula = ponto = 0
+        for linha in linhas[1:51]:
+            for campo in linha.split(sep):
+                campo = campo.strip().strip('"').rstrip('%')
+                if _RE_DECIMAL_VIRGULA.match(campo):
+                    virgula += 1
+                elif _RE_DECIMAL_PONTO.match(campo):
+                    ponto += 1
+        if virgula > ponto:
+            decimal = ','
+    
+    return {'sep': sep, 'encoding': encoding, 'decimal': decimal}
+
+_RE_DECIMAL_VIRGULA = re.compile(r'^-?\d+,\d+$')
+_RE_DECIMAL_PONTO = re.compile(r'^-?\d+\.\d+$')
+
+def _tamanho_arquivo(arquivo):
+    if hasattr(arquivo, 'getbuffer'):
+        with arquivo.getbuffer() as buffer:
+            return buffer.nbytes
+    posicao = arquivo.tell()
+    tamanho = arquivo.seek(0, 2)
+    arquivo.seek(posicao)
+    return tamanho
+
+def _ler_csv(arquivo, formato, **kwargs):
+    """read_csv com o formato detectado; volta para latin-1 se o UTF-8 falhar."""
+    arquivo.seek(0)
+    try:
+        return pd.read_csv(arquivo, sep=formato['sep'], encoding=formato['encoding'],
+                           decimal=formato['decimal'], **kwargs)
+    except UnicodeDecodeError:
+        # Amostra era UTF-8 (ou ASCII), mas o restante do arquivo não
+        arquivo.seek(0)
+        return pd.read_csv(arquivo, sep=formato['sep'], encoding='latin-1',
+                           decimal=formato['decimal'], **kwargs)
+
+@cronometrar()
 def carregar_csv(file_uploader):
-    """Carrega CSV detectando separador automaticamente."""
-    conteudo = file_uploader.read().decode('latin-1')
+    """
+    Carrega CSV detectando separador, encoding e decimal pelo cabeçalho.
+    O resultado fica em cache pelo hash do conteúdo: reruns com o mesmo
+    arquivo não fazem novo parse. Retorna sempre uma cópia, pois as páginas
+    alteram o DataFrame.
+    """
+    chave = hash_arquivo(file_uploader)
+    em_cache = _cache_csv.obter(chave)
+    if em_cache is not None:
+        df, sep = em_cache
+        return df.copy(), sep
+    
+    file_uploader.seek(0)
+    formato = detectar_formato_csv(file_uploader)
+    sep = formato['sep']
+    
+    df = _ler_csv(file_uploader, formato)
     file_uploader.seek(0)
+    df = corrigir_colunas(df, reparar_encoding=False)
+    df = inferir_tipos_numericos(df)
+    df.attrs['hash_arquivo'] = chave
+    
+    # Tamanho aproximado: estrutura do DataFrame + bytes do arquivo (strings)
+    tamanho = int(df.memory_usage(deep=False).sum()) + _tamanho_arquivo(file_uploader)
+    _cache_csv.guardar(chave, (df, sep), tamanho)
+    
+    return df.copy(), sep
+
+# ============================================================================
+# LEITURA POR COLUNAS (ARQUIVOS LARGOS)
+# ============================================================================
+# Exportações com centenas de indicadores: lê só as colunas exibidas.
+# usecols faz o parser materializar apenas essas colunas, e cada coluna
+# lida fica em cache pelo hash do arquivo; ao adicionar um indicador só
+# a coluna nova é lida.
+
+TERMOS_USUARIO = ['USUÁRIO', 'USUARIO', 'CONSULTOR', 'VENDEDOR']
+
+def colunas_identificacao(colunas):
+    """Colunas de identificação (consultor/equipe) presentes na lista."""
+    return [
+        c for c in colunas
+        if c in COLUNAS_IDENTIFICACAO or any(term in str(c).upper() for term in TERMOS_USUARIO)
+    ]
+
+def esquema_csv(arquivo, linhas_amostra=200):
+    """
+    Colunas do CSV sem carregá-lo inteiro: dict com 'colunas' (nomes já
+    corrigidos), 'numericas' (pela amostra das primeiras linhas) e 'sep'.
+    """
+    chave = hash_arquivo(arquivo)
+    em_cache = _cache_esquemas.obter(chave)
+    if em_cache is not None:
+        return em_cache
+    
+    arquivo.seek(0)
+    formato = detectar_formato_csv(arquivo)
+    amostra = _ler_csv(arquivo, formato, nrows=linhas_amostra)
+    arquivo.seek(0)
+    amostra = inferir_tipos_numericos(corrigir_colunas(amostra, reparar_encoding=False))
+    
+    esquema = {
+        'colunas': list(amostra.columns),
+        'numericas': [c for c in amostra.columns if pd.api.types.is_numeric_dtype(amostra[c])],
+        'sep': formato['sep'],
+        'formato': formato
+    }
+    _cache_esquemas.guardar(chave, esquema, 64 * len(esquema['colunas']))
+    return esquema
+
+@cronometrar()
+def carregar_csv_colunas(file_uploader, colunas):
+    """
+    Como carregar_csv, mas só com as colunas pedidas (mais as de
+    identificação). Colunas inexistentes são ignoradas. O resultado guarda
+    em attrs['colunas_disponiveis'] todas as colunas do arquivo.
+    """
+    esquema = esquema_csv(file_uploader)
+    chave = hash_arquivo(file_uploader)
+    
+    # Posição de cada nome corrigido (nomes repetidos: vale o primeiro)
+    posicoes = {}
+    for i, nome in enumerate(esquema['colunas']):
+        posicoes.setdefault(nome, i)
     
-    sep = ';' if ';' in conteudo.split('\n')[0] else ','
-    df = pd.read_csv(file_uploader, sep=sep, encoding='latin-1')
-    df = corrigir_colunas(df)
+    pedidas = colunas_identificacao(esquema['colunas']) + [c for c in colunas if c in posicoes]
+    pedidas = list(dict.fromkeys(pedidas))
     
-    return df, sep
+    series = {}
+    percentuais = []
+    faltantes = []
+    for nome in pedidas:
+        em_cache = _cache_colunas.obter((chave, nome))
+        if em_cache is None:
+            faltantes.append(nome)
+        else:
+            series[nome], percentual = em_cache
+            if percentual:
+                percentuais.append(nome)
+    
+    if faltantes:
+        lidas = _ler_csv(file_uploader, esquema['formato'], usecols=[posicoes[n] for n in faltantes])
+        file_uploader.seek(0)
+        # usecols devolve as colunas na ordem do arquivo
+        lidas.columns = [esquema['colunas'][i] for i in sorted(posicoes[n] for n in faltantes)]
+        lidas = inferir_tipos_numericos(lidas)
+        for nome in faltantes:
+            percentual = nome in lidas.attrs['colunas_percentuais']
+            serie = lidas[nome]
+            _cache_colunas.guardar((chave, nome), (serie, percentual), int(serie.memory_usage(deep=True)))
+            series[nome] = serie
+            if percentual:
+                percentuais.append(nome)
+    
+    df = pd.DataFrame({nome: series[nome] for nome in pedidas})
+    df.attrs['colunas_percentuais'] = [c for c in pedidas if c in percentuais]
+    df.attrs['colunas_disponiveis'] = list(esquema['colunas'])
+    df.attrs['hash_arquivo'] = chave
+    return df, esquema['sep']
 
 def calcular_variacao_percentual(valor1, valor2):
     """Calcula variação percentual entre dois valores."""
     try:
-        v1 = float(str(valor1).replace(',', '.').replace('%', '')) if not pd.isna(valor1) else 0
-        v2 = float(str(valor2).replace(',', '.').replace('%', '')) if not pd.isna(valor2) else 0
+        v1 = converter_numero(valor1, padrao=None) if not pd.isna(valor1) else 0
+        v2 = converter_numero(valor2, padrao=None) if not pd.isna(valor2) else 0
+        if v1 is None or v2 is None:
+            return 0.0
         
         if v1 == 0:
             return 100.0 if v2 > 0 else (0.0 if v2 == 0 else -100.0)
@@ -116,6 +627,29 @@ def obter_cor_variacao(variacao_percentual):
     else:
         return "variation-neutral"
 
+# Abreviações de mês reconhecidas nos nomes de arquivo (ordem de busca)
+MESES_ABREVIADOS = {
+    'jan': 'Jan', 'fev': 'Fev', 'mar': 'Mar', 'abr': 'Abr', 'mai': 'Mai', 'jun': 'Jun',
+    'jul': 'Jul', 'ago': 'Ago', 'set': 'Set', 'out': 'Out', 'nov': 'Nov', 'dez': 'Dez'
+}
+
+def extrair_mes_ano(arquivo_nome):
+    """
+    Extrai (ano, mês) do nome do arquivo com as mesmas regras de
+    formatar_periodo_nome. Partes não encontradas vêm como None.
+    """
+    if not arquivo_nome:
+        return None, None
+    
+    nome = arquivo_nome.lower().replace('.csv', '')
+    ano_match = re.search(r'20\d{2}', nome)
+    ano = int(ano_match.group()) if ano_match else None
+    
+    for numero, key in enumerate(MESES_ABREVIADOS, start=1):
+        if key in nome:
+            return ano, numero
+    return ano, None
+
 def formatar_periodo_nome(arquivo_nome, periodo_num):
     """Formata nome do período baseado no nome do arquivo."""
     if not arquivo_nome:
@@ -125,17 +659,87 @@ def formatar_periodo_nome(arquivo_nome, periodo_num):
     nome = arquivo_nome.lower().replace('.csv', '')
     
     # Tenta extrair mês/ano
-    meses = {
-        'jan': 'Jan', 'fev': 'Fev', 'mar': 'Mar', 'abr': 'Abr', 'mai': 'Mai', 'jun': 'Jun',
-        'jul': 'Jul', 'ago': 'Ago', 'set': 'Set', 'out': 'Out', 'nov': 'Nov', 'dez': 'Dez'
-    }
-    
-    for key, value in meses.items():
-        if key in nome:
-            # Tenta encontrar ano
-            ano_match = re.search(r'20\d{2}', nome)
-            ano = f"/{ano_match.group()}" if ano_match else ""
-            return f"{value}{ano}"
+    ano, mes = extrair_mes_ano(arquivo_nome)
+    if mes:
+        return f"{list(MESES_ABREVIADOS.values())[mes - 1]}{f'/{ano}' if ano else ''}"
     
     # Se não encontrar, usa nome do arquivo (limitado)
-    return nome[:20]
\ No newline at end of file
+    return nome[:20]
+
+def preparar_usuarios(df):
+    """
+    Padroniza a coluna do consultor como USUARIO, remove linhas sem usuário e
+    cria EQUIPE/NOME_PURO. Retorna None se o arquivo não tem coluna de consultor.
+    """
+    for col in df.columns:
+        if any(term in str(col).upper() for term in TERMOS_USUARIO):
+            df = df.rename(columns={col: 'USUARIO'})
+            break
+    
+    if 'USUARIO' not in df.columns:
+        return None
+    
+    df['USUARIO'] = df['USUARIO'].astype(str).str.strip()
+    df = df[~df['USUARIO'].isin(['', 'nan', 'NaN', 'None', 'none'])].copy()
+    df[['EQUIPE', 'NOME_PURO']] = separar_equipe_nome(df['USUARIO'])
+    return df
+
+# ============================================================================
+# ÍNDICE DE CONSULTORES
+# ============================================================================
+class IndiceConsultores:
+    """
+    Posições das linhas de cada USUARIO e consultores de cada EQUIPE,
+    montados uma vez por arquivo. Selecionar um consultor vira uma busca
+    no dicionário + iloc, em vez de comparar a coluna USUARIO inteira.
+    """
+    def __init__(self, df):
+        # groupby().indices: {usuario: array de posições}, na ordem do arquivo
+        self.posicoes = df.groupby('USUARIO', sort=False).indices
+        self.consultores = sorted(self.posicoes)
+        
+        if 'EQUIPE' in df.columns:
+            equipes = df['EQUIPE'].to_numpy()
+            self.equipe_de = {u: equipes[pos[0]] for u, pos in self.posicoes.items()}
+        else:
+            self.equipe_de = {u: None for u in self.posicoes}
+        
+        self.por_equipe = {}
+        for consultor in self.consultores:
+            self.por_equipe.setdefault(self.equipe_de[consultor], []).append(consultor)
+        self.equipes = sorted(e for e in self.por_equipe if e is not None and not pd.isna(e))
+    
+    def __contains__(self, consultor):
+        return consultor in self.posicoes
+    
+    def linhas(self, df, consultor):
+        """Linhas do consultor (DataFrame vazio se não existir)."""
+        return df.iloc[self.posicoes.get(consultor, [])]
+    
+    def primeira_posicao(self, consultor):
+        posicoes = self.posicoes.get(consultor)
+        return None if posicoes is None else int(posicoes[0])
+    
+    def equipe(self, consultor):
+        return self.equipe_de.get(consultor)
+    
+    def consultores_da_equipe(self, equipe):
+        return list(self.por_equipe.get(equipe, []))
+
+def obter_indice_consultores(df):
+    """
+    IndiceConsultores do DataFrame já preparado (preparar_usuarios). Fica em
+    cache pela origem do arquivo (attrs['hash_arquivo']), então reruns com o
+    mesmo arquivo não refazem o índice.
+    """
+    chave = df.attrs.get('hash_arquivo')
+    if chave is not None:
+        chave = (chave, len(df))
+        indice = _cache_indices.obter(chave)
+        if indice is not None:
+            return indice
+    
+    indice = IndiceConsultores(df)
+    if chave is not None:
+        _cache_indices.guardar(chave, indice, 200 * len(df) + 1024)
+    return indice
@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# Permite importar src/ rodando só "pytest" na raiz do projeto
+sys.path.insert(0, str(Path(__file__).parent.parent))
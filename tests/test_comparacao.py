@@ -0,0 +1,62 @@
+import numpy as np
+import pandas as pd
+
+from src.comparacao import comparar_periodos, variacao_percentual_vetorizada
+from src.metas import RepositorioMetas, calcular_progresso_meta, criar_chave_meta
+from src.utils import calcular_variacao_percentual
+
+INDICADORES = ['CHIP HABILITADO', 'PONTOS HAB TOTAL', 'CONVERSÃO %']
+
+
+def _periodo(rng, consultores):
+    valores = rng.choice([0.0, np.nan, 1.0, -2.5, 10.0, 33.3, 150.0, 1234.5], size=(len(consultores), len(INDICADORES)))
+    df = pd.DataFrame(valores, columns=INDICADORES)
+    df.insert(0, 'USUARIO', consultores)
+    df.insert(1, 'EQUIPE', [c.split('.')[0] for c in consultores])
+    return df
+
+
+def test_comparar_periodos_equivale_calculo_por_celula():
+    rng = np.random.default_rng(3)
+    todos = [f"EQ{i % 3}.CONSULTOR{i}" for i in range(60)]
+    df1 = _periodo(rng, todos[:50])
+    df2 = _periodo(rng, todos[10:])
+    
+    metas = RepositorioMetas()
+    for consultor in todos[::4]:
+        equipe = consultor.split('.')[0]
+        for indicador, valor in zip(INDICADORES, rng.choice([0.0, 5.0, 100.0, 40.0], size=len(INDICADORES))):
+            metas[criar_chave_meta(indicador, consultor, equipe)] = {
+                'valor': float(valor), 'indicador': indicador, 'consultor': consultor, 'equipe': equipe
+            }
+    
+    resultado = comparar_periodos(df1, df2, INDICADORES, metas=metas)
+    
+    comuns = sorted(set(df1['USUARIO']) & set(df2['USUARIO']))
+    assert resultado['consultores1'] == comuns
+    por_usuario1, por_usuario2 = df1.set_index('USUARIO'), df2.set_index('USUARIO')
+    for i, consultor in enumerate(comuns):
+        equipe = consultor.split('.')[0]
+        for j, indicador in enumerate(INDICADORES):
+            v1 = por_usuario1.at[consultor, indicador]
+            v2 = por_usuario2.at[consultor, indicador]
+            assert resultado['variacao'][i, j] == calcular_variacao_percentual(v1, v2)
+            
+            meta = metas.get(criar_chave_meta(indicador, consultor, equipe))
+            for valor, chave in ((v1, 'prog1'), (v2, 'prog2')):
+                if meta is None:
+                    assert np.isnan(resultado[chave][i, j])
+                else:
+                    assert resultado[chave][i, j] == calcular_progresso_meta(valor, meta['valor'])
+
+
+def test_variacao_vetorizada_arredonda_como_round():
+    rng = np.random.default_rng(0)
+    v1 = np.round(rng.uniform(-500, 500, 50_000), 2)
+    v2 = np.round(rng.uniform(-500, 500, 50_000), 2)
+    v1[::9] = 0
+    v1 = np.concatenate([v1, [-20.0, 20.0]])
+    v2 = np.concatenate([v2, [-418.13, -373.37]])  # casos em que np.round erra
+    
+    esperado = [calcular_variacao_percentual(a, b) for a, b in zip(v1.tolist(), v2.tolist())]
+    assert variacao_percentual_vetorizada(v1, v2).tolist() == esperado
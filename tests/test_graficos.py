@@ -0,0 +1,29 @@
+import numpy as np
+import pandas as pd
+
+from src.graficos import LIMITE_BARRAS, figura_indicadores, figura_variacao_equipe
+
+COLUNAS = ['PONTOS HAB TOTAL MES ATUAL', 'PONTOS HAB TOTAL MES ANTERIOR', 'CHIP HABILITADO']
+
+
+def test_mapa_variacao_nao_junta_indicadores_com_mesmo_nome_curto():
+    tabela = pd.DataFrame(
+        np.array([[10.0, -10.0, 0.0], [2.0, 8.0, -7.0]]), columns=COLUNAS, index=['EQ1.ANA', 'EQ1.BIA']
+    )
+    
+    for limite in (6000, 2):  # uma linha por consultor e em blocos
+        fig, _ = figura_variacao_equipe(tabela, limite=limite)
+        mapa = fig.data[0]
+        assert list(mapa.x) == COLUNAS
+        assert len(set(fig.layout.xaxis.ticktext)) == len(COLUNAS)
+        assert list(fig.layout.xaxis.tickvals) == COLUNAS
+
+
+def test_barras_nao_juntam_indicadores_com_mesmo_nome_curto():
+    poucos = COLUNAS
+    muitos = COLUNAS + [f'INDICADOR {i}' for i in range(LIMITE_BARRAS)]  # pontos em WebGL
+    
+    for indicadores in (poucos, muitos):
+        valores = list(range(len(indicadores)))
+        fig = figura_indicadores('EQ1.ANA', indicadores, valores, [None] * len(indicadores))
+        assert len(set(fig.data[0].y)) == len(indicadores)
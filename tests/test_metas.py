@@ -0,0 +1,65 @@
+import gc
+import logging
+import sqlite3
+
+from src.metas import RepositorioMetas
+from src.persistencia import BackendSQLite
+
+
+def _meta(indicador, valor):
+    return {'valor': valor, 'indicador': indicador, 'consultor': 'ANA', 'equipe': 'EQ1', 'timestamp': None}
+
+
+def test_pendentes_gravados_quando_repositorio_e_coletado(tmp_path):
+    backend = BackendSQLite(tmp_path / 'metas.sqlite3')
+    repo = RepositorioMetas(backend=backend, tamanho_lote=50)
+    repo['A'] = _meta('CHIP', 10.0)
+    repo['B'] = _meta('PONTOS', 20.0)
+    assert repo.pendentes == 2
+    assert backend.carregar() == {}
+    
+    del repo
+    gc.collect()
+    
+    assert set(backend.carregar()) == {'A', 'B'}
+
+
+def test_remocao_pendente_gravada_quando_repositorio_e_coletado(tmp_path):
+    backend = BackendSQLite(tmp_path / 'metas.sqlite3')
+    backend.gravar_lote({'A': _meta('CHIP', 10.0), 'B': _meta('PONTOS', 20.0)})
+    repo = RepositorioMetas(backend=backend, tamanho_lote=50)
+    del repo['A']
+    
+    del repo
+    gc.collect()
+    
+    assert set(backend.carregar()) == {'B'}
+
+
+def test_persistir_nao_grava_de_novo_na_coleta(tmp_path):
+    backend = BackendSQLite(tmp_path / 'metas.sqlite3')
+    repo = RepositorioMetas(backend=backend, tamanho_lote=50)
+    repo['A'] = _meta('CHIP', 10.0)
+    repo.persistir()
+    backend.gravar_lote({}, {'A'})  # alteração feita por outra sessão
+    
+    del repo
+    gc.collect()
+    
+    assert backend.carregar() == {}
+
+
+def test_falha_do_backend_na_coleta_vai_para_o_log(tmp_path, caplog):
+    class BackendSomenteLeitura(BackendSQLite):
+        def gravar_lote(self, gravacoes, remocoes=()):
+            raise sqlite3.OperationalError("attempt to write a readonly database")
+    
+    repo = RepositorioMetas(backend=BackendSomenteLeitura(tmp_path / 'metas.sqlite3'), tamanho_lote=50)
+    repo['A'] = _meta('CHIP', 10.0)
+    
+    with caplog.at_level(logging.ERROR, logger='src.metas'):
+        del repo
+        gc.collect()
+    
+    assert "Falha ao gravar 1 meta(s)" in caplog.text
+    assert "readonly database" in caplog.text
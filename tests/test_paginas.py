@@ -0,0 +1,77 @@
+import glob
+import io
+
+import numpy as np
+import pandas as pd
+from streamlit.testing.v1 import AppTest
+
+from src.metas import criar_chave_meta
+
+
+def _pagina(numero):
+    return glob.glob(f'pages/{numero}_*.py')[0]
+
+
+def _salvar_arquivo_largo(diretorio):
+    """Período salvo com mais colunas que LIMITE_COLUNAS_LARGO (modo largo ligado)."""
+    from src.armazem import ArmazemHistorico
+    
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({
+        'USUARIO': ['EQ1.ANA', 'EQ1.BRUNO'],
+        'CHIP HABILITADO': [10.0, 20.0],
+        'PONTOS HAB TOTAL': [300.0, 400.0],
+        'PONTOS FIN TOTAL': [200.0, 100.0],
+        **{f'INDICADOR {i}': rng.uniform(0, 1000, 2) for i in range(100)}
+    })
+    ArmazemHistorico(diretorio).salvar('2026-01', df, rotulo='Jan/2026')
+
+
+def test_chip_em_lote_no_modo_largo_grava_metas_de_pontos(tmp_path, monkeypatch):
+    monkeypatch.setenv('PAINEL_HISTORICO_DIR', str(tmp_path / 'historico'))
+    monkeypatch.setenv('PAINEL_METAS_DB', '')
+    _salvar_arquivo_largo(tmp_path / 'historico')
+    
+    at = AppTest.from_file(_pagina(1), default_timeout=60)
+    at.run()
+    at.radio(key='origem_individual').set_value('🗄️ Histórico salvo').run()
+    assert at.toggle(key='modo_largo').value
+    
+    # Só um indicador exibido: CHIP e PONTOS ficam fora do DataFrame carregado
+    at.multiselect(key='multiselect_indicadores').set_value(['INDICADOR 0']).run()
+    at.button(key='aplicar_chip_lote').click().run()
+    assert not at.exception
+    
+    metas = at.session_state.metas
+    for indicador in ['CHIP HABILITADO', 'PONTOS HAB TOTAL', 'PONTOS FIN TOTAL']:
+        for consultor in ['EQ1.ANA', 'EQ1.BRUNO']:
+            assert criar_chave_meta(indicador, consultor, 'EQ1') in metas
+    
+    # A aba 'Metas' do Excel lê os indicadores com meta que não estão carregados
+    at.button(key='gerar_excel_individual').click().run()
+    planilha = pd.read_excel(
+        io.BytesIO(at.session_state.excel_individual['dados']), sheet_name='Metas', keep_default_na=False
+    )
+    assert 'N/A' not in planilha['Valor Atual'].astype(str).tolist()
+
+
+def test_relatorio_da_equipe_invalidado_quando_metas_mudam(tmp_path, monkeypatch):
+    monkeypatch.setenv('PAINEL_HISTORICO_DIR', str(tmp_path / 'historico'))
+    monkeypatch.setenv('PAINEL_METAS_DB', '')
+    _salvar_arquivo_largo(tmp_path / 'historico')
+    
+    at = AppTest.from_file(_pagina(3), default_timeout=60)
+    at.run()
+    at.radio(key='origem_equipe').set_value('🗄️ Histórico salvo').run()
+    at.multiselect(key='indicadores_relatorio').set_value(['PONTOS HAB TOTAL']).run()
+    at.button(key='gerar_relatorio_equipe').click().run()
+    assert not at.exception
+    assert len(at.get('download_button')) == 1
+    
+    # Nova meta depois de gerar: o download antigo não vale mais
+    at.session_state.metas[criar_chave_meta('PONTOS HAB TOTAL', 'EQ1.ANA', 'EQ1')] = {
+        'valor': 500.0, 'indicador': 'PONTOS HAB TOTAL', 'consultor': 'EQ1.ANA', 'equipe': 'EQ1',
+        'timestamp': None
+    }
+    at.run()
+    assert len(at.get('download_button')) == 0
@@ -0,0 +1,56 @@
+import numpy as np
+import pandas as pd
+
+from src.ranking import extremos, posicoes
+
+
+def _esperado(coluna, n, maiores, desempate):
+    """Ordenação completa: melhor valor primeiro, empate pela chave de desempate, NaN no fim."""
+    chave = -coluna if maiores else coluna.copy()
+    chave[np.isnan(chave)] = np.inf
+    linhas = np.lexsort((desempate, chave))[:n]
+    return np.where(np.isnan(coluna[linhas]), -1, linhas)
+
+
+def test_extremos_equivale_ordenacao_completa_com_empates():
+    rng = np.random.default_rng(0)
+    for caso in range(1000):
+        total, colunas = rng.integers(1, 40), rng.integers(1, 4)
+        n = rng.integers(1, total + 2)
+        matriz = rng.integers(0, 5, (total, colunas)).astype(float)
+        matriz[rng.random((total, colunas)) < 0.2] = np.nan
+        nomes = rng.permutation(total).astype(str) if caso % 2 else None
+        postos = np.arange(total) if nomes is None else np.argsort(np.argsort(nomes, kind='stable'))
+        
+        for maiores in (True, False):
+            linhas, valores = extremos(matriz, n, maiores, desempate=nomes)
+            for j in range(colunas):
+                esperado = _esperado(matriz[:, j], min(n, total), maiores, postos)
+                assert linhas[:, j].tolist() == esperado.tolist()
+                valores_esperados = np.where(esperado == -1, np.nan, matriz[esperado, j])
+                assert np.array_equal(valores[:, j], valores_esperados, equal_nan=True)
+
+
+def test_extremos_empate_no_corte_usa_desempate():
+    valores = np.array([5.0, 9.0, 5.0, 5.0, 1.0])
+    nomes = np.array(['DUDA', 'ANA', 'CAIO', 'BIA', 'EVA'])
+    
+    linhas, _ = extremos(valores, 2, desempate=nomes)
+    assert nomes[linhas[:, 0]].tolist() == ['ANA', 'BIA']
+    
+    linhas, _ = extremos(valores, 1, maiores=False, desempate=nomes)
+    assert nomes[linhas[:, 0]].tolist() == ['EVA']
+    
+    # Sem desempate: a linha menor
+    linhas, _ = extremos(valores, 3)
+    assert linhas[:, 0].tolist() == [1, 0, 2]
+
+
+def test_posicoes_equivale_rank_min():
+    rng = np.random.default_rng(1)
+    matriz = rng.integers(0, 10, (50, 3)).astype(float)
+    matriz[rng.random(matriz.shape) < 0.1] = np.nan
+    
+    obtido = posicoes(matriz, matriz)
+    esperado = pd.DataFrame(matriz).rank(method='min', ascending=False).to_numpy()
+    np.testing.assert_array_equal(obtido, esperado)
@@ -0,0 +1,153 @@
+import io
+
+import numpy as np
+import pandas as pd
+
+from src.utils import (
+    carregar_csv, converter_numero, corrigir_colunas, criar_nome_curto_grafico, detectar_formato_csv,
+    extrair_equipe_nome, formatar_coluna, formatar_valor, hash_arquivo, inferir_tipos_numericos,
+    separar_equipe_nome, tabela_nomes_curtos
+)
+
+
+def test_separar_equipe_nome_equivale_extrair():
+    casos = pd.Series(['EQ1.ANA', 'EQ1.ANA.PAULA', 'SEMPONTO', '', '.X', 'X.', 'a.b.c.', '..',
+                       None, np.nan, 5, 1.5], dtype=object)
+    rng = np.random.default_rng(42)
+    base = np.array(['EQ1.ANA', 'EQ2.ANA.PAULA', 'SEM_EQUIPE', 'EQ3.JOÃO', '.SO_NOME', 'EQ4.'], dtype=object)
+    aleatorios = pd.Series(base[rng.integers(0, len(base), 2000)], dtype=object)
+    aleatorios[rng.random(2000) < 0.01] = np.nan
+    casos = pd.concat([casos, aleatorios], ignore_index=True)
+    
+    esperado = casos.apply(lambda x: pd.Series(extrair_equipe_nome(x)))
+    obtido = separar_equipe_nome(casos)
+    
+    assert (obtido['EQUIPE'].to_numpy() == esperado[0].to_numpy()).all()
+    assert (obtido['NOME_PURO'].to_numpy() == esperado[1].to_numpy()).all()
+
+
+def _arquivo(texto, nome='jan_2026.csv', encoding='utf-8'):
+    arquivo = io.BytesIO(texto.encode(encoding))
+    arquivo.name = nome
+    return arquivo
+
+
+CSV_EXEMPLO = (
+    "USUÁRIO;CHIP HABILITADO;CONVERSÃO %;CVS FIN C/ CALLBACK;CARGO\n"
+    "EQ1.ANA;12;25,5%;76,4;VENDEDOR\n"
+    "EQ2.JOÃO;7;0,2%;1,5;VENDEDOR\n"
+)
+
+
+def test_carregar_csv_em_cache_devolve_copia():
+    primeiro, sep = carregar_csv(_arquivo(CSV_EXEMPLO))
+    primeiro['CHIP HABILITADO'] = -1
+    
+    segundo, _ = carregar_csv(_arquivo(CSV_EXEMPLO))
+    assert sep == ';'
+    assert segundo['CHIP HABILITADO'].tolist() == [12, 7]
+    assert segundo.attrs['hash_arquivo'] == primeiro.attrs['hash_arquivo']
+
+
+def test_hash_arquivo_preserva_posicao_e_depende_do_conteudo():
+    arquivo = _arquivo(CSV_EXEMPLO)
+    arquivo.seek(10)
+    chave = hash_arquivo(arquivo)
+    assert arquivo.tell() == 10
+    assert chave == hash_arquivo(_arquivo(CSV_EXEMPLO))
+    assert chave != hash_arquivo(_arquivo(CSV_EXEMPLO + "EQ3.BIA;1;1%;1;VENDEDOR\n"))
+
+
+def _carregar_csv_original(arquivo):
+    """carregar_csv de antes da detecção pelo cabeçalho (latin-1 + reparo dos nomes)."""
+    conteudo = arquivo.read().decode('latin-1')
+    arquivo.seek(0)
+    sep = ';' if ';' in conteudo.split('\n')[0] else ','
+    df = pd.read_csv(arquivo, sep=sep, encoding='latin-1')
+    return corrigir_colunas(df), sep
+
+
+def test_detectar_formato_csv():
+    assert detectar_formato_csv(_arquivo(CSV_EXEMPLO)) == {'sep': ';', 'encoding': 'utf-8', 'decimal': ','}
+    assert detectar_formato_csv(_arquivo(CSV_EXEMPLO, encoding='latin-1'))['encoding'] == 'latin-1'
+    assert detectar_formato_csv(_arquivo('﻿' + CSV_EXEMPLO))['encoding'] == 'utf-8-sig'
+    assert detectar_formato_csv(_arquivo("USUARIO,VALOR\nEQ1.ANA,1.5\n")) == {
+        'sep': ',', 'encoding': 'utf-8', 'decimal': '.'
+    }
+    
+    arquivo = _arquivo(CSV_EXEMPLO)
+    arquivo.seek(5)
+    detectar_formato_csv(arquivo)
+    assert arquivo.tell() == 5
+
+
+def test_carregar_csv_mesmas_colunas_e_valores_que_o_original():
+    for texto in (CSV_EXEMPLO, CSV_EXEMPLO.replace(';', ',').replace('25,5%', '25.5%')
+                  .replace('0,2%', '0.2%').replace('76,4', '76.4').replace('1,5', '1.5')):
+        novo, sep_novo = carregar_csv(_arquivo(texto))
+        original, sep_original = _carregar_csv_original(_arquivo(texto))
+        
+        assert sep_novo == sep_original
+        assert list(novo.columns) == list(original.columns)
+        # O original lia UTF-8 como latin-1 e deixava os valores com mojibake
+        assert novo['USUÁRIO'].tolist() == original['USUÁRIO'].str.encode('latin-1').str.decode('utf-8').tolist()
+        for col in ('CHIP HABILITADO', 'CONVERSÃO %', 'CVS FIN C/ CALLBACK'):
+            assert novo[col].tolist() == [converter_numero(v) for v in original[col]]
+
+
+def test_carregar_csv_latin1_mantem_acentos():
+    df, _ = carregar_csv(_arquivo(CSV_EXEMPLO, encoding='latin-1'))
+    assert 'USUÁRIO' in df.columns and 'CONVERSÃO %' in df.columns
+    assert df['USUÁRIO'].tolist() == ['EQ1.ANA', 'EQ2.JOÃO']
+
+
+def test_inferir_tipos_numericos_equivale_converter_numero():
+    df = pd.DataFrame({
+        'USUARIO': ['EQ1.ANA', 'EQ1.BIA', 'EQ2.CAIO', 'EQ2.DUDA'],
+        'INTEIRO': ['12', '0', '-3', '1500'],
+        'DECIMAL': ['12,5', ' 0,25 ', None, '-1,75'],
+        'PERCENTUAL': ['25,5%', '0%', '100%', ''],
+        'TEXTO': ['VENDEDOR', '12', 'SUPERVISOR', None],
+        'NUMERICA': [1.5, 2.0, np.nan, 4.0],
+    })
+    original = df.copy()
+    
+    resultado = inferir_tipos_numericos(df)
+    
+    for col in ('INTEIRO', 'DECIMAL', 'PERCENTUAL'):
+        assert resultado[col].dtype == 'float64'
+        esperado = [converter_numero(v, padrao=np.nan) if str(v).strip() else np.nan for v in original[col]]
+        np.testing.assert_array_equal(resultado[col].to_numpy(), np.array(esperado, dtype='float64'))
+    assert resultado['TEXTO'].tolist() == original['TEXTO'].tolist()
+    assert resultado['USUARIO'].tolist() == original['USUARIO'].tolist()
+    assert resultado.attrs['colunas_percentuais'] == ['PERCENTUAL']
+
+
+def test_formatar_coluna_equivale_formatar_valor():
+    rng = np.random.default_rng(7)
+    valores = np.concatenate([
+        [0.0, -0.0, np.nan, 0.0005, 0.9995, 1.0, 999.95, 999.4, 1000.0, -1000.5, 1234567.891, -0.25, 12.05],
+        rng.normal(0, 1, 200),
+        rng.normal(0, 5000, 200),
+        rng.integers(-3000, 3000, 200),
+    ])
+    valores[rng.random(len(valores)) < 0.05] = np.nan
+    
+    for formato in ('auto', 'decimal', 'inteiro', 'porcentagem'):
+        esperado = [formatar_valor(v, formato) for v in valores]
+        assert formatar_coluna(valores, formato).tolist() == esperado, formato
+    
+    # Texto e booleanos seguem o caminho escalar
+    textos = pd.Series(['12,5%', '1.234', 'abc', None], dtype=object)
+    assert formatar_coluna(textos).tolist() == [formatar_valor(v) for v in textos]
+
+
+def test_tabela_nomes_curtos_unicos():
+    colunas = ['PONTOS HAB TOTAL MES ATUAL', 'PONTOS HAB TOTAL MES ANTERIOR', 'PONTOS HAB TOTAL ANO', 'CHIP HABILITADO']
+    assert len({criar_nome_curto_grafico(c) for c in colunas}) < len(colunas)
+    
+    nomes = tabela_nomes_curtos(colunas)
+    assert list(nomes) == colunas
+    assert len(set(nomes.values())) == len(colunas)
+    assert nomes['PONTOS HAB TOTAL MES ATUAL'] == criar_nome_curto_grafico('PONTOS HAB TOTAL MES ATUAL')
+    assert nomes['PONTOS HAB TOTAL MES ANTERIOR'].endswith(' (2)')